@@ -6,12 +6,15 @@ from .geomapping.PointRTSS import PointRTSS
 from .geomapping.LineRTSS import LineRTSS
 from .geomapping.PolygonRTSS import PolygonRTSS
 from .geomapping.Geocodage import Geocodage
+from .geomapping.MapMatcher import MapMatcher
 
 # Segmentation linéaire
 from .segmentation.LineSegmentationElement import LineSegmentationElement
 from .segmentation.SegmentationPoint import SegmentationPoint
 from .segmentation.LinearReferencing import LinearReferencing
+from .segmentation.ColumnarSegmentation import ColumnarSegmentation
 from .segmentation.ReseauSegmenter import ReseauSegmenter
+from .segmentation.ReseauSegmenterTracker import ReseauSegmenterTracker
 
 # Région
 from .region.CS import CS
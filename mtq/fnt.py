@@ -15,4 +15,8 @@ from .functions.groupeValues import groupeValues
 from .functions.interpolateOffsetOnLine import interpolateOffsetOnLine
 from .functions.identifyPolygonCorners import identifyPolygonCorners
 from .functions.readWFSCapabilities import layerPossibleCRS, layersPossibleCRS
-from .functions.uniquePathName import uniquePathName
\ No newline at end of file
+from .functions.uniquePathName import uniquePathName
+from .functions.geometryArrays import polylineToArrays, polylineToArray, cumulativeLength, interpolatePointsOnLine
+from .functions.nearestLines import linesToSegments, segmentsTree, projectOnSegments, nearestLines, candidateLines
+from .functions.overlayIntervals import overlayIntervals
+from .functions.npzArchive import encodeJsonValue, decodeJsonValue, saveNpz
@@ -16,4 +16,8 @@ __all__ = [
     "interpolateOffsetOnLine",
     "identifyPolygonCorners",
     "readWFSCapabilities",
-    "uniquePathName"]
\ No newline at end of file
+    "uniquePathName",
+    "geometryArrays",
+    "nearestLines",
+    "overlayIntervals",
+    "npzArchive"]
\ No newline at end of file
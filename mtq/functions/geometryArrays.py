@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from qgis.core import QgsGeometry
+
+def polylineToArrays(geometry:QgsGeometry)->list[np.ndarray]:
+    """
+    Fonction qui permet de convertir une géometrie linéaire en liste d'array de coordonnées.
+    Une géometrie multi-parties retourne un array par partie.
+
+    Args:
+        geometry (QgsGeometry): La géometrie linéaire à convertir
+
+    Returns (list[np.ndarray]): Liste des arrays (n, 2) des vertex de chaque partie
+    """
+    if geometry is None or geometry.isEmpty(): return []
+    if geometry.isMultipart(): parts = geometry.asMultiPolyline()
+    else: parts = [geometry.asPolyline()]
+    return [np.array([(pt.x(), pt.y()) for pt in part], dtype=float) for part in parts if len(part) > 1]
+
+def polylineToArray(geometry:QgsGeometry)->np.ndarray:
+    """
+    Fonction qui permet de convertir une géometrie linéaire en un seul array de coordonnées.
+    Les parties d'une géometrie multi-parties sont mises bout à bout.
+
+    Args:
+        geometry (QgsGeometry): La géometrie linéaire à convertir
+
+    Returns (np.ndarray): Array (n, 2) des vertex de la ligne
+    """
+    parts = polylineToArrays(geometry)
+    if parts == []: return np.empty((0, 2), dtype=float)
+    return np.concatenate(parts)
+
+def cumulativeLength(vertices:np.ndarray)->np.ndarray:
+    """
+    Fonction qui permet de calculer la distance cumulative le long d'une ligne à chaque vertex.
+
+    Args:
+        vertices (np.ndarray): Array (n, 2) des vertex de la ligne
+
+    Returns (np.ndarray): Array (n) des distances cumulatives
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    if len(vertices) == 0: return np.empty(0, dtype=float)
+    return np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(vertices, axis=0).T))))
+
+def interpolatePointsOnLine(vertices:np.ndarray, distances, cumul:np.ndarray=None)->np.ndarray:
+    """
+    Fonction qui permet d'interpoler plusieurs points à des distances le long d'une ligne.
+    Équivalent vectorisé de QgsGeometry.interpolate.
+
+    Args:
+        vertices (np.ndarray): Array (n, 2) des vertex de la ligne
+        distances (array): Les distances le long de la ligne où interpoler les points
+        cumul (np.ndarray, optional): Les distances cumulatives des vertex si elles sont déjà calculées
+
+    Returns (np.ndarray): Array (m, 2) des points interpolés
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    if cumul is None: cumul = cumulativeLength(vertices)
+    distances = np.clip(np.asarray(distances, dtype=float), 0, cumul[-1])
+    return np.column_stack((
+        np.interp(distances, cumul, vertices[:, 0]),
+        np.interp(distances, cumul, vertices[:, 1])))
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from scipy.spatial import cKDTree
+
+def linesToSegments(lines:dict, max_length:float=None, return_measures=False):
+    """
+    Fonction qui permet de convertir des lignes en array de segments [x1, y1, x2, y2].
+    Les segments plus longs que max_length sont divisés pour limiter le rayon de recherche
+    de la fonction nearestLines.
+
+    Args:
+        lines (dict): Dictionnaire {identifiant: liste des arrays (n, 2) des parties de la ligne}
+        max_length (float, optional): La longueur maximale d'un segment. Defaults to None (aucune division).
+        return_measures (bool, optional): Retourner aussi la longueur le long de la ligne au début de chaque segment.
+            Les parties d'une ligne multi-parties sont mesurées bout à bout. Defaults to False.
+
+    Returns (tuple): (array (m, 4) des segments, array (m) des identifiants de ligne de chaque segment)
+        ou (segments, identifiants, array (m) des mesures) si return_measures
+    """
+    list_segments, list_ids, list_measures = [], [], []
+    for line_id, parts in lines.items():
+        # Longueur cumulative de la ligne au début de la partie
+        offset = 0.0
+        for vertices in parts:
+            vertices = np.asarray(vertices, dtype=float)
+            if len(vertices) < 2: continue
+            list_segments.append(np.hstack((vertices[:-1], vertices[1:])))
+            list_ids.append(np.full(len(vertices) - 1, line_id, dtype=np.int64))
+            if return_measures:
+                cumul = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(vertices, axis=0).T))))
+                list_measures.append(offset + cumul[:-1])
+                offset += cumul[-1]
+    if list_segments == []:
+        empty = (np.empty((0, 4), dtype=float), np.empty(0, dtype=np.int64))
+        return empty + (np.empty(0, dtype=float),) if return_measures else empty
+    segments, ids = np.concatenate(list_segments), np.concatenate(list_ids)
+    measures = np.concatenate(list_measures) if return_measures else None
+    if not max_length: return (segments, ids, measures) if return_measures else (segments, ids)
+
+    # Nombre de morceaux pour chaque segment
+    lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+    nbr = np.maximum(1, np.ceil(lengths / max_length)).astype(np.int64)
+    if np.all(nbr == 1): return (segments, ids, measures) if return_measures else (segments, ids)
+    # Position de chaque morceau dans son segment d'origine
+    idx = np.repeat(np.arange(len(segments)), nbr)
+    k = np.arange(len(idx)) - np.repeat(np.cumsum(nbr) - nbr, nbr)
+    t0, t1 = (k / nbr[idx])[:, None], ((k + 1) / nbr[idx])[:, None]
+    start, delta = segments[idx, :2], segments[idx, 2:] - segments[idx, :2]
+    pieces = np.hstack((start + delta * t0, start + delta * t1))
+    if not return_measures: return pieces, ids[idx]
+    return pieces, ids[idx], measures[idx] + lengths[idx] * t0[:, 0]
+
+def segmentsTree(segments:np.ndarray)->cKDTree:
+    """ Fonction qui permet de créer un cKDTree sur le centre des segments """
+    segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+    return cKDTree((segments[:, :2] + segments[:, 2:]) / 2)
+
+def projectOnSegments(points:np.ndarray, segments:np.ndarray):
+    """
+    Fonction qui permet de projeter chaque point sur le segment correspondant.
+
+    Args:
+        points (np.ndarray): Array (n, 2) des points
+        segments (np.ndarray): Array (n, 4) des segments
+
+    Returns (tuple): (array (n, 2) des points projetés, array (n) de la position [0, 1] sur le segment)
+    """
+    start, end = segments[:, :2], segments[:, 2:]
+    delta = end - start
+    denom = np.einsum("ij,ij->i", delta, delta)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(denom > 0, np.einsum("ij,ij->i", points - start, delta) / denom, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return start + delta * t[:, None], t
+
+def nearestLines(points, segments:np.ndarray, max_dist:float=None, tree:cKDTree=None, max_length:float=None, mask:np.ndarray=None, workers=1):
+    """
+    Fonction qui permet de trouver en lot le segment le plus proche de chaque point à l'intérieur d'une distance maximale.
+    Les segments candidats sont trouvés avec un cKDTree sur le centre des segments et la vrai distance point-segment
+    est calculée de façon vectorisée.
+
+    Args:
+        points (array): Array (n, 2) des points
+        segments (np.ndarray): Array (m, 4) des segments (voir linesToSegments)
+        max_dist (float, optional): La distance maximale entre le point et le segment.
+            Defaults to None (le segment le plus proche peu importe la distance).
+        tree (cKDTree, optional): L'index des segments s'il est déjà calculé (voir segmentsTree)
+        max_length (float, optional): La longueur maximale des segments si elle est déjà connue
+        mask (np.ndarray, optional): Array booléen (m) des segments à considérer. Sans distance maximale,
+            le rayon de recherche dépend du centre le plus proche d'un segment considéré.
+        workers (int, optional): Nombre de threads pour la recherche du cKDTree (-1 = tous les processeurs). Defaults to 1.
+
+    Returns (tuple): (array (n) des index du segment le plus proche ou -1, array (n) des distances ou inf)
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    nearest = np.full(len(points), -1, dtype=np.int64)
+    distances = np.full(len(points), np.inf)
+    if len(points) == 0 or len(segments) == 0: return nearest, distances
+    if tree is None: tree = segmentsTree(segments)
+    if max_length is None: max_length = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1]).max()
+    if max_dist is None:
+        # Le segment le plus proche est à moins de la distance du centre le plus proche
+        if mask is None: radius = tree.query(points, workers=workers)[0] + max_length / 2
+        else:
+            if not mask.any(): return nearest, distances
+            # Centre le plus proche d'un segment considéré, avec plus de voisins pour les points sans candidat
+            radius, remaining, k = np.full(len(points), np.inf), np.arange(len(points)), 8
+            while len(remaining) > 0:
+                k = min(k, len(segments))
+                dist, idx = tree.query(points[remaining], k=k, workers=workers)
+                dist, idx = dist.reshape(len(remaining), k), idx.reshape(len(remaining), k)
+                usable = mask[idx]
+                found = usable.any(axis=1)
+                radius[remaining[found]] = dist[found, np.argmax(usable[found], axis=1)] + max_length / 2
+                remaining = remaining[~found]
+                k *= 4
+        candidates = tree.query_ball_point(points, r=radius, workers=workers)
+    # Trouver les segments dont le centre est assez proche pour que le segment soit à moins de max_dist
+    else: candidates = tree.query_ball_point(points, r=max_dist + max_length / 2, workers=workers)
+    counts = np.fromiter((len(c) for c in candidates), dtype=np.int64, count=len(points))
+    if counts.sum() == 0: return nearest, distances
+    idx_pt = np.repeat(np.arange(len(points)), counts)
+    idx_seg = np.fromiter((i for c in candidates for i in c), dtype=np.int64, count=int(counts.sum()))
+    # Retirer les segments exclus
+    if mask is not None:
+        keep = mask[idx_seg]
+        idx_pt, idx_seg = idx_pt[keep], idx_seg[keep]
+    # Calculer la distance entre chaque point et ses segments candidats
+    proj, _ = projectOnSegments(points[idx_pt], segments[idx_seg])
+    dist = np.hypot(*(points[idx_pt] - proj).T)
+    if max_dist is not None:
+        keep = dist <= max_dist
+        idx_pt, idx_seg, dist = idx_pt[keep], idx_seg[keep], dist[keep]
+    if len(dist) == 0: return nearest, distances
+    # Conserver le segment le plus proche de chaque point
+    order = np.lexsort((dist, idx_pt))
+    first = order[np.concatenate(([True], idx_pt[order][1:] != idx_pt[order][:-1]))]
+    nearest[idx_pt[first]] = idx_seg[first]
+    distances[idx_pt[first]] = dist[first]
+    return nearest, distances
+
+def candidateLines(points, segments:np.ndarray, line_ids:np.ndarray, max_dist:float, k:int=5, tree:cKDTree=None, max_length:float=None, workers=1):
+    """
+    Fonction qui permet de trouver en lot les lignes candidates de chaque point à l'intérieur d'une distance maximale.
+    Seulement le segment le plus proche de chaque ligne est conservé et au plus k lignes par point.
+
+    Args:
+        points (array): Array (n, 2) des points
+        segments (np.ndarray): Array (m, 4) des segments (voir linesToSegments)
+        line_ids (np.ndarray): Array (m) de l'identifiant de ligne de chaque segment
+        max_dist (float): La distance maximale entre le point et la ligne
+        k (int, optional): Le nombre maximal de lignes candidates par point. Defaults to 5.
+        tree (cKDTree, optional): L'index des segments s'il est déjà calculé (voir segmentsTree)
+        max_length (float, optional): La longueur maximale des segments si elle est déjà connue
+        workers (int, optional): Nombre de threads pour la recherche du cKDTree (-1 = tous les processeurs). Defaults to 1.
+
+    Returns (tuple): (array des index des points, array des index des segments, array des distances)
+        triés par point puis par distance
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=float))
+    if len(points) == 0 or len(segments) == 0: return empty
+    if tree is None: tree = segmentsTree(segments)
+    if max_length is None: max_length = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1]).max()
+    candidates = tree.query_ball_point(points, r=max_dist + max_length / 2, workers=workers)
+    counts = np.fromiter((len(c) for c in candidates), dtype=np.int64, count=len(points))
+    if counts.sum() == 0: return empty
+    idx_pt = np.repeat(np.arange(len(points)), counts)
+    idx_seg = np.fromiter((i for c in candidates for i in c), dtype=np.int64, count=int(counts.sum()))
+    proj, _ = projectOnSegments(points[idx_pt], segments[idx_seg])
+    dist = np.hypot(*(points[idx_pt] - proj).T)
+    keep = dist <= max_dist
+    idx_pt, idx_seg, dist = idx_pt[keep], idx_seg[keep], dist[keep]
+    if len(dist) == 0: return empty
+    # Conserver le segment le plus proche de chaque ligne pour chaque point
+    lines = line_ids[idx_seg]
+    order = np.lexsort((dist, lines, idx_pt))
+    first = order[np.concatenate(([True], (idx_pt[order][1:] != idx_pt[order][:-1]) | (lines[order][1:] != lines[order][:-1])))]
+    idx_pt, idx_seg, dist = idx_pt[first], idx_seg[first], dist[first]
+    # Conserver les k lignes les plus proches de chaque point
+    order = np.lexsort((dist, idx_pt))
+    idx_pt, idx_seg, dist = idx_pt[order], idx_seg[order], dist[order]
+    starts = np.searchsorted(idx_pt, idx_pt, side="left")
+    keep = np.arange(len(idx_pt)) - starts < k
+    return idx_pt[keep], idx_seg[keep], dist[keep]
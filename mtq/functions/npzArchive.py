@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import zipfile
+import datetime
+import tempfile
+import numpy as np
+from PyQt5.QtCore import QDate, QDateTime, QTime, Qt
+
+# Erreurs possibles à la lecture d'un fichier .npz absent, tronqué ou invalide
+NPZ_ERRORS = (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile)
+
+def encodeJsonValue(value):
+    """
+    Fonction à utiliser comme paramètre default de json.dumps pour les valeurs qui ne sont pas
+    des types JSON. Les dates (QDate, QDateTime, QTime, datetime) sont encodées avec leur type
+    pour être recréées par decodeJsonValue et les scalaires numpy sont convertis en types Python.
+
+    Args:
+        value: La valeur à encoder
+
+    Returns (dict | int | float | bool): La valeur encodée
+    """
+    if isinstance(value, np.generic): return value.item()
+    if isinstance(value, QDateTime): return {"__type__": "QDateTime", "value": value.toString(Qt.ISODateWithMs)}
+    if isinstance(value, QDate): return {"__type__": "QDate", "value": value.toString(Qt.ISODate)}
+    if isinstance(value, QTime): return {"__type__": "QTime", "value": value.toString(Qt.ISODateWithMs)}
+    # datetime est une sous-classe de date et doit être vérifié en premier
+    if isinstance(value, datetime.datetime): return {"__type__": "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date): return {"__type__": "date", "value": value.isoformat()}
+    if isinstance(value, datetime.time): return {"__type__": "time", "value": value.isoformat()}
+    # Les autres types seraient recréés comme du texte et sont donc refusés
+    raise TypeError(f"La valeur {value!r} de type {type(value).__name__} ne peut pas être enregistrée")
+
+def decodeJsonValue(obj:dict):
+    """
+    Fonction à utiliser comme paramètre object_hook de json.loads pour recréer les valeurs
+    encodées par encodeJsonValue.
+
+    Args:
+        obj (dict): Le dictionnaire lu
+
+    Returns: La valeur recréée ou le dictionnaire s'il ne contient pas une valeur encodée
+    """
+    if set(obj) != {"__type__", "value"}: return obj
+    kind, value = obj["__type__"], obj["value"]
+    if kind == "QDateTime": return QDateTime.fromString(value, Qt.ISODateWithMs)
+    if kind == "QDate": return QDate.fromString(value, Qt.ISODate)
+    if kind == "QTime": return QTime.fromString(value, Qt.ISODateWithMs)
+    if kind == "datetime": return datetime.datetime.fromisoformat(value)
+    if kind == "date": return datetime.date.fromisoformat(value)
+    if kind == "time": return datetime.time.fromisoformat(value)
+    return obj
+
+def saveNpz(file_path:str, **arrays):
+    """
+    Fonction qui permet d'enregistrer des arrays dans un fichier .npz compressé.
+    Le fichier est écrit dans un fichier temporaire du même dossier puis le remplace en une seule
+    opération, un fichier existant n'est donc jamais laissé tronqué si l'écriture est interrompue.
+
+    Args:
+        file_path (str): Le chemin du fichier .npz
+        arrays: Les arrays à enregistrer par nom
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    # Créer le dossier du fichier s'il n'existe pas
+    os.makedirs(folder, exist_ok=True)
+    file_id, temp_path = tempfile.mkstemp(suffix=".npz.tmp", dir=folder)
+    try:
+        with os.fdopen(file_id, "wb") as file: np.savez_compressed(file, **arrays)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path): os.remove(temp_path)
+        raise
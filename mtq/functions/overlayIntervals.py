@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+def overlayIntervals(chainages_d, chainages_f):
+    """
+    Fonction qui permet de superposer des intervalles [chainage_d, chainage_f) par balayage (sweep line).
+    Les chainages de début et de fin de tous les intervalles forment les points de segmentation et chaque
+    intervalle est associé aux intervalles élémentaires qu'il couvre. Les intervalles de longueur nulle sont ignorés.
+
+    Args:
+        chainages_d (array): Les chainages de début des intervalles
+        chainages_f (array): Les chainages de fin des intervalles
+
+    Returns (tuple): (array ordonné des chainages de segmentation,
+                      array de l'index de l'intervalle élémentaire de chaque élément,
+                      array de l'index de l'intervalle en entrée de chaque élément)
+    """
+    chainages_d = np.asarray(chainages_d, dtype=float)
+    chainages_f = np.asarray(chainages_f, dtype=float)
+    # Accepter les intervalles dans le sens inverse du chainage
+    start, end = np.minimum(chainages_d, chainages_f), np.maximum(chainages_d, chainages_f)
+    events = np.flatnonzero(end > start)
+    start, end = start[events], end[events]
+    breaks = np.unique(np.concatenate((start, end)))
+    # Position du début et de la fin de chaque intervalle dans les points de segmentation
+    idx_start, idx_end = np.searchsorted(breaks, start), np.searchsorted(breaks, end)
+    counts = idx_end - idx_start
+    # Un élément pour chaque intervalle élémentaire couvert par un intervalle en entrée
+    rows_event = np.repeat(events, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows_interval = np.repeat(idx_start, counts) + offsets
+    # Ordonner les éléments par intervalle élémentaire en conservant l'ordre des intervalles en entrée
+    order = np.argsort(rows_interval, kind="stable")
+    return breaks, rows_interval[order], rows_event[order]
@@ -7,6 +7,8 @@ from collections import Counter
 # Importer les fonction de formatage du module
 from ..functions.format import verifyFormatPoint
 from ..functions.layer import validateLayer
+from ..functions.geometryArrays import polylineToArrays
+from ..functions.nearestLines import linesToSegments, segmentsTree, nearestLines, projectOnSegments
 
 from ..search.SearchEngine import SearchEngine
 
@@ -57,6 +59,8 @@ class Geocodage:
         self.nom_champ_long = nom_champ_long
         self.nom_champ_chainage_d = nom_champ_chainage_d
         self.spatial_index = None
+        # Index vectorisé des segments des RTSS (voir getSegmentsIndex)
+        self.segments_index = None
         self.setPrecision(precision)
         # Référence des RTSS
         self.dict_rtss:Dict[RTSS, FeatRTSS] = {}
@@ -364,6 +368,61 @@ class Geocodage:
         """ Retourne le CRS courrant de l'object """
         return self.crs
     
+    def getSegmentsIndex(self)->dict:
+        """
+        Méthode qui permet de retourner l'index vectorisé des segments des RTSS.
+        L'index est créé à la première utilisation et conservé jusqu'à la prochaine mise à jour des RTSS.
+
+        Return (dict): Les arrays des segments, identifiants, mesures, cKDTree et informations des RTSS
+        """
+        if self.segments_index is not None: return self.segments_index
+        list_feat_rtss = list(self.dict_rtss.values())
+        # Les RTSS sont placés un à un pour que numpy ne les convertisse pas
+        list_rtss = np.empty(len(self.dict_rtss), dtype=object)
+        for i, rtss in enumerate(self.dict_rtss): list_rtss[i] = rtss
+        lines = {i: polylineToArrays(feat_rtss.geometry()) for i, feat_rtss in enumerate(list_feat_rtss)}
+        segments, ids, measures = linesToSegments(lines, return_measures=True)
+        lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        self.segments_index = {
+            "segments": segments,
+            "ids": ids,
+            "measures": measures,
+            "tree": segmentsTree(segments) if len(segments) > 0 else None,
+            "max_length": float(lengths.max()) if len(lengths) > 0 else 0.0,
+            "rtss": list_rtss,
+            "lengths": np.array([feat_rtss.length() for feat_rtss in list_feat_rtss], dtype=float),
+            "chainages_d": np.array([float(feat_rtss.chainageDebut()) for feat_rtss in list_feat_rtss], dtype=float),
+            "chainages_f": np.array([float(feat_rtss.chainageFin()) for feat_rtss in list_feat_rtss], dtype=float)}
+        return self.segments_index
+
+    def getProjectionsOnSegments(self, points, seg_idx, distances):
+        """
+        Méthode qui permet de calculer en lot la projection de points sur des segments de l'index des RTSS (voir getSegmentsIndex).
+
+        Args:
+            - points (array): Array (n, 2) des coordonnées des points
+            - seg_idx (array): Array (n) des index des segments de chaque point
+            - distances (array): Array (n) des distances entre les points et les segments
+
+        Return (tuple): (array (n) des index des RTSS, array (n) des longueurs le long des RTSS,
+            array (n) des chainages, array (n) des offsets positifs à droite et négatifs à gauche)
+        """
+        index = self.getSegmentsIndex()
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        segments, ids = index["segments"][seg_idx], index["ids"][seg_idx]
+        # Longueur le long du RTSS jusqu'au point projeté
+        _, t = projectOnSegments(points, segments)
+        long = index["measures"][seg_idx] + t * np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        # Même correction longueur -> chainage que FeatRTSS.getChainageFromLong
+        length, chainage_d, chainage_f = index["lengths"][ids], index["chainages_d"][ids], index["chainages_f"][ids]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            chainage = np.where(long >= length, chainage_f, np.where(chainage_d >= long, chainage_d, chainage_f * long / length))
+        # Côté du point par rapport au segment (1 = droite, -1 = gauche)
+        cross = ((segments[:, 2] - segments[:, 0]) * (points[:, 1] - segments[:, 1]) -
+                 (segments[:, 3] - segments[:, 1]) * (points[:, 0] - segments[:, 0]))
+        offset = np.asarray(distances, dtype=float) * np.where(cross > 0, -1.0, np.where(cross < 0, 1.0, 0.0))
+        return ids, long, chainage, offset
+
     def getRTSSById(self, id):
         # Vérifier si le RTSS existe dans le dictionnaire 
         try: return self.dict_rtss[self.dict_ids[id]]
@@ -625,6 +684,40 @@ class Geocodage:
         else: feat_rtss = self.nearestRTSSFromPoint(geom_point)
         return feat_rtss.geocoderInversePoint(geom_point)
     
+    def geocoderInversePoints(self, points, dist_max=None, workers=1):
+        """
+        Méthode qui permet d'associer en lot un RTSS/chainage/offset à des coordonnées.
+        Le segment de RTSS le plus proche de chaque point est trouvé avec un index vectorisé
+        des segments des RTSS (voir getSegmentsIndex) au lieu d'une recherche par point.
+
+        Args:
+            - points (array): Array (n, 2) des coordonnées des points
+            - dist_max (float): La distance maximale du RTSS. Defaults to None (aucune limite).
+            - workers (int): Nombre de threads pour la recherche de l'index (-1 = tous les processeurs). Defaults to 1.
+
+        Return (tuple): (array (n) des RTSS ou None, array (n) des chainages ou nan, array (n) des offsets ou nan)
+            Le offset est positif à droite et négatif à gauche du RTSS.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        list_rtss = np.full(len(points), None, dtype=object)
+        chainages, offsets = np.full(len(points), np.nan), np.full(len(points), np.nan)
+        index = self.getSegmentsIndex()
+        if len(points) == 0 or len(index["segments"]) == 0: return list_rtss, chainages, offsets
+        nearest, distances = nearestLines(
+            points,
+            index["segments"],
+            max_dist=dist_max,
+            tree=index["tree"],
+            max_length=index["max_length"],
+            workers=workers)
+        found = np.flatnonzero(nearest != -1)
+        if len(found) == 0: return list_rtss, chainages, offsets
+        ids, _, chainage, offset = self.getProjectionsOnSegments(points[found], nearest[found], distances[found])
+        list_rtss[found] = index["rtss"][ids]
+        chainages[found] = chainage
+        offsets[found] = offset
+        return list_rtss, chainages, offsets
+
     def geocoderInverseLine(self, geom_line:QgsGeometry, rtss=None, methode=1):
         """
         Convertir une geometry en objet LineRTSS
@@ -895,6 +988,8 @@ class Geocodage:
         if nom_champ_rtss: self.nom_champ_rtss = nom_champ_rtss
         if nom_champ_long: self.nom_champ_long = nom_champ_long
         self.nom_champ_chainage_d = nom_champ_chainage_d
+        # L'index des segments sera recréé au besoin
+        self.segments_index = None
         # Dictionnaire utiliser pour la recherche par RTSS
         dict_index = {}
         # Définir le nouveau CRS si défini
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ..functions.nearestLines import candidateLines
+from .Geocodage import Geocodage
+
+class MapMatcher:
+    """
+    Permet d'associer en continu un flux de points GPS horodatés aux RTSS avec un modèle de Markov caché.
+    Les candidats de chaque point sont les RTSS à proximité (voir candidateLines) et les transitions
+    utilisent la distance le long des RTSS et les connexions entre les extrémités des RTSS.
+    Le chemin le plus probable est calculé avec un algorithme de Viterbi à délai fixe: les points sont
+    retournés dès qu'ils sont à plus de lag points du dernier point reçu et la mémoire utilisée reste bornée.
+    """
+
+    def __init__(self,
+                 geocode:Geocodage,
+                 dist_max=50,
+                 sigma=10,
+                 beta=20,
+                 max_candidates=5,
+                 lag=10,
+                 connect_dist=5,
+                 jump_penalty=200,
+                 break_time=60,
+                 workers=1):
+        """
+        Initialisation d'un objet MapMatcher.
+
+        Args:
+            - geocode (Geocodage): L'objet de géocodage des RTSS
+            - dist_max (real): La distance maximale entre un point et un RTSS candidat. Defaults to 50.
+            - sigma (real): L'écart type de l'erreur de position des points GPS. Defaults to 10.
+            - beta (real): L'échelle de l'écart accepté entre la distance à vol d'oiseau et la distance le long des RTSS. Defaults to 20.
+            - max_candidates (int): Le nombre maximal de RTSS candidats par point. Defaults to 5.
+            - lag (int): Le nombre de points conservés avant de fixer le résultat d'un point. Defaults to 10.
+            - connect_dist (real): La distance maximale entre deux extrémités de RTSS connectées. Defaults to 5.
+            - jump_penalty (real): L'écart utilisé pour une transition entre deux RTSS non connectés. Defaults to 200.
+            - break_time (real): L'intervalle de temps qui coupe le chemin en deux. Defaults to 60.
+            - workers (int): Nombre de threads pour la recherche des candidats (-1 = tous les processeurs). Defaults to 1.
+        """
+        self.geocode = geocode
+        self.dist_max = dist_max
+        self.sigma = sigma
+        self.beta = beta
+        self.max_candidates = max_candidates
+        self.lag = lag
+        self.connect_dist = connect_dist
+        self.jump_penalty = jump_penalty
+        self.break_time = break_time
+        self.workers = workers
+        self.index = geocode.getSegmentsIndex()
+        self.setTopology()
+        self.reset()
+
+    def __str__(self): return f"MapMatcher ({len(self.pending)} points en attente)"
+
+    def __repr__(self): return self.__str__()
+
+    def emit(self, outputs:list, count:int):
+        """ Permet de fixer le résultat des count plus anciens points en attente à partir du meilleur état actuel """
+        if count <= 0 or not self.pending: return None
+        states = np.empty(len(self.pending), dtype=np.int64)
+        state = int(np.argmax(self.scores))
+        for i in range(len(self.pending) - 1, -1, -1):
+            states[i] = state
+            state = self.pending[i][3][state]
+        for i in range(count):
+            rids, chainages, offsets, _ = self.pending[i]
+            outputs.append((self.index["rtss"][rids[states[i]]], chainages[states[i]], offsets[states[i]]))
+        del self.pending[:count]
+
+    def flush(self)->tuple:
+        """
+        Permet de fixer le résultat de tous les points en attente et de terminer le chemin actuel.
+
+        Return (tuple): (array des RTSS, array des chainages, array des offsets) des points en attente
+        """
+        outputs = []
+        self.emit(outputs, len(self.pending))
+        self.reset()
+        return self.toArrays(outputs)
+
+    def getTransitions(self, xy, rids, longs, valid):
+        """
+        Permet de calculer en lot les log-probabilités de transition entre les candidats de points consécutifs.
+
+        Args:
+            - xy (array): Array (n+1, 2) des points, le premier est le dernier point reçu
+            - rids (array): Array (n+1, k) des index des RTSS candidats
+            - longs (array): Array (n+1, k) des longueurs le long des RTSS candidats
+            - valid (array): Array (n+1, k) des candidats existants
+
+        Return (array): Array (n, k, k) des log-probabilités entre les candidats du point précédent et ceux du point
+        """
+        straight = np.hypot(*(xy[1:] - xy[:-1]).T)[:, None, None]
+        rid_a, rid_b = rids[:-1, :, None], rids[1:, None, :]
+        long_a, long_b = longs[:-1, :, None], longs[1:, None, :]
+        route = np.where(rid_a == rid_b, np.abs(long_b - long_a), np.inf)
+        # Chemin par une connexion entre les extrémités de deux RTSS
+        if len(self.connections["keys"]) > 0:
+            keys = np.broadcast_to(rid_a * len(self.index["rtss"]) + rid_b, route.shape)
+            start = np.searchsorted(self.connections["keys"], keys, side="left")
+            end = np.searchsorted(self.connections["keys"], keys, side="right")
+            long_a, long_b = np.broadcast_to(long_a, route.shape), np.broadcast_to(long_b, route.shape)
+            for i in range(self.connections["multiplicity"]):
+                idx = start + i
+                found = (idx < end) & (rid_a != rid_b)
+                idx = np.where(found, idx, 0)
+                dist = (np.abs(self.connections["longs_a"][idx] - long_a) + self.connections["gaps"][idx] +
+                        np.abs(long_b - self.connections["longs_b"][idx]))
+                route = np.where(found, np.minimum(route, dist), route)
+        diff = np.where(np.isfinite(route), np.abs(straight - route), self.jump_penalty)
+        trans = -diff / self.beta
+        return np.where(valid[:-1, :, None] & valid[1:, None, :], trans, -np.inf)
+
+    def matchStream(self, stream, batch_size=1000):
+        """
+        Générateur qui permet d'associer un flux de points aux RTSS.
+        Le flux est lu dans un thread et les points déjà reçus sont traités ensemble (au plus batch_size).
+        Un flux en temps réel est donc traité point par point et le résultat de chaque point est retourné
+        dès qu'il est à lag points du dernier point reçu, alors qu'un flux enregistré est traité en lots.
+
+        Args:
+            - stream (iterable): Les points (x, y) ou (x, y, temps)
+            - batch_size (int): Le nombre maximal de points traités en lot. Defaults to 1000.
+
+        Yield (tuple): (RTSS ou None, chainage ou nan, offset ou nan) de chaque point dans l'ordre reçu
+        """
+        received = queue.Queue(maxsize=batch_size)
+        stop = threading.Event()
+        end, errors = object(), []
+
+        def send(item):
+            # Attendre une place dans la file tant que le générateur n'est pas fermé
+            while not stop.is_set():
+                try: received.put(item, timeout=0.1); return True
+                except queue.Full: continue
+            return False
+
+        def read():
+            try:
+                for point in stream:
+                    if not send(point): return
+            except Exception as error: errors.append(error)
+            send(end)
+
+        threading.Thread(target=read, daemon=True).start()
+        try:
+            finished = False
+            while not finished:
+                # Attendre un point puis prendre tous les points déjà reçus
+                batch = [received.get()]
+                while batch[-1] is not end and len(batch) < batch_size:
+                    try: batch.append(received.get_nowait())
+                    except queue.Empty: break
+                finished = batch[-1] is end
+                if finished: batch.pop()
+                if batch: yield from zip(*self.pushRows(batch))
+            if errors: raise errors[0]
+            yield from zip(*self.flush())
+        finally: stop.set()
+
+    def push(self, points, times=None)->tuple:
+        """
+        Permet d'ajouter un lot de points au flux et de retourner les points dont le résultat est fixé.
+        Les points sans RTSS candidat et les intervalles de temps plus grands que break_time coupent le chemin.
+
+        Args:
+            - points (array): Array (n, 2) des coordonnées des points
+            - times (array): Array (n) du temps des points en secondes. Defaults to None (aucune coupure de temps).
+
+        Return (tuple): (array des RTSS ou None, array des chainages ou nan, array des offsets ou nan)
+            des points fixés dans l'ordre reçu
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        nbr, k = len(points), self.max_candidates
+        outputs = []
+        if nbr == 0: return self.toArrays(outputs)
+        # Candidats de chaque point dans des arrays (n, k)
+        idx_pt, idx_seg, dist = candidateLines(
+            points,
+            self.index["segments"],
+            self.index["ids"],
+            self.dist_max,
+            k=k,
+            tree=self.index["tree"],
+            max_length=self.index["max_length"],
+            workers=self.workers)
+        rank = np.arange(len(idx_pt)) - np.searchsorted(idx_pt, idx_pt, side="left")
+        ids, long, chainage, offset = self.geocode.getProjectionsOnSegments(points[idx_pt], idx_seg, dist)
+        rids, longs = np.full((nbr + 1, k), -1, dtype=np.int64), np.zeros((nbr + 1, k))
+        chainages, offsets = np.full((nbr, k), np.nan), np.full((nbr, k), np.nan)
+        emissions = np.full((nbr, k), -np.inf)
+        rids[idx_pt + 1, rank], longs[idx_pt + 1, rank] = ids, long
+        chainages[idx_pt, rank], offsets[idx_pt, rank] = chainage, offset
+        emissions[idx_pt, rank] = -0.5 * (dist / self.sigma) ** 2
+        counts = np.bincount(idx_pt, minlength=nbr)
+        # Le dernier point reçu précède le lot
+        xy = np.vstack((points[:1] if self.last is None else self.last[0], points))
+        if self.last is not None: rids[0], longs[0] = self.last[1], self.last[2]
+        transitions = self.getTransitions(xy, rids, longs, rids != -1)
+        gaps = np.zeros(nbr, dtype=bool)
+        if times is not None:
+            times = np.asarray(times, dtype=float)
+            previous = np.concatenate(([np.nan if self.last is None else self.last[3]], times[:-1]))
+            gaps = times - previous > self.break_time
+        else: times = np.full(nbr, np.nan)
+        no_back = np.full(k, -1, dtype=np.int64)
+        columns = np.arange(k)
+        for i in range(nbr):
+            if counts[i] == 0:
+                # Un point sans candidat termine le chemin
+                self.emit(outputs, len(self.pending))
+                self.scores, self.last = None, None
+                outputs.append((None, np.nan, np.nan))
+                continue
+            if self.scores is None or gaps[i]:
+                self.emit(outputs, len(self.pending))
+                self.scores, back = emissions[i], no_back
+            else:
+                total = self.scores[:, None] + transitions[i]
+                back = np.argmax(total, axis=0)
+                self.scores = total[back, columns] + emissions[i]
+                self.scores = self.scores - self.scores.max()
+            self.pending.append((rids[i + 1], chainages[i], offsets[i], back))
+            self.last = (points[i:i + 1], rids[i + 1], longs[i + 1], times[i])
+            # Fixer le point à lag points du point reçu, le résultat ne dépend donc pas de la taille des lots
+            if len(self.pending) > self.lag: self.emit(outputs, len(self.pending) - self.lag)
+        return self.toArrays(outputs)
+
+    def pushRows(self, rows:list)->tuple:
+        """ Permet d'ajouter un lot de points (x, y) ou (x, y, temps) au flux (voir push) """
+        rows = np.asarray(rows, dtype=float)
+        return self.push(rows[:, :2], rows[:, 2] if rows.shape[1] > 2 else None)
+
+    def reset(self):
+        """ Permet de recommencer un nouveau flux de points sans fixer les points en attente """
+        # Les points en attente [(index des RTSS, chainages, offsets, meilleur candidat précédent)]
+        self.pending = []
+        self.scores = None
+        # Le dernier point reçu (coordonnées, index des RTSS, longueurs, temps)
+        self.last = None
+
+    def setTopology(self):
+        """ Permet de définir les connexions entre les extrémités des RTSS à moins de connect_dist """
+        segments, ids, measures = self.index["segments"], self.index["ids"], self.index["measures"]
+        nbr_rtss = len(self.index["rtss"])
+        self.connections = {"keys": np.empty(0, dtype=np.int64), "multiplicity": 0}
+        if len(segments) == 0: return None
+        rtss_ids, first = np.unique(ids, return_index=True)
+        last = len(ids) - 1 - np.unique(ids[::-1], return_index=True)[1]
+        seg_lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        # Extrémités de début et de fin de chaque RTSS et leur longueur le long du RTSS
+        points = np.vstack((segments[first, :2], segments[last, 2:]))
+        point_ids = np.concatenate((rtss_ids, rtss_ids))
+        point_longs = np.concatenate((measures[first], measures[last] + seg_lengths[last]))
+        pairs = cKDTree(points).query_pairs(self.connect_dist, output_type="ndarray")
+        pairs = pairs[point_ids[pairs[:, 0]] != point_ids[pairs[:, 1]]]
+        # Les connexions sont dans les deux directions
+        a, b = np.concatenate((pairs[:, 0], pairs[:, 1])), np.concatenate((pairs[:, 1], pairs[:, 0]))
+        keys = point_ids[a] * nbr_rtss + point_ids[b]
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.connections = {
+            "keys": keys,
+            "longs_a": point_longs[a][order],
+            "longs_b": point_longs[b][order],
+            "gaps": np.hypot(*(points[a] - points[b]).T)[order],
+            "multiplicity": int(np.unique(keys, return_counts=True)[1].max()) if len(keys) > 0 else 0}
+
+    def toArrays(self, outputs:list)->tuple:
+        """ Permet de convertir une liste de résultats (RTSS, chainage, offset) en arrays """
+        list_rtss = np.empty(len(outputs), dtype=object)
+        for i, output in enumerate(outputs): list_rtss[i] = output[0]
+        chainages = np.array([output[1] for output in outputs], dtype=float)
+        offsets = np.array([output[2] for output in outputs], dtype=float)
+        return list_rtss, chainages, offsets
@@ -1 +1 @@
-__all__ = ["Chainage", "FeatRTSS", "LineRTSS", "PointRTSS", "RTSS", "PolygonRTSS", "Geocodage"]
\ No newline at end of file
+__all__ = ["Chainage", "FeatRTSS", "LineRTSS", "PointRTSS", "RTSS", "PolygonRTSS", "Geocodage", "MapMatcher"]
\ No newline at end of file
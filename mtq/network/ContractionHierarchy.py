@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+import json
+import heapq
+import numpy as np
+from ..functions.npzArchive import saveNpz
+
+class ContractionHierarchy:
+    """
+    Hiérarchie de contraction d'un graph orienté avec des noeuds entiers (0 à n-1).
+    Les noeuds sont contractés un à un en ajoutant des raccourcis qui conservent les plus courts chemins.
+    Une requête est une recherche bidirectionnelle qui monte seulement dans la hiérarchie
+    et visite donc une petite partie du graph.
+    """
+
+    def __init__(self, ranks:np.ndarray, up:tuple, down:tuple, metadata:dict=None):
+        """
+        Initialisation d'une hiérarchie de contraction (voir fromEdges).
+
+        Args:
+            - ranks (np.ndarray): Le rang de contraction de chaque noeud
+            - up (tuple): Les arrays CSR (indptr, têtes, poids, milieux) des segments vers un noeud de rang supérieur
+            - down (tuple): Les arrays CSR (indptr, queues, poids, milieux) des segments qui arrivent d'un noeud de rang supérieur
+            - metadata (dict): Les informations à conserver avec la hiérarchie
+        """
+        self.ranks = ranks
+        self.up = up
+        self.down = down
+        self.metadata = metadata or {}
+        # Listes d'adjacence et milieux des raccourcis (voir prepare)
+        self.up_adj = None
+        self.down_adj = None
+        self.middles = None
+
+    def __str__(self): return f"ContractionHierarchy ({len(self.ranks)} noeuds, {len(self.up[1]) + len(self.down[1])} segments)"
+
+    def __repr__(self): return self.__str__()
+
+    @classmethod
+    def fromEdges(cls, nbr_nodes:int, tails, heads, weights, witness_limit=50, metadata:dict=None, feedback=None):
+        """
+        Permet de créer la hiérarchie de contraction d'un graph. Les segments de poids infini sont ignorés
+        et seulement le segment le plus court est conservé entre deux noeuds.
+        Les raccourcis de chaque noeud sont conservés avec sa priorité et recalculés seulement
+        lorsqu'un voisin a été contracté. La création reste coûteuse (recherches de témoins en Python):
+        environ 20 secondes pour une grille de 10 000 noeuds et 36 000 segments, qui est un cas défavorable
+        puisqu'une grille n'a pas de hiérarchie naturelle. Elle est faite une seule fois et devrait être
+        sauvegardée (voir save).
+
+        Args:
+            - nbr_nodes (int): Le nombre de noeuds du graph
+            - tails (array): Les noeuds d'origine des segments
+            - heads (array): Les noeuds de destination des segments
+            - weights (array): Les poids des segments
+            - witness_limit (int): Le nombre maximum de noeuds visités pour chercher un chemin témoin. Defaults to 50.
+            - metadata (dict): Les informations à conserver avec la hiérarchie
+            - feedback (QgsTask): Objet avec setProgress et isCanceled pour suivre la création. Defaults to None.
+
+        Returns (ContractionHierarchy): La hiérarchie ou None si la création est annulée
+        """
+        inf = float("inf")
+        out_adj = [dict() for _ in range(nbr_nodes)]
+        in_adj = [dict() for _ in range(nbr_nodes)]
+        middles = {}
+        for tail, head, weight in zip(np.asarray(tails).tolist(), np.asarray(heads).tolist(), np.asarray(weights, dtype=float).tolist()):
+            if tail == head or not weight < inf: continue
+            if weight < out_adj[tail].get(head, inf):
+                out_adj[tail][head] = in_adj[head][tail] = weight
+                middles[(tail, head)] = -1
+
+        heappush, heappop = heapq.heappush, heapq.heappop
+        def witnessSearch(source, excluded, max_weight, targets):
+            # Recherche locale limitée d'un chemin qui ne passe pas par le noeud à contracter.
+            # La recherche s'arrête dès que toutes les cibles sont fixées ou que la limite est atteinte.
+            dist, heap, settled, remaining = {source: 0.0}, [(0.0, source)], 0, len(targets)
+            while heap and settled < witness_limit:
+                d, node = heappop(heap)
+                if d > dist[node]: continue
+                if node in targets:
+                    remaining -= 1
+                    if remaining == 0: break
+                settled += 1
+                for neighbor, weight in out_adj[node].items():
+                    nd = d + weight
+                    # Les noeuds plus loin que le plus long chemin par le noeud ne peuvent pas servir de témoin
+                    if nd > max_weight or neighbor == excluded: continue
+                    if nd < dist.get(neighbor, inf):
+                        dist[neighbor] = nd
+                        heappush(heap, (nd, neighbor))
+            return dist
+
+        def shortcuts(node):
+            # Raccourcis nécessaires pour contracter un noeud
+            outs = out_adj[node]
+            if not outs: return []
+            max_out = max(outs.values())
+            list_shortcuts = []
+            for tail, w_in in in_adj[node].items():
+                targets = outs.keys() - {tail}
+                if not targets: continue
+                dist = witnessSearch(tail, node, w_in + max_out, targets)
+                for head in targets:
+                    if dist.get(head, inf) > w_in + outs[head]: list_shortcuts.append((tail, head, w_in + outs[head]))
+            return list_shortcuts
+
+        # Profondeur de chaque noeud dans la hiérarchie (1 + profondeur du plus haut voisin contracté)
+        level = [0] * nbr_nodes
+        # Raccourcis de chaque noeud, recalculés seulement si un voisin a été contracté depuis (voir dirty)
+        cache = [None] * nbr_nodes
+        dirty = [False] * nbr_nodes
+        def priority(node):
+            # Différence d'arêtes + profondeur
+            cache[node], dirty[node] = shortcuts(node), False
+            return len(cache[node]) - len(in_adj[node]) - len(out_adj[node]) + level[node]
+
+        heap = [(priority(node), node) for node in range(nbr_nodes)]
+        heapq.heapify(heap)
+        ranks = np.full(nbr_nodes, -1, dtype=np.int64)
+        up_edges, down_edges = [None] * nbr_nodes, [None] * nbr_nodes
+        rank = 0
+        while heap:
+            _, node = heapq.heappop(heap)
+            if ranks[node] != -1: continue
+            # Mise à jour paresseuse de la priorité d'un noeud dont un voisin a été contracté
+            if dirty[node]:
+                value = priority(node)
+                if heap and value > heap[0][0]:
+                    heapq.heappush(heap, (value, node))
+                    continue
+            list_shortcuts = cache[node]
+            cache[node] = None
+            ranks[node] = rank
+            rank += 1
+            # Les segments restants du noeud vont vers des noeuds de rang supérieur
+            up_edges[node] = [(head, weight, middles[(node, head)]) for head, weight in out_adj[node].items()]
+            down_edges[node] = [(tail, weight, middles[(tail, node)]) for tail, weight in in_adj[node].items()]
+            # Retirer le noeud du graph restant
+            for tail in in_adj[node]:
+                del out_adj[tail][node]
+                level[tail] = max(level[tail], level[node] + 1)
+            for head in out_adj[node]:
+                del in_adj[head][node]
+                level[head] = max(level[head], level[node] + 1)
+            out_adj[node], in_adj[node] = {}, {}
+            # Ajouter les raccourcis
+            for tail, head, weight in list_shortcuts:
+                if weight < out_adj[tail].get(head, inf):
+                    out_adj[tail][head] = in_adj[head][tail] = weight
+                    middles[(tail, head)] = node
+            # Les raccourcis conservent les distances du graph restant, seulement les raccourcis
+            # des voisins dont les segments ont changé doivent être recalculés
+            for edge in down_edges[node] + up_edges[node]: dirty[edge[0]] = True
+            if feedback is not None and rank % 1000 == 0:
+                if feedback.isCanceled(): return None
+                feedback.setProgress(100 * rank / nbr_nodes)
+
+        return cls(ranks, cls.toCSR(up_edges), cls.toCSR(down_edges), metadata=metadata)
+
+    @classmethod
+    def load(cls, file_path:str):
+        """
+        Permet de charger une hiérarchie sauvegardée (voir save).
+
+        Args:
+            - file_path (str): Le chemin du fichier .npz
+
+        Returns (ContractionHierarchy): La hiérarchie chargée
+        """
+        with np.load(file_path, allow_pickle=False) as data:
+            up = tuple(data[f"up_{name}"] for name in ("indptr", "nodes", "weights", "middles"))
+            down = tuple(data[f"down_{name}"] for name in ("indptr", "nodes", "weights", "middles"))
+            return cls(data["ranks"], up, down, metadata=json.loads(str(data["metadata"])))
+
+    @staticmethod
+    def toCSR(edges:list):
+        """ Permet de convertir les listes [(noeud, poids, milieu)] de chaque noeud en arrays CSR """
+        counts = np.array([len(node_edges or []) for node_edges in edges], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        flat = [edge for node_edges in edges for edge in (node_edges or [])]
+        nodes = np.array([edge[0] for edge in flat], dtype=np.int64)
+        weights = np.array([edge[1] for edge in flat], dtype=float)
+        middles = np.array([edge[2] for edge in flat], dtype=np.int64)
+        return indptr, nodes, weights, middles
+
+    def prepare(self):
+        """ Permet de créer les listes d'adjacence et l'index des milieux des raccourcis utilisés par les requêtes """
+        if self.up_adj is not None: return None
+        self.up_adj, self.down_adj, self.middles = [], [], {}
+        for csr, adj, is_up in ((self.up, self.up_adj, True), (self.down, self.down_adj, False)):
+            indptr, nodes, weights, middles = (array.tolist() for array in csr)
+            for node in range(len(indptr) - 1):
+                start, end = indptr[node], indptr[node + 1]
+                adj.append(list(zip(nodes[start:end], weights[start:end])))
+                for other, middle in zip(nodes[start:end], middles[start:end]):
+                    if middle != -1: self.middles[(node, other) if is_up else (other, node)] = middle
+
+    def query(self, source:int, target:int, stats:dict=None):
+        """
+        Permet de trouver le plus court chemin entre deux noeuds.
+
+        Args:
+            - source (int): Le noeud de départ
+            - target (int): Le noeud d'arrivée
+            - stats (dict): Dictionnaire où ajouter le nombre de noeuds développés ("expanded"). Defaults to None.
+
+        Returns (tuple): (poids total, liste des noeuds du chemin) ou None s'il n'y a pas de chemin
+        """
+        self.prepare()
+        if source == target: return 0.0, [source]
+        inf = float("inf")
+        dists, parents = ({source: 0.0}, {target: 0.0}), ({source: -1}, {target: -1})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        adjs = (self.up_adj, self.down_adj)
+        best, meeting, settled = inf, -1, 0
+        while True:
+            # Continuer chaque recherche tant que son minimum est plus petit que le meilleur chemin
+            forward = heaps[0][0][0] < best if heaps[0] else False
+            backward = heaps[1][0][0] < best if heaps[1] else False
+            if not (forward or backward): break
+            side = 0 if forward and (not backward or heaps[0][0][0] <= heaps[1][0][0]) else 1
+            d, node = heapq.heappop(heaps[side])
+            dist = dists[side]
+            if d > dist[node]: continue
+            other = dists[1 - side].get(node, None)
+            if other is not None and d + other < best: best, meeting = d + other, node
+            # Ne pas développer un noeud atteint plus court par un noeud de rang supérieur (stall-on-demand),
+            # les segments de l'autre direction donnent justement ces noeuds
+            if any(dist.get(neighbor, inf) + weight < d for neighbor, weight in adjs[1 - side][node]): continue
+            settled += 1
+            for neighbor, weight in adjs[side][node]:
+                nd = d + weight
+                if nd < dist.get(neighbor, inf):
+                    dist[neighbor] = nd
+                    parents[side][neighbor] = node
+                    heapq.heappush(heaps[side], (nd, neighbor))
+        if stats is not None: stats["expanded"] = settled
+        if meeting == -1: return None
+        # Chemin de la source au point de rencontre, puis jusqu'à la cible
+        path, node = [], meeting
+        while node != -1:
+            path.append(node)
+            node = parents[0][node]
+        path.reverse()
+        node = parents[1][meeting]
+        while node != -1:
+            path.append(node)
+            node = parents[1][node]
+        return best, self.unpack(path)
+
+    def save(self, file_path:str):
+        """
+        Permet de sauvegarder la hiérarchie dans un fichier .npz. Le fichier est remplacé
+        seulement une fois l'écriture complétée (voir saveNpz).
+
+        Args:
+            - file_path (str): Le chemin du fichier
+        """
+        arrays = {"ranks": self.ranks, "metadata": np.array(json.dumps(self.metadata))}
+        for prefix, csr in (("up", self.up), ("down", self.down)):
+            for name, array in zip(("indptr", "nodes", "weights", "middles"), csr): arrays[f"{prefix}_{name}"] = array
+        saveNpz(file_path, **arrays)
+
+    def unpack(self, path:list)->list:
+        """ Permet de remplacer les raccourcis d'un chemin par les noeuds contractés qu'ils représentent """
+        unpacked, stack = [path[0]], list(reversed(list(zip(path[:-1], path[1:]))))
+        while stack:
+            tail, head = stack.pop()
+            middle = self.middles.get((tail, head), -1)
+            if middle == -1: unpacked.append(head)
+            else: stack.extend([(middle, head), (tail, middle)])
+        return unpacked
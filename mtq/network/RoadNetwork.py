@@ -1,10 +1,29 @@
 from qgis.core import (QgsSpatialIndex, QgsWkbTypes, QgsVectorLayer,
     QgsVectorLayerUtils, QgsGeometry, QgsPointXY, QgsField, QgsProject, QgsFeature)
 from PyQt5.QtCore import QVariant
+import os
+import sys
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from functools import partial
+import threading
+import heapq
+import time
+import random
+import math
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 try: import networkx as nx
 except: pass
 
 from ..functions.layer import validateLayer
+from ..functions.nearestLines import segmentsTree, nearestLines
+from ..functions.npzArchive import NPZ_ERRORS, encodeJsonValue, decodeJsonValue, saveNpz
+from .ContractionHierarchy import ContractionHierarchy
 
 from ..param import (
     DEFAULT_NOM_COUCHE_ROUTE,
@@ -14,14 +33,63 @@ from ..param import (
     DEFAULT_GESTION_FIELD,
     DEFAULT_CAMIONNAGE_FIELD)
 
+# Réseau utilisé par les processus de calcul des détours (voir RoadNetwork.detourAnalysis)
+WORKER_NETWORK = None
+
+def initDetourWorker(network):
+    """ Permet de définir le réseau d'un processus de calcul des détours """
+    global WORKER_NETWORK
+    WORKER_NETWORK = network
+
+def getPythonExecutable():
+    """
+    Permet de retourner l'interpréteur Python à utiliser pour démarrer les processus de calcul.
+    Dans QGIS, sys.executable est l'application QGIS et non l'interpréteur Python fourni avec QGIS.
+
+    Returns (str): Le chemin de l'interpréteur ou None s'il n'est pas trouvé
+    """
+    if os.path.basename(sys.executable).lower().startswith("python"): return sys.executable
+    for name in ("python.exe", "pythonw.exe", os.path.join("bin", "python3"), os.path.join("bin", "python")):
+        path = os.path.join(sys.exec_prefix, name)
+        if os.path.isfile(path): return path
+    return None
+
+def detourWorker(jobs:list, gestion=[], camionnage=[], methode="dijkstra", network=None)->list:
+    """
+    Permet de calculer un lot de détours avec le réseau du processus.
+
+    Args:
+        jobs (list): Liste des (identifiant de route, noeud de départ, noeud de fin)
+        gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+        camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+        methode (str, optional): L'algorithme de recherche (voir shortestPath). Defaults to "dijkstra".
+        network (RoadNetwork, optional): Le réseau à utiliser. Defaults to None (réseau du processus).
+
+    Returns (list): Le (poids, longueur) de chaque détour, inf s'il n'y a pas de détour
+    """
+    network = network or WORKER_NETWORK
+    results = []
+    for route_id, start_node, end_node in jobs:
+        result = network.shortestPath(start_node, end_node, gestion=gestion, camionnage=camionnage, methode=methode, blocked=[route_id])
+        if result is None: results.append((np.inf, np.inf))
+        else: results.append((result[0], float(network.edges["lengths"][result[1]].sum())))
+    return results
+
 class RoadNetwork:
     """
     Objet qui permet de calculer des itinéraires et des chemin de détour à partir
     de la couche d'AQ parcours.
+
+    Le réseau est conservé sous une forme compacte: les noeuds ont un identifiant entier
+    et des coordonnées dans un array, les segments sont des arrays typés par attribut
+    et les recherches utilisent des listes d'adjacence CSR. networkx est seulement
+    utilisé pour exporter le graph (voir getGraph).
     """
+    # Les attributs par segment du réseau
+    EDGE_FIELDS = ("tails", "heads", "keys", "ids", "lengths", "speeds", "gestion", "direction", "camionnage", "forward", "vertex_d", "vertex_f")
 
     def __init__(self):
-        # Créer un graph vide pour le réseau
+        # Graph networkx créé seulement sur demande (voir getGraph)
         self.graph = None
         # Référence à la couche des routes pour le réseau
         self.roads_layer = None
@@ -29,10 +97,39 @@ class RoadNetwork:
         self.feature_dict = {}
         # Le chemin vers le style à utiliser pour le résultat
         self.style = "C:/Users/xbourbeau/Desktop/Network/detour.qml"
-        # Liste des obstacles du réseau
+        # Segments bloqués par chaque obstacle {id: [segments]}
         self.obstacles = {}
         # Index spatial du réseau routier
         self.road_spatial_index = None
+        # Coordonnées des noeuds (n, 2) et identifiant de chaque coordonnée {(x, y): noeud}
+        self.nodes_xy = np.empty((0, 2), dtype=float)
+        self.nodes_ids = {}
+        # Index des noeuds pour l'accrochage des points (voir updateNodesIndex)
+        self.nodes_tree = None
+        # Index des géometries des segments pour l'accrochage aux segments (voir getSnapIndex)
+        self.snap_index = None
+        # Noeuds qui ont au moins un segment non bloqué
+        self.active_nodes = None
+        # Attributs des segments par nom (voir EDGE_FIELDS)
+        self.edges = RoadNetwork.emptyEdges()
+        # Géometries des routes: sommets de la route i dans roads_coords[roads_offsets[i]:roads_offsets[i + 1]]
+        self.roads_ids = np.empty(0, dtype=np.int64)
+        self.roads_offsets = np.zeros(1, dtype=np.int64)
+        self.roads_coords = np.empty((0, 2), dtype=float)
+        self.roads_rows = {}
+        # Index des segments par identifiant d'entité {id: [segments]}
+        self.edges_index = {}
+        # Listes d'adjacence CSR des segments (voir getAdjacency)
+        self.adjacency = None
+        # Poids précalculés par profil de routage {(gestion, camionnage): (array, liste)}
+        self.profiles = {}
+        self.profiles_lock = threading.Lock()
+        # Facteur de l'heuristique A* (poids minimum par mètre en ligne droite)
+        self.heuristic_factor = None
+        # Hiérarchies de contraction par profil de routage
+        self.hierarchies = {}
+        # Matrices CSR des poids et longueurs par profil de routage (voir getCSRMatrix)
+        self.csr_matrices = {}
         # Vérifier que les imports sont valide
         self.checkImports()
 
@@ -41,47 +138,214 @@ class RoadNetwork:
             cls,
             roads_layer_name:str=DEFAULT_NOM_COUCHE_ROUTE,
             key_field:str=DEFAULT_KEY_FIELD,
-            direction_field:str=DEFAULT_DIRECTION_FIELD, 
+            direction_field:str=DEFAULT_DIRECTION_FIELD,
             speed_field:str=DEFAULT_SPEED_FIELD,
-            gestion_field:str=DEFAULT_GESTION_FIELD):
+            gestion_field:str=DEFAULT_GESTION_FIELD,
+            layer_camionnage:QgsVectorLayer=None,
+            field_class:str=DEFAULT_CAMIONNAGE_FIELD,
+            cache_path:str=None):
         """
         Permet de générer le réseau à partir de la couche de route dans le projet.
 
         Args:
-            roads_layer_name (str): Le nom de la couche des routes 
+            roads_layer_name (str): Le nom de la couche des routes
             key_field (str, optional): Le champs d'identifiant unique. Defaults to DEFAULT_KEY_FIELD.
             direction_field (str, optional): Le champs qui indique la direction de circulation. Defaults to DEFAULT_DIRECTION_FIELD.
             speed_field (str, optional): Le champs qui indique la vitesse sur le segment. Defaults to DEFAULT_SPEED_FIELD.
             gestion_field (str, optional): Le champs qui indique l'autoritée responsable de la gestion du segment. Defaults to DEFAULT_GESTION_FIELD.
+            layer_camionnage (QgsVectorLayer, optional): La couche de camionnage à joindre (voir addCamionnage). Defaults to None.
+            field_class (str, optional): Le champ qui contient l'information de cammionnage. Defaults to DEFAULT_CAMIONNAGE_FIELD.
+            cache_path (str, optional): Le fichier .npz du réseau enregistré. Le réseau est rechargé s'il correspond
+                toujours aux couches, sinon il est généré puis enregistré. Defaults to None.
         """
-        # Créer l'objet RoadNetwork
-        network = cls()
         # Valider la couche de AQ parcours dans le projet
         layer_route = validateLayer(
             roads_layer_name,
             [key_field, direction_field, speed_field, gestion_field],
             geom_type=1)
-        # Créer le réseau 
-        network.createNetwork(
-            layer_route,
-            key_field=key_field,
-            direction_field=direction_field, 
-            speed_field=speed_field,
-            gestion_field=gestion_field)
-        
+        fields = {
+            "key_field": key_field,
+            "direction_field": direction_field,
+            "speed_field": speed_field,
+            "gestion_field": gestion_field}
+        # Recharger le réseau enregistré s'il est toujours valide
+        if cache_path:
+            cache_key = cls.createCacheKey(layer_route, layer_camionnage=layer_camionnage, field_class=field_class, **fields)
+            network = cls.load(cache_path, roads_layer=layer_route, cache_key=cache_key)
+            if network is not None: return network
+        # Créer l'objet RoadNetwork
+        network = cls()
+        # Créer le réseau
+        network.createNetwork(layer_route, **fields)
+        if layer_camionnage is not None: network.addCamionnage(layer_camionnage, key_field=key_field, field_class=field_class)
+        if cache_path: network.save(cache_path, cache_key=cache_key)
+
+        return network
+
+    @classmethod
+    def load(cls, file_path:str, roads_layer:QgsVectorLayer=None, cache_key:dict=None):
+        """
+        Constructeur qui permet de recharger un réseau enregistré avec la méthode save, sans lire la couche des routes.
+        L'index spatial des routes est recréé à partir des géometries enregistrées.
+
+        Args:
+            file_path (str): Le chemin du fichier .npz
+            roads_layer (QgsVectorLayer, optional): La couche des routes utilisée pour générer le réseau. Defaults to None.
+            cache_key (dict, optional): La clé attendue (voir createCacheKey). Le réseau n'est pas
+                rechargé si la clé du fichier est différente ou si la clé n'a pas de date de modification.
+
+        Returns (RoadNetwork): Le réseau rechargé ou None si le fichier n'est pas valide
+        """
+        if not os.path.isfile(file_path): return None
+        # Une source sans date de modification ne peut pas être validée
+        if cache_key is not None and any(value is None for name, value in cache_key.items() if name.endswith("stamp")): return None
+        try:
+            with np.load(file_path, allow_pickle=False) as data:
+                header = json.loads(str(data["header"]), object_hook=decodeJsonValue)
+                # Vérifier que le fichier correspond à la clé
+                if cache_key is not None and header["cache_key"] != json.loads(
+                    json.dumps(cache_key, default=encodeJsonValue), object_hook=decodeJsonValue): return None
+                edges = {name: data[f"edges_{name}"] for name in RoadNetwork.EDGE_FIELDS if not name in header["values"]}
+                for name, values in header["values"].items():
+                    # Les valeurs des attributs d'objets sont encodées par dictionnaire
+                    edges[name] = RoadNetwork.objectArray(values)[data[f"codes_{name}"]] if len(values) else RoadNetwork.objectArray([])
+                nodes_xy = data["nodes_xy"]
+                road_ids, road_offsets, road_coords = data["road_ids"], data["road_offsets"], data["road_coords"]
+        except NPZ_ERRORS: return None
+        network = cls()
+        network.roads_layer = roads_layer
+        network.nodes_xy = nodes_xy
+        network.nodes_ids = {xy: node for node, xy in enumerate(map(tuple, nodes_xy.tolist()))}
+        network.edges = edges
+        for edge, feat_id in enumerate(edges["ids"].tolist()): network.edges_index.setdefault(feat_id, []).append(edge)
+        network.setRoadsGeometries(road_ids, road_offsets, road_coords)
+        network.updateNodesIndex()
         return network
 
+    @staticmethod
+    def createCacheKey(roads_layer:QgsVectorLayer, layer_camionnage:QgsVectorLayer=None, **kwargs)->dict:
+        """
+        Permet de créer la clé d'un réseau enregistré à partir des couches utilisées pour le générer.
+        La clé contient la source de chaque couche, sa date de modification (None si la source n'est pas un fichier)
+        et les paramètres utilisés pour générer le réseau.
+
+        Args:
+            roads_layer (QgsVectorLayer): La couche des routes
+            layer_camionnage (QgsVectorLayer, optional): La couche de camionnage jointe au réseau. Defaults to None.
+            kwargs: Les paramètres utilisés pour générer le réseau (ex: key_field="ID")
+        """
+        def layerKey(layer):
+            source = layer.source()
+            path = source.split("|")[0]
+            return source, os.path.getmtime(path) if os.path.isfile(path) else None
+
+        source, stamp = layerKey(roads_layer)
+        cache_key = {"source": source, "stamp": stamp}
+        if layer_camionnage is not None:
+            cache_key["camionnage_source"], cache_key["camionnage_stamp"] = layerKey(layer_camionnage)
+        return {**cache_key, **kwargs}
+
+    @staticmethod
+    def readCacheKey(file_path:str)->dict:
+        """ Permet de retourner la clé d'un réseau enregistré ou None si le fichier n'est pas valide """
+        try:
+            with np.load(file_path, allow_pickle=False) as data:
+                return json.loads(str(data["header"]), object_hook=decodeJsonValue)["cache_key"]
+        except NPZ_ERRORS: return None
+
+    def save(self, file_path:str, cache_key:dict=None):
+        """
+        Méthode qui permet d'enregistrer le réseau (noeuds, segments avec la gestion et le camionnage joint
+        et géometries des routes) dans un fichier .npz compressé. Le réseau peut être rechargé
+        avec le constructeur load. Les obstacles ne sont pas enregistrés. Les valeurs de dates des attributs
+        (QDate, QDateTime, ...) sont conservées avec leur type et une valeur d'un autre type non supporté
+        par JSON lève une TypeError.
+
+        Args:
+            file_path (str): Le chemin du fichier .npz
+            cache_key (dict, optional): La clé du réseau (voir createCacheKey). Defaults to None.
+        """
+        arrays = {"nodes_xy": self.nodes_xy}
+        header = {"cache_key": cache_key, "values": {}}
+        for name in RoadNetwork.EDGE_FIELDS:
+            if self.edges[name].dtype != object:
+                arrays[f"edges_{name}"] = self.edges[name]
+                continue
+            # Encoder les valeurs d'objets par dictionnaire
+            values = [None if isinstance(value, QVariant) and value.isNull() else value for value in self.edges[name].tolist()]
+            # Le type fait partie de la clé pour ne pas confondre 1, 1.0 et True
+            codes = {}
+            arrays[f"codes_{name}"] = np.array([codes.setdefault((type(value), value), len(codes)) for value in values], dtype=np.int64)
+            header["values"][name] = [value for _, value in codes]
+        # Géometries des routes de l'index spatial et des segments
+        arrays["road_ids"] = self.roads_ids
+        arrays["road_offsets"] = self.roads_offsets
+        arrays["road_coords"] = self.roads_coords
+        arrays["header"] = np.array(json.dumps(header, default=encodeJsonValue))
+        # Écrire dans un fichier temporaire pour ne jamais laisser un fichier tronqué
+        saveNpz(file_path, **arrays)
+
+    @staticmethod
+    def emptyEdges()->dict:
+        """ Permet de retourner les arrays vides des attributs des segments """
+        return RoadNetwork.edgesFromLists({name: [] for name in RoadNetwork.EDGE_FIELDS})
+
+    @staticmethod
+    def edgesFromLists(values:dict)->dict:
+        """ Permet de convertir les listes des attributs des segments en arrays typés """
+        edges = {}
+        for name in ("tails", "heads", "ids", "vertex_d", "vertex_f"): edges[name] = np.array(values[name], dtype=np.int64)
+        edges["lengths"] = np.array(values["lengths"], dtype=float)
+        edges["speeds"] = np.array([np.nan if speed is None else speed for speed in values["speeds"]], dtype=float)
+        edges["direction"] = np.array(values["direction"], dtype=np.int8)
+        edges["forward"] = np.array(values["forward"], dtype=bool)
+        for name in ("keys", "gestion", "camionnage"): edges[name] = RoadNetwork.objectArray(values[name])
+        return edges
+
+    @staticmethod
+    def objectArray(values:list)->np.ndarray:
+        """ Permet de créer un array d'objets sans que numpy découpe les valeurs (ex: tuple) """
+        array = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values): array[i] = value
+        return array
+
     def clear(self):
         """ Permet de reset le réseau """
         self.graph = None
         self.roads_layer = None
         self.road_spatial_index = None
+        self.nodes_xy = np.empty((0, 2), dtype=float)
+        self.nodes_ids = {}
+        self.nodes_tree = None
+        self.snap_index = None
+        self.active_nodes = None
+        self.edges = RoadNetwork.emptyEdges()
+        self.roads_ids = np.empty(0, dtype=np.int64)
+        self.roads_offsets = np.zeros(1, dtype=np.int64)
+        self.roads_coords = np.empty((0, 2), dtype=float)
+        self.roads_rows = {}
+        self.edges_index = {}
+        self.adjacency = None
+        self.profiles = {}
+        self.heuristic_factor = None
+        self.hierarchies = {}
+        self.csr_matrices = {}
         self.obstacles = {}
 
+    def __getstate__(self):
+        # Les objets QGIS et le graph networkx ne sont pas transmis à un autre processus
+        state = self.__dict__.copy()
+        for name in ("roads_layer", "road_spatial_index", "graph", "profiles_lock"): state[name] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.profiles_lock = threading.Lock()
+
     def clearObstacles(self):
         """ Permet de retirer toutes les obstacles du réseau """
         # Parcourir les segments bloqué par chaque l'obstacle
-        return all([self.removeObstacle(route_id) for route_id in self.obstacles.keys()])
+        return all([self.removeObstacle(route_id) for route_id in list(self.obstacles.keys())])
 
     def checkImports(self):
         try:
@@ -94,29 +358,24 @@ class RoadNetwork:
     def createNetwork(self,
             roads_layer:QgsVectorLayer,
             key_field:str=DEFAULT_KEY_FIELD,
-            direction_field:str=DEFAULT_DIRECTION_FIELD, 
+            direction_field:str=DEFAULT_DIRECTION_FIELD,
             speed_field:str=DEFAULT_SPEED_FIELD,
             gestion_field:str=DEFAULT_GESTION_FIELD):
         """
         Permet de générer le réseau à partir d'une couche de route.
 
         Args:
-            roads_layer (QgsVectorLayer): La couche des routes 
+            roads_layer (QgsVectorLayer): La couche des routes
             key_field (str, optional): Le champs d'identifiant unique. Defaults to DEFAULT_KEY_FIELD.
             direction_field (str, optional): Le champs qui indique la direction de circulation. Defaults to DEFAULT_DIRECTION_FIELD.
             speed_field (str, optional): Le champs qui indique la vitesse sur le segment. Defaults to DEFAULT_SPEED_FIELD.
             gestion_field (str, optional): Le champs qui indique l'autoritée responsable de la gestion du segment. Defaults to DEFAULT_GESTION_FIELD.
         """
-        if not self.has_lib: return False
-
         # Vérifier que la couche est linéaire
         if roads_layer.geometryType() != QgsWkbTypes.LineGeometry: return None
         # Reset le réseau
         self.clear()
-        self.graph = nx.MultiDiGraph()
         self.roads_layer = roads_layer
-        # Créer l'index spatial des routes du réseau
-        self.road_spatial_index = QgsSpatialIndex(self.roads_layer.getFeatures(), flags=QgsSpatialIndex.FlagStoreFeatureGeometries)
         # Liste des noms de champs de la couche
         fields_name = [field.name() for field in roads_layer.fields()]
         # Vérifier si le champs de la direction est valide
@@ -126,11 +385,25 @@ class RoadNetwork:
         # Vérifier si le champs pour définir la gestions est valide
         if not gestion_field in fields_name: gestion_field = None
 
+        # Listes des attributs des segments converties en arrays à la fin
+        values = {name: [] for name in RoadNetwork.EDGE_FIELDS}
+        coords = []
+        # Géometries des routes (voir setRoadsGeometries)
+        roads_ids, roads_offsets, roads_coords = [], [0], []
+        def nodeId(point):
+            # Identifiant du noeud d'une coordonnée, ajouté s'il est nouveau
+            xy = (point.x(), point.y())
+            node = self.nodes_ids.get(xy, None)
+            if node is None:
+                node = self.nodes_ids[xy] = len(coords)
+                coords.append(xy)
+            return node
+
         # Parcourir toute les entitées de la couche
         for feat in roads_layer.getFeatures():
             feat:QgsFeature
             geom = feat.geometry()
-            
+
             # Définir la valeur de direction
             if direction_field: direction = feat[direction_field]
             else: direction = 0
@@ -147,33 +420,246 @@ class RoadNetwork:
             if gestion_field: gestion = feat[gestion_field]
             else: gestion = None
 
-            # Définir la clé unique du segment
-            key_val = feat[key_field]
-
             # Liste des points de la ligne
             points = geom.asPolyline()
-            start, end = points[0], points[-1]
-            
-            # Définir les attributs du segments
-            edge_data = {'weight': 1,
-                         'speed': speed,
-                         'length': geom.length(),
-                         'id':feat.id(),
-                         'gestion':gestion,
-                         'direction':direction,
-                         'camionnage':''}
-            # Ajouter les segments pour le sense de numérisation 
-            if direction in [0, 1]: self.graph.add_edge(start, end, key=key_val, **edge_data)
-            # Ajouter les segments pour le sense inverse 
-            if direction in [0, 2]: self.graph.add_edge(end, start, key=key_val, **edge_data)
+            start, end = nodeId(points[0]), nodeId(points[-1])
+            # Conserver les sommets de la ligne
+            vertex_start = len(roads_coords)
+            roads_coords.extend([(point.x(), point.y()) for point in points])
+            vertex_end = len(roads_coords) - 1
+            roads_ids.append(feat.id())
+            roads_offsets.append(len(roads_coords))
+            # Segments pour le sens de numérisation et pour le sens inverse
+            sens = []
+            if direction in [0, 1]: sens.append((start, end, True))
+            if direction in [0, 2]: sens.append((end, start, False))
+            for tail, head, forward in sens:
+                self.edges_index.setdefault(feat.id(), []).append(len(values["tails"]))
+                values["tails"].append(tail)
+                values["heads"].append(head)
+                values["keys"].append(feat[key_field])
+                values["ids"].append(feat.id())
+                values["lengths"].append(geom.length())
+                values["speeds"].append(speed)
+                values["gestion"].append(gestion)
+                values["direction"].append(direction)
+                values["camionnage"].append('')
+                values["forward"].append(forward)
+                # Sommets du noeud de début et de fin du segment
+                values["vertex_d"].append(vertex_start if forward else vertex_end)
+                values["vertex_f"].append(vertex_end if forward else vertex_start)
+        self.edges = RoadNetwork.edgesFromLists(values)
+        self.nodes_xy = np.array(coords, dtype=float).reshape(-1, 2)
+        # Créer l'index spatial des routes du réseau sans relire la couche
+        self.setRoadsGeometries(
+            np.array(roads_ids, dtype=np.int64),
+            np.array(roads_offsets, dtype=np.int64),
+            np.array(roads_coords, dtype=float).reshape(-1, 2))
+        # Créer l'index des noeuds pour l'accrochage des points
+        self.updateNodesIndex()
+
+    def addEdge(self, u, v, key=None, **data):
+        """
+        Permet d'ajouter un segment au réseau en gardant les index à jour.
+        Les arrays du réseau sont recopiés à chaque ajout, utiliser addEdges pour ajouter plusieurs segments.
+
+        Args:
+            u (QgsPointXY): Noeud d'origine
+            v (QgsPointXY): Noeud destination
+            key (optional): La clé du segment. Defaults to None (nombre de segments entre u et v).
+            data: Les attributs du segment (speed, length, id, gestion, direction, camionnage, forward)
+                et points, la liste des sommets du segment dans le sens de parcours (défaut: [u, v])
+
+        Returns: La clé du segment
+        """
+        return self.addEdges([(u, v, dict(data, key=key))])[0]
+
+    def addEdges(self, edges:list)->list:
+        """
+        Permet d'ajouter plusieurs segments au réseau en gardant les index à jour.
+        Les arrays du réseau sont concaténés une seule fois pour tous les segments.
+
+        Args:
+            edges (list): Liste de (u, v, data) où u et v sont les QgsPointXY d'origine et de destination et data
+                le dictionnaire des attributs du segment (voir addEdge) avec la clé optionnelle key
+
+        Returns (list): Les clés des segments
+        """
+        if len(edges) == 0: return []
+        nbr_nodes, nbr_coords, nbr_edges = len(self.nodes_xy), len(self.roads_coords), len(self.edges["tails"])
+        new_nodes, new_coords = [], []
+        values = {name: [] for name in RoadNetwork.EDGE_FIELDS}
+        for u, v, data in edges:
+            nodes = []
+            for point in (u, v):
+                xy = (point.x(), point.y())
+                if not xy in self.nodes_ids:
+                    self.nodes_ids[xy] = nbr_nodes + len(new_nodes)
+                    new_nodes.append(xy)
+                nodes.append(self.nodes_ids[xy])
+            # Ajouter les sommets du segment à la suite des géometries des routes
+            points = data.get("points", None) or [u, v]
+            values["vertex_d"].append(nbr_coords + len(new_coords))
+            new_coords.extend((point.x(), point.y()) for point in points)
+            values["vertex_f"].append(nbr_coords + len(new_coords) - 1)
+            values["tails"].append(nodes[0])
+            values["heads"].append(nodes[1])
+            values["keys"].append(data.get("key", None))
+            values["ids"].append(data.get("id", -1))
+            values["lengths"].append(data.get("length", 0))
+            values["speeds"].append(data.get("speed", None))
+            values["gestion"].append(data.get("gestion", None))
+            values["direction"].append(data.get("direction", 0))
+            values["camionnage"].append(data.get("camionnage", ''))
+            values["forward"].append(data.get("forward", True))
+            if data.get("id", None) is not None:
+                self.edges_index.setdefault(data["id"], []).append(nbr_edges + len(values["tails"]) - 1)
+        # La clé par défaut est le nombre de segments déjà entre u et v
+        pairs = list(zip(values["tails"], values["heads"]))
+        missing = {pair for pair, key in zip(pairs, values["keys"]) if key is None}
+        if missing:
+            if len(missing) == 1:
+                (tail, head), = missing
+                counts = {(tail, head): int(np.count_nonzero((self.edges["tails"] == tail) & (self.edges["heads"] == head)))}
+            else:
+                # Compter les segments existants des paires de noeuds sans clé avec un code unique par paire
+                nbr_total = nbr_nodes + len(new_nodes)
+                codes = self.edges["tails"] * nbr_total + self.edges["heads"]
+                codes, nbr = np.unique(codes[np.isin(codes, [tail * nbr_total + head for tail, head in missing])], return_counts=True)
+                counts = {divmod(int(code), nbr_total): int(count) for code, count in zip(codes, nbr)}
+            for idx, pair in enumerate(pairs):
+                if not pair in missing: continue
+                if values["keys"][idx] is None: values["keys"][idx] = counts.get(pair, 0)
+                counts[pair] = counts.get(pair, 0) + 1
+        if new_nodes:
+            self.nodes_xy = np.vstack((self.nodes_xy, new_nodes))
+            # L'index des noeuds sera recréé
+            self.nodes_tree = None
+        self.roads_coords = np.vstack((self.roads_coords, new_coords))
+        new_edges = RoadNetwork.edgesFromLists(values)
+        self.edges = {name: np.concatenate((self.edges[name], new_edges[name])) for name in RoadNetwork.EDGE_FIELDS}
+        self.clearEdgesCache()
+        return values["keys"]
+
+    def clearEdgesCache(self):
+        """ Permet de retirer les données calculées à partir des segments du réseau """
+        self.adjacency = None
+        self.active_nodes = None
+        self.snap_index = None
+        self.heuristic_factor = None
+        self.graph = None
+        self.clearProfiles()
 
     def hasObstacles(self):
         """ Permet de vérifier si le réseau à des obstacles """
         return self.obstacles != {}
 
+    def getBlockedEdges(self, blocked=[])->set:
+        """
+        Permet de retourner l'ensemble des segments bloqués par les obstacles du réseau
+        et par les routes bloquées seulement pour une requête.
+
+        Args:
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+
+        Returns (set): Les segments bloqués
+        """
+        edges = {edge for edges in self.obstacles.values() for edge in edges}
+        for feat_id in blocked or []: edges.update(self.edges_index.get(feat_id, []))
+        return edges
+
+    def setRoadsGeometries(self, roads_ids:np.ndarray, roads_offsets:np.ndarray, roads_coords:np.ndarray):
+        """
+        Permet de définir les géometries des routes et de créer l'index spatial des routes à partir de celles-ci.
+
+        Args:
+            roads_ids (np.ndarray): L'identifiant de chaque route
+            roads_offsets (np.ndarray): La position du premier sommet de chaque route (et le nombre de sommets à la fin)
+            roads_coords (np.ndarray): Les sommets (n, 2) de toutes les routes
+        """
+        self.roads_ids, self.roads_offsets, self.roads_coords = roads_ids, roads_offsets, roads_coords
+        self.roads_rows = {feat_id: row for row, feat_id in enumerate(roads_ids.tolist())}
+        self.snap_index = None
+        self.road_spatial_index = QgsSpatialIndex(flags=QgsSpatialIndex.FlagStoreFeatureGeometries)
+        for feat_id in self.roads_rows: self.road_spatial_index.addFeature(self.getRoadFeature(feat_id))
+
+    def getRoadCoords(self, feat_id:int)->np.ndarray:
+        """ Permet de retourner les sommets (n, 2) d'une route dans le sens de numérisation """
+        row = self.roads_rows[feat_id]
+        return self.roads_coords[self.roads_offsets[row]:self.roads_offsets[row + 1]]
+
+    def getRoadFeature(self, feat_id:int)->QgsFeature:
+        """ Permet de créer l'entité d'une route avec sa géometrie conservée dans le réseau (sans lire la couche) """
+        feat = QgsFeature(feat_id)
+        feat.setGeometry(QgsGeometry.fromPolylineXY([QgsPointXY(x, y) for x, y in self.getRoadCoords(feat_id).tolist()]))
+        return feat
+
+    def getEdgeCoords(self, edge:int)->np.ndarray:
+        """ Permet de retourner les sommets (n, 2) d'un segment dans le sens de parcours (du noeud de début au noeud de fin) """
+        vertex_d, vertex_f = int(self.edges["vertex_d"][edge]), int(self.edges["vertex_f"][edge])
+        if vertex_d <= vertex_f: return self.roads_coords[vertex_d:vertex_f + 1]
+        return self.roads_coords[vertex_f:vertex_d + 1][::-1]
+
+    def getEdgePartCoords(self, edge:int, fraction_d=0.0, fraction_f=1.0)->np.ndarray:
+        """
+        Permet de retourner les sommets (n, 2) d'une partie d'un segment dans le sens de parcours.
+
+        Args:
+            edge (int): L'identifiant du segment
+            fraction_d (float, optional): La fraction de la longueur du segment au début de la partie. Defaults to 0.
+            fraction_f (float, optional): La fraction de la longueur du segment à la fin de la partie. Defaults to 1.
+
+        Returns (np.ndarray): Les sommets de la partie du segment
+        """
+        coords = self.getEdgeCoords(edge)
+        if fraction_d <= 0 and fraction_f >= 1: return coords
+        measures = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(coords, axis=0).T))))
+        start, end = fraction_d * measures[-1], fraction_f * measures[-1]
+        # Sommets à l'intérieur de la partie et extrémités interpolées
+        inside = (measures > start) & (measures < end)
+        points = np.concatenate(([start], measures[inside], [end]))
+        return np.column_stack((np.interp(points, measures, coords[:, 0]), np.interp(points, measures, coords[:, 1])))
+
+    def getEdgeData(self, edge:int)->dict:
+        """ Permet de retourner les attributs d'un segment dans un dictionnaire """
+        speed = self.edges["speeds"][edge]
+        return {
+            'key': self.edges["keys"][edge],
+            'speed': None if np.isnan(speed) else float(speed),
+            'length': float(self.edges["lengths"][edge]),
+            'id': int(self.edges["ids"][edge]),
+            'gestion': self.edges["gestion"][edge],
+            'direction': int(self.edges["direction"][edge]),
+            'camionnage': self.edges["camionnage"][edge],
+            'forward': bool(self.edges["forward"][edge])}
+
+    def getNode(self, node:int)->QgsPointXY:
+        """ Permet de retourner la coordonnée d'un noeud """
+        return QgsPointXY(*self.nodes_xy[node])
+
+    def getGraph(self):
+        """
+        Permet de retourner le réseau sous forme de networkx.MultiDiGraph avec les QgsPointXY comme noeuds.
+        Les segments bloqués par un obstacle sont exclus. Le graph est créé seulement sur demande.
+
+        Returns (networkx.MultiDiGraph): Le graph du réseau ou None si networkx n'est pas disponible
+        """
+        if not self.has_lib: return None
+        if self.graph is not None: return self.graph
+        graph = nx.MultiDiGraph()
+        graph.add_nodes_from([self.getNode(node) for node in range(len(self.nodes_xy))])
+        blocked = self.getBlockedEdges()
+        for edge in range(len(self.edges["tails"])):
+            if edge in blocked: continue
+            data = self.getEdgeData(edge)
+            key = data.pop('key')
+            graph.add_edge(self.getNode(self.edges["tails"][edge]), self.getNode(self.edges["heads"][edge]), key=key, **data)
+        self.graph = graph
+        return graph
+
     def nodeWeight(self, node, prev_node, next_node, speed_threshold=50):
         """
-        Permet 
+        Permet
 
         Args:
             node (_type_): _description_
@@ -184,13 +670,14 @@ class RoadNetwork:
         Returns:
             float: Le poid du node selon c'est approche
         """
-        incoming_speed = self.graph[prev_node][node].get('speed', 0) if prev_node else 0
-        outgoing_speed = self.graph[node][next_node].get('speed', 0) if next_node else 0
-        
-        connection_count = len(list(self.graph.neighbors(node)))
-        multiplier = self.graph.nodes[node].get('weight_multiplier', 1)
+        graph = self.getGraph()
+        incoming_speed = graph[prev_node][node].get('speed', 0) if prev_node else 0
+        outgoing_speed = graph[node][next_node].get('speed', 0) if next_node else 0
+
+        connection_count = len(list(graph.neighbors(node)))
+        multiplier = graph.nodes[node].get('weight_multiplier', 1)
         base_weight = connection_count * multiplier
-        
+
         if incoming_speed > speed_threshold and outgoing_speed > speed_threshold and abs(incoming_speed - outgoing_speed) < 10:
             # Reduce weight for high-speed consistent transitions
             return base_weight * 0.5
@@ -207,7 +694,7 @@ class RoadNetwork:
         Returns:
             QgsVectorLayer: La couche linéaire qui contient le trajet résultant
         """
-        # Créer une couche vectoriel 
+        # Créer une couche vectoriel
         path_layer = QgsVectorLayer("LineString", "Détour", "memory")
         # Définir le CRS avec la couche de route
         path_layer.setCrs(self.roads_layer.crs())
@@ -225,9 +712,9 @@ class RoadNetwork:
                 path_layer,
                 line_geom,
                 attributes))
-        # Retourner la couche 
+        # Retourner la couche
         return path_layer
-    
+
     def getEdgesFromPoint(self, point:QgsPointXY):
         """
         Permet de trouver les segments les plus proche d'un point avec la géometrie.
@@ -241,7 +728,24 @@ class RoadNetwork:
         # Identifiant de la route la plus proche
         feat_id = self.getIdRouteFromPoint(point)
         # Retourner les infromations de segments les plus proche
-        return [(u, v, d) for u, v, d in self.graph.edges(data=True) if d.get('id') == feat_id]
+        return [(u, v, d) for u, v, key, d in self.getEdgesFromId(feat_id)]
+
+    def getEdgesFromId(self, feat_id:int):
+        """
+        Permet de retourner les segments d'une entité de la couche des routes avec l'index des segments.
+        Seulement les segments qui ne sont pas bloqués par un obstacle sont retournés.
+
+        Args:
+            feat_id (int): L'identifiant de l'entité de route
+
+        Returns: Liste des 2 sommets, de la clé et des données des segments
+        """
+        blocked = self.getBlockedEdges()
+        return [(
+            self.getNode(self.edges["tails"][edge]),
+            self.getNode(self.edges["heads"][edge]),
+            self.edges["keys"][edge],
+            self.getEdgeData(edge)) for edge in self.edges_index.get(feat_id, []) if not edge in blocked]
 
     def getIdRouteFromPoint(self, point:QgsPointXY):
         """
@@ -258,10 +762,233 @@ class RoadNetwork:
 
     def getNodeFromPoint(self, point:QgsPointXY):
         """ Permet de retourner le node du réseau le plus proche d'un points """
-        # Convertir le point en géometry
-        geom_point = QgsGeometry.fromPointXY(point)
-        # Trouver le node avec la distance la plus courte du point
-        return min(self.graph.nodes(), key=lambda n: QgsGeometry.fromPointXY(QgsPointXY(n[0], n[1])).distance(geom_point))
+        return self.getNodesFromPoints([point])[0]
+
+    def getNodesFromPoints(self, points:list, k=8, blocked=[])->list:
+        """
+        Permet de retourner en lot le noeud du réseau le plus proche de chaque point avec l'index des noeuds.
+        Les noeuds qui n'ont plus de segment (ex: bloqués par un obstacle) sont ignorés.
+
+        Args:
+            points (list): Liste des QgsPointXY ou array (n, 2) des coordonnées
+            k (int, optional): Le nombre de noeuds candidats à vérifier avant de chercher dans tous les noeuds. Defaults to 8.
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+
+        Returns (list): La liste des noeuds (QgsPointXY) les plus proches (None si aucun noeud)
+        """
+        return [None if node == -1 else self.getNode(node) for node in self.getNodeIdsFromPoints(points, k=k, blocked=blocked).tolist()]
+
+    def getNodeIdsFromPoints(self, points:list, k=8, blocked=[])->np.ndarray:
+        """
+        Permet de retourner en lot l'identifiant du noeud actif le plus proche de chaque point (voir getNodesFromPoints).
+
+        Args:
+            points (list): Liste des QgsPointXY ou array (n, 2) des coordonnées
+            k (int, optional): Le nombre de noeuds candidats à vérifier avant de chercher dans tous les noeuds. Defaults to 8.
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+
+        Returns (np.ndarray): Les identifiants des noeuds (-1 si aucun noeud)
+        """
+        if self.nodes_tree is None: self.updateNodesIndex()
+        if isinstance(points, np.ndarray): coords = points.astype(float).reshape(-1, 2)
+        else: coords = np.array([(point.x(), point.y()) for point in points], dtype=float).reshape(-1, 2)
+        nodes = np.full(len(coords), -1, dtype=np.int64)
+        if self.nodes_tree is None or len(coords) == 0: return nodes
+        active = self.getActiveNodes(blocked=blocked)
+        nbr = min(k, len(self.nodes_xy))
+        _, candidates = self.nodes_tree.query(coords, k=nbr)
+        candidates = np.asarray(candidates).reshape(len(coords), nbr)
+        # Premier candidat actif de chaque point
+        is_active = active[candidates]
+        found = is_active.any(axis=1)
+        nodes[found] = candidates[found, np.argmax(is_active[found], axis=1)]
+        # Chercher dans tous les noeuds en ordre de distance si les candidats sont tous inactifs
+        if nbr < len(self.nodes_xy) and active.any():
+            for i in np.flatnonzero(~found).tolist():
+                distances = np.hypot(*(self.nodes_xy - coords[i]).T)
+                distances[~active] = np.inf
+                nodes[i] = int(np.argmin(distances))
+        return nodes
+
+    def getActiveNodes(self, blocked=[])->np.ndarray:
+        """
+        Permet de retourner le masque des noeuds qui ont au moins un segment non bloqué.
+        Le masque des obstacles du réseau est conservé et celui d'une requête est calculé à chaque appel.
+
+        Args:
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+
+        Returns (np.ndarray): Le masque des noeuds actifs
+        """
+        if not blocked and self.active_nodes is not None: return self.active_nodes
+        mask = np.ones(len(self.edges["tails"]), dtype=bool)
+        mask[list(self.getBlockedEdges(blocked))] = False
+        nbr = len(self.nodes_xy)
+        active = (np.bincount(self.edges["tails"][mask], minlength=nbr) + np.bincount(self.edges["heads"][mask], minlength=nbr)) > 0
+        if not blocked: self.active_nodes = active
+        return active
+
+    def isNodeActive(self, node)->bool:
+        """ Permet de vérifier si un noeud (QgsPointXY ou identifiant) du réseau a encore au moins un segment """
+        if not isinstance(node, (int, np.integer)): node = self.nodes_ids.get((node.x(), node.y()), None)
+        if node is None: return False
+        return bool(self.getActiveNodes()[node])
+
+    def updateNodesIndex(self):
+        """ Permet de créer l'index (cKDTree) des coordonnées des noeuds du réseau """
+        # Les hiérarchies utilisent les identifiants des noeuds
+        self.hierarchies = {}
+        self.csr_matrices = {}
+        if len(self.nodes_xy) == 0: self.nodes_tree = None
+        else: self.nodes_tree = cKDTree(self.nodes_xy)
+
+    def getSnapIndex(self)->dict:
+        """
+        Permet de retourner l'index vectorisé des géometries des segments utilisé pour l'accrochage aux segments.
+        Les segments des deux sens d'une route partagent la même géometrie, donc l'index contient
+        une géometrie par paire de sommets de début et de fin et la liste des segments de chaque géometrie.
+
+        Returns (dict): {"segments", "tree", "max_length": index des parties de ligne (voir nearestLines),
+            "groups", "measures": géometrie et longueur le long de la géometrie au début de chaque partie,
+            "lengths", "indptr", "edges", "reverse": longueur de chaque géometrie et ses segments en CSR
+            (reverse indique un segment parcouru dans le sens inverse de la géometrie)}
+        """
+        if self.snap_index is not None: return self.snap_index
+        vertex_d, vertex_f = self.edges["vertex_d"], self.edges["vertex_f"]
+        starts, ends = np.minimum(vertex_d, vertex_f), np.maximum(vertex_d, vertex_f)
+        valid = np.flatnonzero(ends > starts)
+        # Géometries uniques et leurs segments
+        nbr = max(len(self.roads_coords), 1)
+        keys, first, inverse = np.unique(starts[valid] * nbr + ends[valid], return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind="stable")
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(keys))))).astype(np.int64)
+        group_starts, group_ends = starts[valid][first], ends[valid][first]
+        # Parties de ligne entre les sommets consécutifs de chaque géometrie
+        counts = group_ends - group_starts
+        groups = np.repeat(np.arange(len(keys)), counts)
+        vertices = np.repeat(group_starts, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        segments = np.hstack((self.roads_coords[vertices], self.roads_coords[vertices + 1])).reshape(-1, 4)
+        seg_lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        cumul = np.cumsum(seg_lengths) - seg_lengths
+        measures = cumul - np.repeat(cumul[np.cumsum(counts) - counts] if len(cumul) else cumul, counts)
+        self.snap_index = {
+            "segments": segments,
+            "tree": segmentsTree(segments) if len(segments) > 0 else None,
+            "max_length": float(seg_lengths.max()) if len(seg_lengths) > 0 else 0.0,
+            "groups": groups,
+            "measures": measures,
+            "lengths": np.bincount(groups, weights=seg_lengths, minlength=len(keys)),
+            "indptr": indptr,
+            "edges": valid[order],
+            "reverse": (vertex_d > vertex_f)[valid[order]]}
+        return self.snap_index
+
+    def snapToEdges(self, points:list, gestion=[], camionnage=[], blocked=[], max_dist=None, tolerance=1e-6)->dict:
+        """
+        Permet d'accrocher en lot des points au segment le plus proche plutôt qu'au noeud le plus proche.
+        Seulement les géometries qui ont un segment utilisable par le profil et non bloqué sont considérées.
+
+        Args:
+            points (list): Liste des QgsPointXY ou array (n, 2) des coordonnées
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+            max_dist (float, optional): La distance maximale d'accrochage. Defaults to None (aucune limite).
+            tolerance (float, optional): La distance le long du segment sous laquelle le point est sur le noeud. Defaults to 1e-6.
+
+        Returns (dict): {"xy": array (n, 2) des points accrochés (nan si aucun), "distances": array (n) des distances,
+            "edges": liste par point des [(segment, fraction de la longueur du segment dans le sens de parcours)]}
+        """
+        if isinstance(points, np.ndarray): coords = points.astype(float).reshape(-1, 2)
+        else: coords = np.array([(point.x(), point.y()) for point in points], dtype=float).reshape(-1, 2)
+        snaps = {"xy": np.full((len(coords), 2), np.nan), "distances": np.full(len(coords), np.inf), "edges": [[] for _ in range(len(coords))]}
+        index = self.getSnapIndex()
+        if len(coords) == 0 or index["tree"] is None: return snaps
+        # Segments utilisables pour la requête
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage)
+        usable = np.isfinite(weights[index["edges"]])
+        blocked_edges = self.getBlockedEdges(blocked)
+        if blocked_edges: usable &= ~np.isin(index["edges"], np.fromiter(blocked_edges, dtype=np.int64, count=len(blocked_edges)))
+        groups_usable = np.add.reduceat(usable, index["indptr"][:-1]) > 0 if len(usable) else np.empty(0, dtype=bool)
+        nearest, distances = nearestLines(
+            coords,
+            index["segments"],
+            max_dist=max_dist,
+            tree=index["tree"],
+            max_length=index["max_length"],
+            mask=groups_usable[index["groups"]])
+        found = np.flatnonzero(nearest != -1)
+        if len(found) == 0: return snaps
+        segments = index["segments"][nearest[found]]
+        vectors = segments[:, 2:] - segments[:, :2]
+        seg_lengths = np.hypot(*vectors.T)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.clip(np.einsum("ij,ij->i", coords[found] - segments[:, :2], vectors) / seg_lengths ** 2, 0, 1)
+        t = np.nan_to_num(t)
+        groups = index["groups"][nearest[found]]
+        # Position du point projeté le long de la géometrie, sur un noeud s'il est à moins de la tolérance d'une extrémité
+        measures = index["measures"][nearest[found]] + t * seg_lengths
+        with np.errstate(invalid="ignore", divide="ignore"):
+            positions = np.nan_to_num(np.clip(measures / index["lengths"][groups], 0, 1))
+        positions[measures <= tolerance] = 0.0
+        positions[index["lengths"][groups] - measures <= tolerance] = 1.0
+        snaps["xy"][found] = segments[:, :2] + t[:, None] * vectors
+        snaps["distances"][found] = distances[found]
+        indptr, edges, reverse = index["indptr"].tolist(), index["edges"].tolist(), index["reverse"].tolist()
+        usable = usable.tolist()
+        for i, group, position in zip(found.tolist(), groups.tolist(), positions.tolist()):
+            snaps["edges"][i] = [
+                (edges[j], 1 - position if reverse[j] else position)
+                for j in range(indptr[group], indptr[group + 1]) if usable[j]]
+        return snaps
+
+    def getVirtualNodes(self, snap_edges:list, weights:np.ndarray, start=True)->dict:
+        """
+        Permet de définir les noeuds virtuels d'un point accroché au milieu de segments (voir snapToEdges).
+        Un point de départ rejoint le noeud de fin de ses segments et un point d'arrivée est rejoint
+        à partir du noeud de début de ses segments, avec la partie du poids et de la longueur du segment.
+
+        Args:
+            snap_edges (list): Les segments [(segment, fraction)] du point
+            weights (np.ndarray): Le poids de chaque segment pour le profil
+            start (bool, optional): Le point est un point de départ. Defaults to True.
+
+        Returns (dict): {noeud: (poids, longueur, segment, fraction)} avec -1 comme segment si le point est sur le noeud
+        """
+        nodes = {}
+        def add(node, weight, length, edge, fraction):
+            if node not in nodes or weight < nodes[node][0]: nodes[node] = (weight, length, edge, fraction)
+        for edge, fraction in snap_edges:
+            weight, length = float(weights[edge]), float(self.edges["lengths"][edge])
+            tail, head = int(self.edges["tails"][edge]), int(self.edges["heads"][edge])
+            if start:
+                if fraction <= 0: add(tail, 0.0, 0.0, -1, 0.0)
+                add(head, (1 - fraction) * weight, (1 - fraction) * length, edge, fraction)
+            else:
+                if fraction >= 1: add(head, 0.0, 0.0, -1, 1.0)
+                add(tail, fraction * weight, fraction * length, edge, fraction)
+        return nodes
+
+    def getAdjacency(self)->dict:
+        """
+        Permet de retourner les listes d'adjacence CSR des segments utilisées par les recherches.
+        Les segments sortants du noeud i sont out_edges[out_indptr[i]:out_indptr[i + 1]]
+        et les segments entrants sont in_edges[in_indptr[i]:in_indptr[i + 1]].
+
+        Returns (dict): {"out_indptr", "out_edges", "in_indptr", "in_edges", "tails", "heads", "xs", "ys"} en listes Python
+        """
+        if self.adjacency is not None: return self.adjacency
+        nbr = len(self.nodes_xy)
+        adjacency = {}
+        for prefix, nodes in (("out", self.edges["tails"]), ("in", self.edges["heads"])):
+            adjacency[f"{prefix}_indptr"] = np.concatenate(([0], np.cumsum(np.bincount(nodes, minlength=nbr)))).tolist()
+            adjacency[f"{prefix}_edges"] = np.argsort(nodes, kind="stable").tolist()
+        adjacency["tails"] = self.edges["tails"].tolist()
+        adjacency["heads"] = self.edges["heads"].tolist()
+        adjacency["xs"], adjacency["ys"] = self.nodes_xy[:, 0].tolist(), self.nodes_xy[:, 1].tolist()
+        self.adjacency = adjacency
+        return adjacency
 
     def addCamionnage(self, layer_camionnage:QgsVectorLayer, key_field:str=DEFAULT_KEY_FIELD, field_class:str=DEFAULT_CAMIONNAGE_FIELD):
         """
@@ -274,10 +1001,12 @@ class RoadNetwork:
         """
         # Créer un index du réseau de camionnage avec l'id comme clé
         dict_camion = {i[key_field]: i[field_class] for i in layer_camionnage.getFeatures()}
-        # Parcourir toutes les segments du réseau 
-        for u, v, key, data in self.graph.edges(data=True, keys=True):
-            # Associer la classification du camionnage au segments
-            if key in dict_camion: self.graph[u][v][key]["camionnage"] = dict_camion[key]
+        # Associer la classification du camionnage aux segments
+        self.edges["camionnage"] = RoadNetwork.objectArray([
+            dict_camion.get(key, camionnage) for key, camionnage in zip(self.edges["keys"], self.edges["camionnage"])])
+        self.graph = None
+        # Les poids des profils dépendent du camionnage
+        self.clearProfiles()
 
     def addPathToMap(self, layer:QgsVectorLayer, use_style:str=None):
         """
@@ -306,21 +1035,28 @@ class RoadNetwork:
         Args:
             obstacle_point (QgsPointXY): Points utilisé comme obstacles
         """
-        route_ids = []
-        # Parcourir les segments les plus proche du point
-        for edge in self.getEdgesFromPoint(obstacle_point):
-            # Identifiant de la route réprésenter par le segment
-            feat_id = edge[2]["id"]
-            # Ajouter le segments au dictionnaire des obstacles
-            if feat_id in self.obstacles: self.obstacles[feat_id].append(edge)
-            else: self.obstacles[feat_id] = [edge]
-            # Retirer le segment du graph du réseau
-            self.graph.remove_edge(edge[0], edge[1])
-            # Retirer la route à l'index spatial
-            try: self.road_spatial_index.deleteFeature(self.roads_layer.getFeature(feat_id))
-            except: pass
-            route_ids.append(feat_id)
-        return route_ids
+        return self.addObstacleFromId(self.getIdRouteFromPoint(obstacle_point))
+
+    def addObstacleFromId(self, feat_id:int):
+        """
+        Permet d'ajouter un obstacle sur une entité de la couche des routes.
+        Les segments de l'entité sont ajoutés aux segments bloqués, sans modifier le réseau.
+
+        Args:
+            feat_id (int): L'identifiant de l'entité de route à bloquer
+
+        Returns (list): Les identifiants des routes bloquées
+        """
+        blocked = self.getBlockedEdges()
+        edges = [edge for edge in self.edges_index.get(feat_id, []) if not edge in blocked]
+        if edges == []: return []
+        # Ajouter les segments au dictionnaire des obstacles
+        self.obstacles.setdefault(feat_id, []).extend(edges)
+        self.clearObstaclesCache()
+        # Retirer la route à l'index spatial
+        try: self.road_spatial_index.deleteFeature(self.getRoadFeature(feat_id))
+        except: pass
+        return [feat_id]
 
     def addObstacles(self, obstacle_points:list[QgsPointXY]):
         """
@@ -340,17 +1076,21 @@ class RoadNetwork:
         """ Permet de retirer un obstacle précis selon un indentifiant de route """
         # Parcourir les segments bloqué par chaque l'obstacle
         if not route_id in self.obstacles: return False
-        # Ajouter chaque segments au graph du réseau
-        for edge in self.obstacles[route_id]: self.graph.add_edge(edge[0], edge[1], **edge[2])
         # Ajouter le segment à l'index spatial
-        self.road_spatial_index.addFeature(self.roads_layer.getFeature(route_id))
+        self.road_spatial_index.addFeature(self.getRoadFeature(route_id))
         # Retirer la route au dictionnaire des obstacles
         self.obstacles.pop(route_id)
+        self.clearObstaclesCache()
         return True
 
+    def clearObstaclesCache(self):
+        """ Permet de retirer les données qui dépendent des segments bloqués par les obstacles """
+        self.active_nodes = None
+        self.graph = None
+
     def calculateWeight(self, u, v, ds, **kwargs):
         """
-        Permet de déterminer comment calculer les poids des segments 
+        Permet de déterminer comment calculer les poids des segments
 
         Args:
             u (_type_): Noeud d'origine
@@ -361,26 +1101,10 @@ class RoadNetwork:
 
         Returns: Poids du segment à emprunter
         """
-        # Liste des poids de segments entre les deux noeuds 
+        # Liste des poids de segments entre les deux noeuds
         weights = []
         for d in ds.values():
-            # Définir l'effet de le poid de la vitesse
-            weight = d['length']
-            # Vérifier si la vitesse du réseau à été défini
-            if d['speed']:
-                # Calculer le poids du segments selon la vitesse et la longueur 
-                if d['speed'] > 0: weight = (d['length']/1000)*(1/d['speed'])*60
-            # Vérifier si la gestion du segments est défini
-            if "gestion" in d and "gestion" in kwargs:
-                if kwargs["gestion"] != []:
-                    # Ajouter un poid infini si la gestion n'est pas dans la liste de gestion permit
-                    if not d['gestion'] in kwargs["gestion"]:  weight += float('inf')
-            # Vérifier la classification du camionnage est défini
-            if "camionnage" in d and "camionnage" in kwargs:
-                if kwargs["camionnage"] != []:
-                     # Ajouter un poid infini si la classification du cammionage n'est pas dans la liste
-                    if not d['camionnage'] in kwargs["camionnage"]:  weight += 200 #float('inf')
-            
+            weight = RoadNetwork.edgeWeight(d, **kwargs)
             # Ajouter le poids du segment à la list si ça valeur n'est pas infini
             if weight != float('inf'): weights.append(weight)
             # Définir le poid dans les attribut du segment
@@ -390,72 +1114,882 @@ class RoadNetwork:
         # Sinon retourner le poid minimum
         else: return min(weights)
 
-    def itineraire(self, start_point, end_point, obstacle_points=[], gestion=[], camionnage=[]):
+    @staticmethod
+    def edgeWeight(d:dict, **kwargs)->float:
+        """
+        Permet de calculer le poids d'un segment selon sa vitesse et les restrictions d'un profil
+
+        Args:
+            d (dict): Data du segment
+            gestion (list): Liste des gestions permis d'empruter
+            camionnage (list): Liste des classifications de camionnage permis d'empruter
+
+        Returns (float): Le temps (ou la longueur) du segment, infini si la gestion n'est pas permise
         """
-        Permet de calculer un itinéraire sur le réseau entre un point de début et de fin. 
+        # Définir l'effet de le poid de la vitesse
+        weight = d['length']
+        # Vérifier si la vitesse du réseau à été défini
+        if d['speed']:
+            # Calculer le poids du segments selon la vitesse et la longueur
+            if d['speed'] > 0: weight = (d['length']/1000)*(1/d['speed'])*60
+        # Vérifier si la gestion du segments est défini
+        if "gestion" in d and kwargs.get("gestion", None):
+            # Ajouter un poid infini si la gestion n'est pas dans la liste de gestion permit
+            if not d['gestion'] in kwargs["gestion"]:  weight += float('inf')
+        # Vérifier la classification du camionnage est défini
+        if "camionnage" in d and kwargs.get("camionnage", None):
+            # Ajouter un poid si la classification du cammionage n'est pas dans la liste
+            if not d['camionnage'] in kwargs["camionnage"]:  weight += 200 #float('inf')
+        return weight
+
+    def edgeWeights(self, gestion=[], camionnage=[])->np.ndarray:
+        """
+        Permet de calculer les poids de tous les segments pour un profil de routage (voir edgeWeight).
+
+        Args:
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+
+        Returns (np.ndarray): Le poids de chaque segment
+        """
+        speeds, lengths = self.edges["speeds"], self.edges["lengths"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = np.where(speeds > 0, (lengths / 1000) / speeds * 60, lengths)
+        if gestion:
+            allowed = np.fromiter((value in gestion for value in self.edges["gestion"]), dtype=bool, count=len(weights))
+            weights[~allowed] = np.inf
+        if camionnage:
+            allowed = np.fromiter((value in camionnage for value in self.edges["camionnage"]), dtype=bool, count=len(weights))
+            weights[~allowed] += 200
+        return weights
+
+    def clearProfiles(self):
+        """ Permet de retirer les poids précalculés des profils de routage """
+        with self.profiles_lock: self.profiles = {}
+        self.hierarchies = {}
+        self.csr_matrices = {}
+
+    @staticmethod
+    def getProfile(gestion=[], camionnage=[])->tuple:
+        """ Permet de retourner la clé d'un profil de routage """
+        return frozenset(gestion or []), frozenset(camionnage or [])
+
+    def getProfileWeights(self, gestion=[], camionnage=[], as_list=False):
+        """
+        Permet de retourner les poids précalculés d'un profil de routage.
+        Les poids sont calculés une seule fois par profil pour tous les segments (incluant ceux bloqués
+        par un obstacle) et la recherche lit ensuite seulement ces poids.
+
+        Args:
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            as_list (bool, optional): Retourner une liste Python (plus rapide à lire dans une recherche). Defaults to False.
+
+        Returns (np.ndarray ou list): Le poids de chaque segment pour le profil
+        """
+        profile = RoadNetwork.getProfile(gestion, camionnage)
+        cached = self.profiles.get(profile, None)
+        if cached is None:
+            with self.profiles_lock:
+                # Le profil peut avoir été calculé par une autre requête
+                cached = self.profiles.get(profile, None)
+                if cached is None:
+                    weights = self.edgeWeights(gestion=profile[0], camionnage=profile[1])
+                    cached = self.profiles[profile] = (weights, weights.tolist())
+        return cached[1] if as_list else cached[0]
+
+    def createContractionHierarchy(self, gestion=[], camionnage=[], file_path:str=None, witness_limit=50, feedback=None):
+        """
+        Permet de précalculer la hiérarchie de contraction d'un profil de routage pour répondre
+        rapidement aux requêtes répétées sur un réseau statique (methode "ch" de shortestPath).
+        Les segments bloqués par un obstacle sont inclus dans la hiérarchie.
+
+        Args:
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            file_path (str, optional): Le fichier .npz où sauvegarder la hiérarchie. Defaults to None.
+            witness_limit (int, optional): Le nombre de noeuds visités pour chercher un chemin témoin. Defaults to 50.
+            feedback (QgsTask, optional): Objet avec setProgress et isCanceled. Defaults to None.
+
+        Returns (ContractionHierarchy): La hiérarchie ou None si la création est annulée
+        """
+        hierarchy = ContractionHierarchy.fromEdges(
+            len(self.nodes_xy),
+            self.edges["tails"],
+            self.edges["heads"],
+            self.getProfileWeights(gestion=gestion, camionnage=camionnage),
+            witness_limit=witness_limit,
+            metadata=self.getHierarchyMetadata(gestion, camionnage),
+            feedback=feedback)
+        if hierarchy is None: return None
+        self.hierarchies[RoadNetwork.getProfile(gestion, camionnage)] = hierarchy
+        if file_path: hierarchy.save(file_path)
+        return hierarchy
+
+    def loadContractionHierarchy(self, file_path:str, gestion=[], camionnage=[]):
+        """
+        Permet de charger une hiérarchie de contraction sauvegardée pour un profil de routage.
+        La hiérarchie est refusée si les noeuds, les segments ou les poids du profil ont changé.
+
+        Args:
+            file_path (str): Le fichier .npz de la hiérarchie (voir createContractionHierarchy)
+            gestion (list, optional): Liste des autorité de gestion du profil. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage du profil. Defaults to [].
+
+        Returns (bool): La hiérarchie est chargée
+        """
+        if not os.path.exists(file_path): return False
+        # Un fichier corrompu ou incomplet est ignoré
+        try: hierarchy = ContractionHierarchy.load(file_path)
+        except NPZ_ERRORS: return False
+        if hierarchy.metadata != self.getHierarchyMetadata(gestion, camionnage): return False
+        self.hierarchies[RoadNetwork.getProfile(gestion, camionnage)] = hierarchy
+        return True
+
+    def getHierarchyMetadata(self, gestion=[], camionnage=[])->dict:
+        """ Permet de retourner les informations qui valident une hiérarchie de contraction pour le réseau """
+        return {
+            "gestion": sorted([str(value) for value in gestion or []]),
+            "camionnage": sorted([str(value) for value in camionnage or []]),
+            "nbr_nodes": len(self.nodes_xy),
+            "nbr_edges": len(self.edges["tails"]),
+            "checksum": self.getNodesChecksum(),
+            "edges_checksum": self.getEdgesChecksum(gestion, camionnage)}
+
+    def getEdgesChecksum(self, gestion=[], camionnage=[])->str:
+        """ Permet de retourner une empreinte des noeuds et des poids des segments pour un profil de routage """
+        checksum = hashlib.sha1()
+        checksum.update(np.ascontiguousarray(self.edges["tails"], dtype=np.int64).tobytes())
+        checksum.update(np.ascontiguousarray(self.edges["heads"], dtype=np.int64).tobytes())
+        checksum.update(np.ascontiguousarray(self.getProfileWeights(gestion=gestion, camionnage=camionnage), dtype=float).tobytes())
+        return checksum.hexdigest()
+
+    def getNodesChecksum(self)->str:
+        """ Permet de retourner une empreinte des coordonnées des noeuds dans l'ordre de leurs identifiants """
+        return hashlib.sha1(np.ascontiguousarray(self.nodes_xy, dtype=float).tobytes()).hexdigest()
+
+    def getCSRMatrix(self, gestion=[], camionnage=[], blocked=[])->dict:
+        """
+        Permet de retourner la représentation CSR des segments pour un profil de routage.
+        Seulement le segment de plus petit poids est conservé entre deux noeuds et les segments
+        de poids infini sont retirés. La matrice de base inclut tous les segments et est conservée;
+        les segments bloqués (obstacles et requête) sont appliqués sur une copie des données
+        sans recréer la matrice.
+
+        Args:
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+
+        Returns (dict): {"matrix": csr_matrix des poids (inf pour un segment bloqué), "keys": array trié des clés u * n + v,
+            "weights", "lengths", "ids", "edges": arrays des poids, longueurs, identifiants d'entité et segments de chaque clé}
+        """
+        base = self.getBaseCSRMatrix(gestion=gestion, camionnage=camionnage)
+        blocked_edges = self.getBlockedEdges(blocked)
+        if blocked_edges == set(): return base
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage)
+        all_keys, all_edges = base["all_keys"], base["all_edges"]
+        csr = {name: base[name].copy() for name in ("weights", "lengths", "ids", "edges")}
+        csr["keys"] = base["keys"]
+        # Clés dont le segment conservé est bloqué
+        blocked_array = np.fromiter(blocked_edges, dtype=np.int64, count=len(blocked_edges))
+        positions = np.searchsorted(base["keys"], base["edge_keys"][blocked_array])
+        positions = np.unique(positions[np.isin(blocked_array, base["edges"])])
+        for position in positions.tolist():
+            # Prochain segment non bloqué de la même paire de noeuds en ordre de poids
+            start, end = np.searchsorted(all_keys, base["keys"][position], side="left"), np.searchsorted(all_keys, base["keys"][position], side="right")
+            edge = next((edge for edge in all_edges[start:end].tolist() if not edge in blocked_edges), None)
+            if edge is None: csr["weights"][position] = np.inf
+            else:
+                csr["weights"][position] = weights[edge]
+                csr["lengths"][position] = self.edges["lengths"][edge]
+                csr["ids"][position] = self.edges["ids"][edge]
+                csr["edges"][position] = edge
+        matrix = base["matrix"].copy()
+        matrix.data = csr["weights"]
+        csr["matrix"] = matrix
+        return csr
+
+    def getBaseCSRMatrix(self, gestion=[], camionnage=[])->dict:
+        """
+        Permet de retourner la matrice CSR d'un profil sans segment bloqué (voir getCSRMatrix).
+        Les données sont dans l'ordre des clés, donc la position d'une clé est aussi sa position dans matrix.data.
+
+        Args:
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+
+        Returns (dict): Le dictionnaire de getCSRMatrix avec "all_keys", "all_edges" (tous les segments de poids fini
+            triés par clé et par poids) et "edge_keys" (la clé de chaque segment)
+        """
+        profile = RoadNetwork.getProfile(gestion, camionnage)
+        cached = self.csr_matrices.get(profile, None)
+        if cached is not None: return cached
+        nbr = max(len(self.nodes_xy), 1)
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage)
+        edge_keys = self.edges["tails"] * nbr + self.edges["heads"]
+        edges = np.flatnonzero(np.isfinite(weights))
+        # Trier les segments par paire de noeuds puis par poids
+        order = np.lexsort((weights[edges], edge_keys[edges]))
+        all_edges = edges[order]
+        all_keys = edge_keys[all_edges]
+        # Conserver le segment de plus petit poids de chaque paire de noeuds
+        first = np.concatenate(([True], all_keys[1:] != all_keys[:-1]))[:len(all_keys)]
+        edges, keys = all_edges[first], all_keys[first]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(keys // nbr, minlength=len(self.nodes_xy)))))
+        self.csr_matrices[profile] = {
+            "matrix": csr_matrix((weights[edges], keys % nbr, indptr), shape=(len(self.nodes_xy),) * 2),
+            "keys": keys,
+            "weights": weights[edges],
+            "lengths": self.edges["lengths"][edges],
+            "ids": self.edges["ids"][edges],
+            "edges": edges,
+            "all_keys": all_keys,
+            "all_edges": all_edges,
+            "edge_keys": edge_keys}
+        return self.csr_matrices[profile]
+
+    def travelTimeMatrix(self, origins:list, destinations:list, gestion=[], camionnage=[], blocked=[], snap_edges=True):
+        """
+        Permet de calculer les temps et longueurs des plus courts chemins entre chaque origine et chaque destination.
+        Les points sont accrochés au réseau en lot et une seule recherche un à plusieurs (scipy.sparse.csgraph)
+        est faite par noeud de départ unique, sans créer de géometrie. Avec l'accrochage aux segments, les noeuds
+        virtuels des points (voir getVirtualNodes) sont combinés aux résultats des recherches sans modifier la matrice.
+
+        Args:
+            origins (list): Liste des QgsPointXY ou array (n, 2) des origines
+            destinations (list): Liste des QgsPointXY ou array (m, 2) des destinations
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+            snap_edges (bool, optional): Accrocher les points au segment le plus proche (voir snapToEdges)
+                plutôt qu'au noeud le plus proche. Defaults to True.
+
+        Returns (tuple): (array (n, m) des poids du profil, array (n, m) des longueurs en mètres)
+            inf s'il n'y a pas de chemin et nan si le point n'est pas accroché au réseau
+        """
+        csr = self.getCSRMatrix(gestion=gestion, camionnage=camionnage, blocked=blocked)
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage)
+        if snap_edges:
+            origin_edges = self.snapToEdges(origins, gestion=gestion, camionnage=camionnage, blocked=blocked)["edges"]
+            destination_edges = self.snapToEdges(destinations, gestion=gestion, camionnage=camionnage, blocked=blocked)["edges"]
+            origin_nodes = [self.getVirtualNodes(edges, weights, start=True) for edges in origin_edges]
+            destination_nodes = [self.getVirtualNodes(edges, weights, start=False) for edges in destination_edges]
+        else:
+            # Un seul noeud de poids nul par point
+            origin_edges, destination_edges = [[] for _ in range(len(origins))], [[] for _ in range(len(destinations))]
+            origin_nodes = [{} if node == -1 else {node: (0.0, 0.0, -1, 0.0)} for node in self.getNodeIdsFromPoints(origins, blocked=blocked).tolist()]
+            destination_nodes = [{} if node == -1 else {node: (0.0, 0.0, -1, 0.0)} for node in self.getNodeIdsFromPoints(destinations, blocked=blocked).tolist()]
+        nbr_o, nbr_d = len(origin_nodes), len(destination_nodes)
+        times, lengths = np.full((nbr_o, nbr_d), np.nan), np.full((nbr_o, nbr_d), np.nan)
+        valid_d = np.array([nodes != {} for nodes in destination_nodes], dtype=bool)
+        sources = np.unique([node for nodes in origin_nodes for node in nodes]).astype(np.int64)
+        if len(sources) == 0 or not valid_d.any(): return times, lengths
+        # Noeuds virtuels des destinations dans des arrays (m, k)
+        k = max(len(nodes) for nodes in destination_nodes)
+        end_nodes, end_weights, end_lengths = np.zeros((nbr_d, k), dtype=np.int64), np.full((nbr_d, k), np.inf), np.zeros((nbr_d, k))
+        for i, nodes in enumerate(destination_nodes):
+            for j, (node, (weight, length, _, _)) in enumerate(nodes.items()):
+                end_nodes[i, j], end_weights[i, j], end_lengths[i, j] = node, weight, length
+        targets = np.unique(end_nodes[np.isfinite(end_weights)])
+        distances, predecessors = dijkstra(csr["matrix"], directed=True, indices=sources, return_predecessors=True)
+        distances, predecessors = distances.reshape(len(sources), -1), predecessors.reshape(len(sources), -1)
+        node_lengths = np.zeros(distances.shape)
+        for i in range(len(sources)): node_lengths[i, targets] = self.pathLengths(predecessors[i], targets, csr["keys"], csr["lengths"])
+        rows = {node: i for i, node in enumerate(sources.tolist())}
+        # Destinations de chaque segment pour les chemins directs sur un segment commun
+        edge_destinations = {}
+        for i, edges in enumerate(destination_edges):
+            for edge, fraction in edges: edge_destinations.setdefault(edge, []).append((i, fraction))
+        columns = np.arange(nbr_d)
+        for i, nodes in enumerate(origin_nodes):
+            if nodes == {}: continue
+            best_times, best_lengths = np.full(nbr_d, np.inf), np.full(nbr_d, np.inf)
+            for node, (weight, length, _, _) in nodes.items():
+                row = rows[node]
+                candidates = weight + distances[row][end_nodes] + end_weights
+                best = np.argmin(candidates, axis=1)
+                candidate_times = candidates[columns, best]
+                candidate_lengths = length + node_lengths[row][end_nodes[columns, best]] + end_lengths[columns, best]
+                better = candidate_times < best_times
+                best_times[better], best_lengths[better] = candidate_times[better], candidate_lengths[better]
+            for edge, fraction in origin_edges[i]:
+                for j, end_fraction in edge_destinations.get(edge, []):
+                    if end_fraction >= fraction and weights[edge] * (end_fraction - fraction) < best_times[j]:
+                        best_times[j] = weights[edge] * (end_fraction - fraction)
+                        best_lengths[j] = self.edges["lengths"][edge] * (end_fraction - fraction)
+            times[i, valid_d], lengths[i, valid_d] = best_times[valid_d], best_lengths[valid_d]
+        return times, lengths
+
+    def serviceArea(self, points:list, max_time:float, gestion=[], camionnage=[], blocked=[], snap_edges=True)->dict:
+        """
+        Permet de trouver les parties de segments atteignables à partir d'un ou plusieurs points de départ
+        à l'intérieur d'un temps maximal. Une seule recherche bornée est faite pour tous les points
+        de départ (ex: tous les garages d'un CS) à partir d'un noeud source relié aux noeuds virtuels
+        des points (voir getVirtualNodes). Chaque partie d'une géometrie est retournée une seule fois: les sens
+        d'une route à double sens et les points accrochés se partagent la géometrie selon le temps d'arrivée.
+
+        Args:
+            points (list): Liste des QgsPointXY ou array (n, 2) des points de départ
+            max_time (float): Le poids maximal (temps en minutes si la vitesse est définie)
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+            snap_edges (bool, optional): Accrocher les points au segment le plus proche (voir snapToEdges)
+                plutôt qu'au noeud le plus proche. Defaults to True.
+
+        Returns (dict): {"nodes": array du temps d'arrivée à chaque noeud (inf si non atteint),
+            "tails", "heads", "ids", "edges", "fraction_d", "fraction_f", "time_d", "time_f": arrays des parties de
+            segments atteintes dans le sens de parcours avec le temps au début et à la fin de la partie
+            (time_f peut dépasser max_time pour une partie atteinte partiellement)}
+        """
+        nbr = len(self.nodes_xy)
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage).copy()
+        blocked_edges = self.getBlockedEdges(blocked)
+        if blocked_edges: weights[np.fromiter(blocked_edges, dtype=np.int64, count=len(blocked_edges))] = np.inf
+        if snap_edges:
+            snaps = self.snapToEdges(points, gestion=gestion, camionnage=camionnage, blocked=blocked)["edges"]
+            start_nodes = [self.getVirtualNodes(edges, weights, start=True) for edges in snaps]
+        else:
+            snaps = []
+            start_nodes = [{} if node == -1 else {node: (0.0, 0.0, -1, 0.0)} for node in self.getNodeIdsFromPoints(points, blocked=blocked).tolist()]
+        # Poids du noeud source jusqu'à chaque noeud virtuel
+        offsets = {}
+        for nodes in start_nodes:
+            for node, (weight, _, _, _) in nodes.items(): offsets[node] = min(weight, offsets.get(node, np.inf))
+        node_times = np.full(nbr, np.inf)
+        if offsets:
+            matrix = self.getCSRMatrix(gestion=gestion, camionnage=camionnage, blocked=blocked)["matrix"]
+            # Le noeud source est ajouté à la fin de la matrice sans la modifier
+            indices = np.concatenate((matrix.indices, np.fromiter(offsets.keys(), dtype=np.int64, count=len(offsets))))
+            data = np.concatenate((matrix.data, np.fromiter(offsets.values(), dtype=float, count=len(offsets))))
+            indptr = np.concatenate((matrix.indptr, [len(indices)]))
+            matrix = csr_matrix((data, indices, indptr), shape=(nbr + 1, nbr + 1))
+            node_times = dijkstra(matrix, directed=True, indices=nbr, limit=max_time)[:nbr]
+
+        # Segments de chaque géometrie (les deux sens d'une route partagent la géometrie)
+        index = self.getSnapIndex()
+        group_edges, reverse = index["edges"], index["reverse"]
+        groups = np.repeat(np.arange(len(index["lengths"])), np.diff(index["indptr"]))
+        usable = np.isfinite(weights[group_edges])
+        forward_count = np.bincount(groups[usable & ~reverse], minlength=len(index["lengths"]))
+        backward_count = np.bincount(groups[usable & reverse], minlength=len(index["lengths"]))
+        # Les géometries avec un point accroché ou plusieurs segments dans un sens sont partagées entre plusieurs fronts
+        edge_groups = np.full(len(weights), -1, dtype=np.int64)
+        edge_groups[group_edges] = groups
+        split = (forward_count > 1) | (backward_count > 1)
+        point_fronts = {}
+        for edges in snaps:
+            for edge, fraction in edges:
+                split[edge_groups[edge]] = True
+                point_fronts.setdefault(int(edge_groups[edge]), []).append((edge, fraction))
+
+        parts = {name: [] for name in ("edges", "fraction_d", "fraction_f", "time_d")}
+        # Géometries parcourues par au plus un segment dans chaque sens: partage au point de rencontre des deux sens
+        simple = usable & ~split[groups]
+        edge_a, edge_b = np.full(len(split), -1, dtype=np.int64), np.full(len(split), -1, dtype=np.int64)
+        edge_a[groups[simple & ~reverse]] = group_edges[simple & ~reverse]
+        edge_b[groups[simple & reverse]] = group_edges[simple & reverse]
+        time_a = np.where(edge_a != -1, node_times[self.edges["tails"][edge_a]], np.inf)
+        time_b = np.where(edge_b != -1, node_times[self.edges["tails"][edge_b]], np.inf)
+        weight_a, weight_b = np.where(edge_a != -1, weights[edge_a], 0.0), np.where(edge_b != -1, weights[edge_b], 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            meet = (time_b + weight_b - time_a) / (weight_a + weight_b)
+        meet = np.where(np.isnan(meet), (time_a <= time_b).astype(float), np.clip(meet, 0, 1))
+        for edges, times, fractions in ((edge_a, time_a, meet), (edge_b, time_b, 1 - meet)):
+            reached = (edges != -1) & (times < max_time) & (fractions > 0)
+            parts["edges"].append(edges[reached])
+            parts["fraction_d"].append(np.zeros(reached.sum()))
+            parts["fraction_f"].append(fractions[reached])
+            parts["time_d"].append(times[reached])
+        # Autres géometries: partage entre les fronts des noeuds de début et des points accrochés
+        for group in np.flatnonzero(split).tolist():
+            fronts = []
+            for j in range(index["indptr"][group], index["indptr"][group + 1]):
+                edge = int(group_edges[j])
+                if not usable[j]: continue
+                direction = -1 if reverse[j] else 1
+                fronts.append((1.0 if reverse[j] else 0.0, float(node_times[self.edges["tails"][edge]]), direction, float(weights[edge]), edge))
+            for edge, fraction in point_fronts.get(group, []):
+                is_reverse = bool(self.edges["vertex_d"][edge] > self.edges["vertex_f"][edge])
+                fronts.append((1 - fraction if is_reverse else fraction, 0.0, -1 if is_reverse else 1, float(weights[edge]), int(edge)))
+            for (position, time_front, direction, weight, edge), position_d, position_f in RoadNetwork.splitFronts(fronts):
+                # Partie dans le sens de parcours du segment
+                start = position_d if direction == 1 else position_f
+                time_d = time_front + abs(start - position) * weight
+                if time_d >= max_time: continue
+                parts["edges"].append([edge])
+                parts["fraction_d"].append([position_d if direction == 1 else 1 - position_f])
+                parts["fraction_f"].append([position_f if direction == 1 else 1 - position_d])
+                parts["time_d"].append([time_d])
+        area = {name: np.concatenate(values) if values else np.empty(0) for name, values in parts.items()}
+        edges = area["edges"].astype(np.int64)
+        return {
+            "nodes": node_times,
+            "tails": self.edges["tails"][edges],
+            "heads": self.edges["heads"][edges],
+            "ids": self.edges["ids"][edges],
+            "edges": edges,
+            "fraction_d": area["fraction_d"],
+            "fraction_f": area["fraction_f"],
+            "time_d": area["time_d"],
+            "time_f": area["time_d"] + (area["fraction_f"] - area["fraction_d"]) * weights[edges]}
+
+    @staticmethod
+    def splitFronts(fronts:list)->list:
+        """
+        Permet de partager une géometrie entre des fronts de parcours selon le plus petit temps d'arrivée.
+        Un front part d'une position le long de la géometrie (0 au début, 1 à la fin) à un temps donné et
+        avance dans une direction avec le poids du segment pour la géometrie complète.
+
+        Args:
+            fronts (list): Liste des fronts (position, temps, direction 1 ou -1, poids, segment)
+
+        Returns (list): Liste des parties [(front, position de début, position de fin)] dans le sens de la géometrie
+        """
+        fronts = [front for front in fronts if math.isfinite(front[1])]
+        breaks = {0.0, 1.0}
+        for position, _, _, _, _ in fronts: breaks.add(min(max(position, 0.0), 1.0))
+        # Positions où deux fronts arrivent au même temps
+        for i, (position_1, time_1, direction_1, weight_1, _) in enumerate(fronts):
+            for position_2, time_2, direction_2, weight_2, _ in fronts[i + 1:]:
+                slope = direction_1 * weight_1 - direction_2 * weight_2
+                if slope == 0: continue
+                meet = ((time_2 - direction_2 * weight_2 * position_2) - (time_1 - direction_1 * weight_1 * position_1)) / slope
+                if 0 < meet < 1: breaks.add(meet)
+        breaks = sorted(breaks)
+        parts = []
+        for position_d, position_f in zip(breaks[:-1], breaks[1:]):
+            middle = (position_d + position_f) / 2
+            best, best_time = None, math.inf
+            for front in fronts:
+                position, time_front, direction, weight, _ = front
+                if (middle - position) * direction < 0: continue
+                arrival = time_front + (middle - position) * direction * weight
+                if arrival < best_time: best, best_time = front, arrival
+            if best is None: continue
+            # Fusionner les parties consécutives du même front
+            if parts and parts[-1][0] is best and parts[-1][2] == position_d: parts[-1] = (best, parts[-1][1], position_f)
+            else: parts.append((best, position_d, position_f))
+        return parts
+
+    def createServiceAreaLayer(self, points:list, bands=[15, 30, 45], gestion=[], camionnage=[], polygon=False, blocked=[], snap_edges=True)->QgsVectorLayer:
+        """
+        Permet de créer la couche des aires de service (isochrones) par bande de temps.
+        Chaque partie de segment atteinte (voir serviceArea) est découpée selon les bandes de temps pour que les lignes ne se superposent pas.
+
+        Args:
+            points (list): Liste des QgsPointXY ou array (n, 2) des points de départ
+            bands (list, optional): Les bornes supérieures des bandes de temps. Defaults to [15, 30, 45].
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            polygon (bool, optional): Créer un polygone (enveloppe des lignes) par bande. Defaults to False.
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+            snap_edges (bool, optional): Accrocher les points au segment le plus proche (voir snapToEdges). Defaults to True.
+
+        Returns (QgsVectorLayer): La couche des lignes ou des polygones avec la bande de temps
+        """
+        bands = sorted(bands)
+        area = self.serviceArea(points, bands[-1], gestion=gestion, camionnage=camionnage, blocked=blocked, snap_edges=snap_edges)
+        # Géometries des lignes de chaque bande
+        band_lines = {band: [] for band in bands}
+        line_features = []
+        columns = [area[name].tolist() for name in ("edges", "ids", "fraction_d", "fraction_f", "time_d", "time_f")]
+        for edge, feat_id, fraction_d, fraction_f, time_d, time_f in zip(*columns):
+            previous = 0
+            for band in bands:
+                # Portion de la partie de segment parcourue entre la bande précédente et cette bande
+                duration = time_f - time_d
+                start = min(max((previous - time_d) / duration, 0), 1) if duration > 0 else 0
+                end = min(max((band - time_d) / duration, 0), 1) if duration > 0 else 1
+                previous = band
+                if end <= start: continue
+                # Géometrie dans le sens de parcours à partir des sommets conservés dans le réseau
+                coords = self.getEdgePartCoords(edge, fraction_d + start * (fraction_f - fraction_d), fraction_d + end * (fraction_f - fraction_d))
+                part = QgsGeometry.fromPolylineXY([QgsPointXY(x, y) for x, y in coords.tolist()])
+                band_lines[band].append(part)
+                line_features.append((part, {0: band, 1: feat_id, 2: time_d, 3: time_f}))
+
+        layer = QgsVectorLayer("Polygon" if polygon else "LineString", "Aire de service", "memory")
+        layer.setCrs(self.roads_layer.crs())
+        fields = [QgsField("band", QVariant.Double)]
+        if not polygon: fields.extend([QgsField("id", QVariant.LongLong), QgsField("time_d", QVariant.Double), QgsField("time_f", QVariant.Double)])
+        layer.dataProvider().addAttributes(fields)
+        layer.updateFields()
+        features = []
+        if polygon:
+            # Les bandes sont cumulatives: la bande 30 inclut les lignes de la bande 15
+            lines = []
+            for band in bands:
+                lines.extend(band_lines[band])
+                if lines == []: continue
+                geom = QgsGeometry.collectGeometry(lines)
+                hull = geom.concaveHull(0.3) if hasattr(geom, "concaveHull") else geom.convexHull()
+                features.append(QgsVectorLayerUtils.createFeature(layer, hull, {0: band}))
+        else: features = [QgsVectorLayerUtils.createFeature(layer, geom, att) for geom, att in line_features]
+        layer.dataProvider().addFeatures(features)
+        return layer
+
+    def pathLengths(self, predecessors:np.ndarray, targets:np.ndarray, keys:np.ndarray, key_lengths:np.ndarray)->np.ndarray:
+        """
+        Permet de calculer la longueur des chemins d'un arbre des plus courts chemins jusqu'à chaque cible.
+        Les chemins sont remontés en parallèle d'un segment à la fois.
+
+        Args:
+            predecessors (np.ndarray): Le noeud précédent de chaque noeud dans l'arbre (négatif pour aucun)
+            targets (np.ndarray): Les noeuds cibles
+            keys (np.ndarray): Les clés triées u * n + v des segments (voir getCSRMatrix)
+            key_lengths (np.ndarray): La longueur de chaque clé
+
+        Returns (np.ndarray): La longueur du chemin jusqu'à chaque cible
+        """
+        nbr = len(predecessors)
+        current = np.asarray(targets, dtype=np.int64).copy()
+        totals = np.zeros(len(current))
+        active = predecessors[current] >= 0
+        while active.any():
+            previous = predecessors[current[active]]
+            totals[active] += key_lengths[np.searchsorted(keys, previous * nbr + current[active])]
+            current[active] = previous
+            active[active] = predecessors[previous] >= 0
+        return totals
+
+    def getHeuristic(self):
+        """
+        Permet de retourner l'heuristique A* du réseau: la distance en ligne droite entre deux noeuds
+        multipliée par le poids minimum par mètre des segments (ex: 60 / (1000 * vitesse maximale)
+        pour un poids en minutes). Elle est admissible puisqu'un segment est au moins aussi long
+        que la ligne droite entre ses noeuds et que les profils ne font qu'augmenter les poids.
+
+        Returns (function): L'heuristique (noeud, cible) -> poids minimum restant entre deux identifiants de noeud
+        """
+        if self.heuristic_factor is None:
+            lengths = self.edges["lengths"]
+            positive = lengths > 0
+            factors = self.edgeWeights()[positive] / lengths[positive]
+            self.heuristic_factor = float(factors.min()) if len(factors) else 0
+        factor = self.heuristic_factor
+        adjacency = self.getAdjacency()
+        xs, ys = adjacency["xs"], adjacency["ys"]
+        return lambda a, b: factor * math.hypot(xs[a] - xs[b], ys[a] - ys[b])
+
+    def shortestPath(self, start_node:int, end_node:int, gestion=[], camionnage=[], methode="dijkstra", stats:dict=None, blocked=[]):
+        """
+        Permet de trouver le chemin le plus court entre deux noeuds du réseau.
+        Les segments bloqués par un obstacle ou par la requête sont ignorés sans modifier le réseau,
+        donc plusieurs requêtes peuvent être faites en parallèle sur le même réseau.
+
+        Args:
+            start_node (int): Identifiant du noeud de départ ou {noeud: poids initial} des noeuds virtuels de départ
+            end_node (int): Identifiant du noeud de fin ou {noeud: poids final} des noeuds virtuels de fin (voir getVirtualNodes)
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            methode (str, optional): L'algorithme de recherche ("dijkstra", "astar", "bidirectional" ou "ch"). Defaults to "dijkstra".
+                "ch" utilise la hiérarchie de contraction du profil (voir createContractionHierarchy)
+            stats (dict, optional): Dictionnaire où ajouter le nombre de noeuds développés ("expanded"). Defaults to None.
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+
+        Returns (tuple): (poids total, liste des segments) ou None s'il n'y a pas de chemin
+        """
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage, as_list=True)
+        blocked = self.getBlockedEdges(blocked)
+        if methode == "ch":
+            starts = start_node if isinstance(start_node, dict) else {start_node: 0.0}
+            ends = end_node if isinstance(end_node, dict) else {end_node: 0.0}
+            profile = RoadNetwork.getProfile(gestion, camionnage)
+            best, expanded, result = None, 0, None
+            # Une requête par paire de noeuds de départ et de fin
+            for start, start_weight in starts.items():
+                for end, end_weight in ends.items():
+                    query_stats = {}
+                    result = self.shortestPathHierarchy(start, end, profile, weights, blocked, stats=query_stats)
+                    expanded += query_stats.get("expanded", 0)
+                    if result is False: break
+                    if result is not None and (best is None or start_weight + result[0] + end_weight < best[0]):
+                        best = (start_weight + result[0] + end_weight, result[1])
+                if result is False: break
+            if stats is not None: stats["expanded"] = expanded
+            # Recherche normale si la hiérarchie n'existe pas ou si un obstacle bloque son chemin
+            if result is not False: return best
+            methode = "bidirectional"
+        if methode == "bidirectional": return self.searchBidirectional(start_node, end_node, weights, blocked, stats=stats)
+        return self.searchPath(start_node, end_node, weights, blocked, astar=methode == "astar", stats=stats)
+
+    def shortestPathFromSnaps(self, start_edges:list, end_edges:list, gestion=[], camionnage=[], methode="dijkstra", stats:dict=None, blocked=[]):
+        """
+        Permet de trouver le chemin le plus court entre deux points accrochés au milieu de segments (voir snapToEdges).
+        Les points sont reliés au réseau par des noeuds virtuels définis seulement pour la requête (voir getVirtualNodes),
+        donc le réseau n'est pas modifié et plusieurs requêtes peuvent être faites en parallèle.
+
+        Args:
+            start_edges (list): Les segments [(segment, fraction)] du point de départ
+            end_edges (list): Les segments [(segment, fraction)] du point d'arrivée
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            methode (str, optional): L'algorithme de recherche (voir shortestPath). Defaults to "dijkstra".
+            stats (dict, optional): Dictionnaire où ajouter le nombre de noeuds développés ("expanded"). Defaults to None.
+            blocked (list, optional): Liste des identifiants de route à bloquer pour la requête. Defaults to [].
+
+        Returns (tuple): (poids total, longueur totale, liste des parties [(segment, fraction de début, fraction de fin)])
+            ou None s'il n'y a pas de chemin
+        """
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage)
+        starts = self.getVirtualNodes(start_edges, weights, start=True)
+        ends = self.getVirtualNodes(end_edges, weights, start=False)
+        best = None
+        # Chemin direct sur un segment commun quand l'arrivée est plus loin que le départ
+        end_fractions = {edge: fraction for edge, fraction in end_edges}
+        for edge, fraction in start_edges:
+            if end_fractions.get(edge, -1) >= fraction:
+                part = (float(weights[edge]) * (end_fractions[edge] - fraction), float(self.edges["lengths"][edge]) * (end_fractions[edge] - fraction), [(edge, fraction, end_fractions[edge])])
+                if best is None or part[0] < best[0]: best = part
+        if starts == {} or ends == {}: return best
+        result = self.shortestPath(
+            {node: value[0] for node, value in starts.items()},
+            {node: value[0] for node, value in ends.items()},
+            gestion=gestion,
+            camionnage=camionnage,
+            methode=methode,
+            stats=stats,
+            blocked=blocked)
+        if result is None or (best is not None and best[0] <= result[0]): return best
+        total, path = result
+        # Noeuds virtuels utilisés par le chemin
+        if path: start_node, end_node = int(self.edges["tails"][path[0]]), int(self.edges["heads"][path[-1]])
+        else: start_node = end_node = min((node for node in starts if node in ends), key=lambda node: starts[node][0] + ends[node][0])
+        _, start_length, start_edge, start_fraction = starts[start_node]
+        _, end_length, end_edge, end_fraction = ends[end_node]
+        parts = [(edge, 0.0, 1.0) for edge in path]
+        if start_edge != -1 and start_fraction < 1: parts.insert(0, (start_edge, start_fraction, 1.0))
+        if end_edge != -1 and end_fraction > 0: parts.append((end_edge, 0.0, end_fraction))
+        return total, start_length + float(self.edges["lengths"][path].sum()) + end_length, parts
+
+    def searchPath(self, start_node:int, end_node:int, weights:list, blocked:set, astar=False, stats:dict=None):
+        """
+        Permet de trouver le chemin le plus court avec Dijkstra (ou A*) sur les listes d'adjacence.
+        La recherche s'arrête dès qu'aucun noeud restant ne peut améliorer le chemin vers un noeud de fin.
+
+        Args:
+            start_node (int): Identifiant du noeud de départ ou {noeud: poids initial}
+            end_node (int): Identifiant du noeud de fin ou {noeud: poids final}
+            weights (list): Le poids de chaque segment
+            blocked (set): Les segments à ignorer
+            astar (bool, optional): Utiliser l'heuristique A* (voir getHeuristic). Defaults to False.
+            stats (dict, optional): Dictionnaire où ajouter le nombre de noeuds développés ("expanded"). Defaults to None.
+
+        Returns (tuple): (poids total, liste des segments) ou None s'il n'y a pas de chemin
+        """
+        adjacency = self.getAdjacency()
+        out_indptr, out_edges, tails, heads = adjacency["out_indptr"], adjacency["out_edges"], adjacency["tails"], adjacency["heads"]
+        starts = start_node if isinstance(start_node, dict) else {start_node: 0.0}
+        ends = end_node if isinstance(end_node, dict) else {end_node: 0.0}
+        inf = float("inf")
+        if not astar: heuristic = lambda node: 0.0
+        elif len(ends) == 1:
+            (end, end_weight), = ends.items()
+            node_heuristic = self.getHeuristic()
+            heuristic = lambda node: node_heuristic(node, end) + end_weight
+        else:
+            # Minimum sur les noeuds de fin, qui reste admissible et cohérent
+            node_heuristic = self.getHeuristic()
+            heuristic = lambda node: min(node_heuristic(node, end) + end_weight for end, end_weight in ends.items())
+        dist, parents, closed = dict(starts), {node: -1 for node in starts}, set()
+        heap = [(weight + heuristic(node), weight, node) for node, weight in starts.items()]
+        heapq.heapify(heap)
+        best, best_node = inf, -1
+        while heap:
+            key, d, node = heapq.heappop(heap)
+            if key >= best: break
+            if node in closed: continue
+            closed.add(node)
+            if node in ends and d + ends[node] < best:
+                best, best_node = d + ends[node], node
+                if key >= best: break
+            for i in range(out_indptr[node], out_indptr[node + 1]):
+                edge = out_edges[i]
+                weight = weights[edge]
+                if not weight < inf or edge in blocked: continue
+                head, nd = heads[edge], d + weight
+                if nd < dist.get(head, inf):
+                    dist[head], parents[head] = nd, edge
+                    heapq.heappush(heap, (nd + heuristic(head), nd, head))
+        if stats is not None: stats["expanded"] = len(closed)
+        if best_node == -1: return None
+        path, node = [], best_node
+        while parents[node] != -1:
+            path.append(parents[node])
+            node = tails[parents[node]]
+        path.reverse()
+        return best, path
+
+    def searchBidirectional(self, start_node:int, end_node:int, weights:list, blocked:set, stats:dict=None):
+        """
+        Permet de trouver le chemin le plus court avec une recherche Dijkstra bidirectionnelle
+        sur les segments sortants (à partir du départ) et entrants (à partir de la fin).
+
+        Args:
+            start_node (int): Identifiant du noeud de départ ou {noeud: poids initial}
+            end_node (int): Identifiant du noeud de fin ou {noeud: poids final}
+            weights (list): Le poids de chaque segment
+            blocked (set): Les segments à ignorer
+            stats (dict, optional): Dictionnaire où ajouter le nombre de noeuds développés ("expanded"). Defaults to None.
+
+        Returns (tuple): (poids total, liste des segments) ou None s'il n'y a pas de chemin
+        """
+        adjacency = self.getAdjacency()
+        tails, heads = adjacency["tails"], adjacency["heads"]
+        # Recherche avant sur les segments sortants et arrière sur les segments entrants
+        sides = (
+            (adjacency["out_indptr"], adjacency["out_edges"], heads),
+            (adjacency["in_indptr"], adjacency["in_edges"], tails))
+        starts = start_node if isinstance(start_node, dict) else {start_node: 0.0}
+        ends = end_node if isinstance(end_node, dict) else {end_node: 0.0}
+        inf = float("inf")
+        dists, parents = (dict(starts), dict(ends)), ({node: -1 for node in starts}, {node: -1 for node in ends})
+        heaps, closed = ([(weight, node) for node, weight in starts.items()], [(weight, node) for node, weight in ends.items()]), (set(), set())
+        for heap in heaps: heapq.heapify(heap)
+        best, meeting = min([(starts[node] + ends[node], node) for node in starts if node in ends], default=(inf, -1))
+        # Arrêter quand une recherche est terminée ou quand les minimums ne peuvent plus améliorer le chemin
+        while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < best:
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, node = heapq.heappop(heaps[side])
+            if node in closed[side]: continue
+            closed[side].add(node)
+            indptr, edges, others = sides[side]
+            for i in range(indptr[node], indptr[node + 1]):
+                edge = edges[i]
+                weight = weights[edge]
+                if not weight < inf or edge in blocked: continue
+                other, nd = others[edge], d + weight
+                if nd < dists[side].get(other, inf):
+                    dists[side][other], parents[side][other] = nd, edge
+                    heapq.heappush(heaps[side], (nd, other))
+                    remaining = dists[1 - side].get(other, None)
+                    if remaining is not None and nd + remaining < best: best, meeting = nd + remaining, other
+        if stats is not None: stats["expanded"] = len(closed[0]) + len(closed[1])
+        if meeting == -1: return None
+        # Segments du départ au point de rencontre, puis jusqu'à la fin
+        path, node = [], meeting
+        while parents[0][node] != -1:
+            path.append(parents[0][node])
+            node = tails[parents[0][node]]
+        path.reverse()
+        node = meeting
+        while parents[1][node] != -1:
+            path.append(parents[1][node])
+            node = heads[parents[1][node]]
+        return best, path
+
+    def shortestPathHierarchy(self, start_node:int, end_node:int, profile:tuple, weights:list, blocked:set, stats:dict=None):
+        """
+        Permet de trouver le chemin le plus court avec la hiérarchie de contraction d'un profil.
+        Un obstacle ne fait qu'augmenter les poids, donc le chemin de la hiérarchie reste le plus court
+        s'il ne passe par aucun segment bloqué.
+
+        Args:
+            start_node (int): Identifiant du noeud de départ
+            end_node (int): Identifiant du noeud de fin
+            profile (tuple): La clé du profil de routage (voir getProfile)
+            weights (list): Le poids de chaque segment pour le profil
+            blocked (set): Les segments bloqués
+            stats (dict, optional): Dictionnaire où ajouter le nombre de noeuds développés ("expanded"). Defaults to None.
+
+        Returns (tuple): (poids total, liste des segments), None s'il n'y a pas de chemin ou False si la hiérarchie ne peut pas être utilisée
+        """
+        hierarchy = self.hierarchies.get(profile, None)
+        if hierarchy is None: return False
+        result = hierarchy.query(start_node, end_node, stats=stats)
+        if result is None:
+            # Sans raccourci valide, aucun chemin n'existe même sans obstacle
+            return None
+        distance, nodes = result
+        adjacency = self.getAdjacency()
+        out_indptr, out_edges, heads = adjacency["out_indptr"], adjacency["out_edges"], adjacency["heads"]
+        # Segment non bloqué de plus petit poids entre chaque paire de noeuds du chemin
+        path, total = [], 0
+        for u, v in zip(nodes[:-1], nodes[1:]):
+            candidates = [out_edges[i] for i in range(out_indptr[u], out_indptr[u + 1])]
+            candidates = [edge for edge in candidates if heads[edge] == v and not edge in blocked]
+            if candidates == []: return False
+            edge = min(candidates, key=lambda edge: weights[edge])
+            path.append(edge)
+            total += weights[edge]
+        if not math.isclose(total, distance, rel_tol=1e-9, abs_tol=1e-9): return False
+        return distance, path
+
+    def benchmarkItineraire(self, nbr=20, methodes=("dijkstra", "astar", "bidirectional"), gestion=[], camionnage=[], seed=0):
+        """
+        Permet de comparer les algorithmes de recherche sur des paires de noeuds aléatoires du réseau.
+
+        Args:
+            nbr (int, optional): Le nombre de paires de noeuds. Defaults to 20.
+            methodes (tuple, optional): Les algorithmes à comparer (voir shortestPath).
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            seed (int, optional): La graine des paires aléatoires. Defaults to 0.
+
+        Returns (dict): {methode: {"latency_ms", "expanded", "found"}} en moyenne par paire
+        """
+        # Calculer les données partagées avant de mesurer le temps
+        self.getProfileWeights(gestion=gestion, camionnage=camionnage, as_list=True)
+        self.getAdjacency()
+        rnd = random.Random(seed)
+        pairs = [(rnd.randrange(len(self.nodes_xy)), rnd.randrange(len(self.nodes_xy))) for _ in range(nbr)]
+        results = {}
+        for methode in methodes:
+            latency, expanded, found = 0.0, 0, 0
+            for start_node, end_node in pairs:
+                stats = {}
+                start = time.perf_counter()
+                if self.shortestPath(start_node, end_node, gestion=gestion, camionnage=camionnage, methode=methode, stats=stats) is not None: found += 1
+                latency += time.perf_counter() - start
+                expanded += stats.get("expanded", 0)
+            results[methode] = {
+                "latency_ms": 1000 * latency / max(nbr, 1),
+                "expanded": expanded / max(nbr, 1),
+                "found": found}
+        return results
+
+    def itineraire(self, start_point, end_point, obstacle_points=[], gestion=[], camionnage=[], methode="dijkstra", blocked=[], snap_edges=True):
+        """
+        Permet de calculer un itinéraire sur le réseau entre un point de début et de fin.
 
         Args:
             start_point (_type_): Point de début
             end_point (_type_): Point de fin
-            obstacle_points (list, optional): Liste des obstacle à ajouter. Defaults to [].
+            obstacle_points (list, optional): Liste des points d'obstacle à bloquer pour cet itinéraire seulement. Defaults to [].
             gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
             camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            methode (str, optional): L'algorithme de recherche ("dijkstra", "astar", "bidirectional" ou "ch"). Defaults to "dijkstra".
+            blocked (list, optional): Liste des identifiants de route à bloquer pour cet itinéraire seulement. Defaults to [].
+            snap_edges (bool, optional): Accrocher les points au segment le plus proche (voir snapToEdges)
+                plutôt qu'au noeud le plus proche. Defaults to True.
+
+        Returns (QgsVectorLayer): La couche de l'itinéraire
+        """
+        # Les obstacles bloquent seulement les routes de cette requête
+        blocked = list(blocked or []) + [self.getIdRouteFromPoint(point) for point in obstacle_points or []]
+        if snap_edges:
+            # Accrocher les points au milieu des segments avec des noeuds virtuels pour cette requête
+            start_edges, end_edges = self.snapToEdges([start_point, end_point], gestion=gestion, camionnage=camionnage, blocked=blocked)["edges"]
+            result = self.shortestPathFromSnaps(start_edges, end_edges, gestion=gestion, camionnage=camionnage, methode=methode, blocked=blocked)
+            if result is None: return None
+            total_time, total_length, parts = result
+        else:
+            # Définir le noeud de départ et de fin
+            start_node, end_node = self.getNodeIdsFromPoints([start_point, end_point], blocked=blocked).tolist()
+            if start_node == -1 or end_node == -1: return None
+            # Déterminer le chemin le plus court
+            result = self.shortestPath(start_node, end_node, gestion=gestion, camionnage=camionnage, methode=methode, blocked=blocked)
+            if result is None: return None
+            total_time, path = result
+            parts = [(edge, 0.0, 1.0) for edge in path]
+            # Valeur de la longueur de l'itinéraire
+            total_length = float(self.edges["lengths"][path].sum())
+
+        # Points de l'itinéraire assemblés avec les sommets des segments dans le sens de parcours
+        exact_path = np.concatenate([self.getEdgePartCoords(*part) for part in parts]) if parts else np.empty((0, 2))
 
-        Returns (QgsVectorLayer): La couche de l'itinéraire 
-        """
-        # Ajouter les obstacles
-        if obstacle_points: self.addObstacles(obstacle_points)
-        # Définir le noeud de départ
-        start_node = self.getNodeFromPoint(start_point)
-        # Définir le noeud de fin
-        end_node = self.getNodeFromPoint(end_point)
-
-        # Déterminer le chemin le plus court
-        try: path = nx.dijkstra_path(
-            self.graph,
-            start_node,
-            end_node,
-            weight=lambda u, v, d: self.calculateWeight(u, v, d, gestion=gestion, camionnage=camionnage))
-        except nx.NetworkXNoPath: return None
-
-        # Liste des segments de l'itinéraire
-        exact_path = []
-        # Valeur de la longueur de l'itinéraire
-        total_length = 0
-        # Valeur du temps de l'itinéraire
-        total_time = 0
-        # Parcourir les noueuds de l'itinéraire
-        for i in range(len(path) - 1):
-            # Définir le noeud de début et fin
-            u, v = path[i], path[i+1]
-            # Définir les informations sur les attributs des segments
-            edges_data = self.graph.get_edge_data(u, v)
-            # Trouver le poid minimum des segments
-            min_weight = self.calculateWeight(u, v, edges_data, gestion=gestion, camionnage=camionnage)
-            # Parcourir les informations sur les attributs des segments
-            for e, att in edges_data.items():
-                # Garder le segment avec le poid le plus petit
-                if att["weight"] == min_weight: edge = edges_data[e]
-            
-            # Déterminer le feature du segment de route
-            feat = self.roads_layer.getFeature(edge["id"])
-            # Liste des points du segment de route
-            points = feat.geometry().asPolyline()
-            # Inverser la liste des points si la directions de la ligne est inverse
-            if edge["direction"] == 2: points = list(reversed(points))
-            # Définir les index des noeuds
-            start_idx, end_idx = points.index(u), points.index(v)
-            # Définir les points du segments entre les deux noeuds
-            if start_idx < end_idx: segment = points[start_idx:end_idx+1]
-            else: segment = list(reversed(points[end_idx:start_idx+1]))
-            
-            # Ajouter les points du segments au path
-            exact_path.extend(segment)
-            # Ajouter la longueur du segments
-            total_length += edge['length']
-            # Ajouter le temps du segments
-            total_time += edge['weight']
-        
         # Ajouter une tolérence de temps pour démarrer
         total_time += 0.4
         # Formater le temps en minutes
@@ -465,33 +1999,124 @@ class RoadNetwork:
         # Retoruner la couche de l'itinéraire
         return self.createPathLayer(exact_path, att)
 
-    def cheminDetour(self, route_id:int, show=True, gestion=[], camionnage=[]):
+    def cheminDetour(self, route_id:int, show=True, gestion=[], camionnage=[], methode="dijkstra"):
         """
         Permet de calculer un chemin de détour pour un segment du réseau routier.
+        Le détour relie les mêmes noeuds que detourAnalysis (voir getDetourEdge).
 
         Args:
             route_id (int): L'indentifiant du segement de route pour le détour
             show (bool, optional): Ajouter la couche calculer à la carte. Defaults to True.
             gestion (list of str): Liste des gestions à filtrer
+            methode (str, optional): L'algorithme de recherche (voir shortestPath). Defaults to "dijkstra".
 
         Returns: Le chemin de détour calculer
         """
-        # Définir l'entité de la route à calculer le chemin de détour
-        feat = self.roads_layer.getFeature(route_id)
-        # Définir la géometrie de la ligne
-        line = feat.geometry().asPolyline()
-        # Ajouter un obstables temporaire sur le segment de la route 
-        route_ids = self.addObstacle(feat.geometry().interpolate(feat.geometry().length()/2).asPoint())
-        # Définir un itinéraire entre le point de début et de fin du segment
-        layer_detour = self.itineraire(line[-1], line[0], gestion=gestion, camionnage=camionnage)
-        # Retirer les obstacle temporaire
-        for route_id in route_ids: self.removeObstacle(route_id)
-        # Ajouter la couche du détour à la carte si spécifier 
+        edge = self.getDetourEdge(route_id, self.getProfileWeights(gestion=gestion, camionnage=camionnage))
+        # Noeuds du segment de la route, sinon le point de fin et de début de la ligne
+        if edge is None: line = [QgsPointXY(x, y) for x, y in self.getRoadCoords(route_id)[[-1, 0]].tolist()]
+        else: line = [self.getNode(self.edges["tails"][edge]), self.getNode(self.edges["heads"][edge])]
+        # Définir un itinéraire entre les noeuds du segment en bloquant la route pour cette requête
+        layer_detour = self.itineraire(line[0], line[-1], gestion=gestion, camionnage=camionnage, methode=methode, blocked=[route_id], snap_edges=False)
+        # Ajouter la couche du détour à la carte si spécifier
         if show: return self.addPathToMap(layer_detour)
         # Sinon retourner la couche
         else: return layer_detour
 
-    def cheminDetourFromPoint(self, point:QgsPointXY, show=True, gestion=[], camionnage=[]):
+    def getDetourEdge(self, route_id:int, weights:np.ndarray):
+        """
+        Permet de retourner le segment d'une route dont les noeuds sont reliés par son détour.
+        C'est le segment de plus petit poids de la route, du point de fin au point de début de la ligne
+        en premier s'il est permis, donc dans le sens de circulation d'une route à sens unique.
+
+        Args:
+            route_id (int): L'identifiant de la route
+            weights (np.ndarray): Le poids de chaque segment pour le profil
+
+        Returns (int): Le segment ou None si la route n'a pas de segment
+        """
+        edges = self.edges_index.get(route_id, [])
+        if edges == []: return None
+        return min(edges, key=lambda edge: (weights[edge], bool(self.edges["forward"][edge])))
+
+    def detourAnalysis(self, route_ids:list, gestion=[], camionnage=[], methode="dijkstra", workers=None, processes=True, feedback=None)->dict:
+        """
+        Permet de calculer en lot les détours d'une liste de routes (ex: analyse de criticité d'un corridor).
+        Chaque route est bloquée seulement pour sa requête (voir shortestPath), donc les détours sont calculés
+        en parallèle dans des processus avec une copie du réseau sans modifier le réseau. Les recherches sont
+        en Python pur et ne profitent pas de threads (GIL), le calcul est donc fait dans le processus actuel
+        si les processus ne peuvent pas être utilisés.
+        Le détour relie les noeuds du segment de la route choisi par getDetourEdge, comme cheminDetour,
+        sans accrochage à un autre noeud.
+
+        Args:
+            route_ids (list): Liste des identifiants des routes
+            gestion (list, optional): Liste des autorité de gestion à utiliser. Defaults to [].
+            camionnage (list, optional): Liste des classe de camionnage à utiliser. Defaults to [].
+            methode (str, optional): L'algorithme de recherche (voir shortestPath). Defaults to "dijkstra".
+            workers (int, optional): Le nombre de processus. Defaults to None (nombre de processeurs).
+                1 (ou un seul processeur) calcule dans le processus actuel.
+            processes (bool, optional): Calculer les détours dans des processus. Le calcul est fait dans le processus
+                actuel si l'interpréteur Python n'est pas trouvé (voir getPythonExecutable). Defaults to True.
+            feedback (QgsTask, optional): Objet avec setProgress et isCanceled. Defaults to None.
+
+        Returns (dict): Table d'arrays {"id", "length", "time", "detour_length", "detour_time", "extra_length",
+            "extra_time", "reachable"} avec inf pour un détour impossible ou None si le calcul est annulé
+        """
+        weights = self.getProfileWeights(gestion=gestion, camionnage=camionnage)
+        # Calculer les données partagées avant de copier le réseau dans les processus
+        self.getProfileWeights(gestion=gestion, camionnage=camionnage, as_list=True)
+        self.getAdjacency()
+        if methode == "astar": self.getHeuristic()
+        nbr = len(route_ids)
+        table = {
+            "id": np.array(route_ids, dtype=np.int64),
+            "length": np.full(nbr, np.nan),
+            "time": np.full(nbr, np.nan),
+            "detour_length": np.full(nbr, np.inf),
+            "detour_time": np.full(nbr, np.inf)}
+        jobs, rows = [], []
+        for row, route_id in enumerate(route_ids):
+            edge = self.getDetourEdge(route_id, weights)
+            if edge is None: continue
+            table["length"][row] = self.edges["lengths"][edge]
+            table["time"][row] = weights[edge]
+            jobs.append((route_id, int(self.edges["tails"][edge]), int(self.edges["heads"][edge])))
+            rows.append(row)
+
+        # Lots de détours pour limiter les échanges entre les processus
+        batch_size = max(1, min(100, len(jobs) // (4 * (workers or os.cpu_count() or 1)) or 1))
+        batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+        # Les processus utilisent leur copie du réseau (voir initDetourWorker)
+        worker = partial(detourWorker, gestion=gestion, camionnage=camionnage, methode=methode)
+        # Les processus ne sont utiles qu'avec plusieurs processeurs et plusieurs lots
+        parallel = processes and (workers or os.cpu_count() or 1) > 1 and len(batches) > 1
+        python = getPythonExecutable() if parallel else None
+        if python is None:
+            executor = None
+            worker = partial(worker, network=self)
+        else:
+            # Démarrer les processus avec l'interpréteur Python plutôt qu'avec l'application (ex: QGIS)
+            context = multiprocessing.get_context("spawn")
+            context.set_executable(python)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initDetourWorker, initargs=(self,))
+        try:
+            results = map(worker, batches) if executor is None else executor.map(worker, batches)
+            done = 0
+            for batch, batch_results in zip(batches, results):
+                if feedback is not None and feedback.isCanceled(): return None
+                for row, (detour_time, detour_length) in zip(rows[done:done + len(batch)], batch_results):
+                    table["detour_time"][row], table["detour_length"][row] = detour_time, detour_length
+                done += len(batch)
+                if feedback is not None: feedback.setProgress(100 * done / max(len(jobs), 1))
+        finally:
+            if executor is not None: executor.shutdown(wait=True, cancel_futures=True)
+        table["extra_length"] = table["detour_length"] - table["length"]
+        table["extra_time"] = table["detour_time"] - table["time"]
+        table["reachable"] = np.isfinite(table["detour_time"])
+        return table
+
+    def cheminDetourFromPoint(self, point:QgsPointXY, show=True, gestion=[], camionnage=[], methode="dijkstra"):
         """
         Permet de calculer un chemin de détour pour un point donnée.
 
@@ -499,10 +2124,11 @@ class RoadNetwork:
             point (QgsPointXY): Le point le plus proche du réseau auquel faire un détour
             show (bool, optional): Ajouter la couche calculer à la carte. Defaults to True.
             gestion (list of str): Liste des gestions à filtrer
+            methode (str, optional): L'algorithme de recherche (voir shortestPath). Defaults to "dijkstra".
 
         Returns: Le chemin de détour calculer
         """
         id_route = self.getIdRouteFromPoint(point)
-        return self.cheminDetour(id_route, show=show, gestion=gestion, camionnage=camionnage)
+        return self.cheminDetour(id_route, show=show, gestion=gestion, camionnage=camionnage, methode=methode)
 
 
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from .LineSegmentationElement import LineSegmentationElement
+
+class AttributeDictionary:
+    """
+    Dictionnaire partagé des valeurs uniques de chaque attribut.
+    Permet d'encoder les valeurs d'attributs par un index (encodage par dictionnaire).
+    """
+    __slots__ = ("values", "index")
+
+    def __init__(self):
+        # Liste des valeurs uniques de chaque attribut
+        self.values:dict[str, list] = {}
+        # Index de chaque valeur dans la liste des valeurs uniques
+        self.index:dict[str, dict] = {}
+
+    def __contains__(self, name): return name in self.values
+
+    def __len__(self): return len(self.values)
+
+    def decode(self, name:str, code:int):
+        """ Permet de retourner la valeur d'un attribut à partir de son index """
+        return self.values[name][code]
+
+    def encode(self, name:str, value)->int:
+        """
+        Permet de retourner l'index d'une valeur d'attribut. La valeur est ajoutée au dictionnaire si elle n'y est pas.
+        Les valeurs fausses sont encodées comme None, comme la méthode LineSegmentationElement.setAttribut.
+        """
+        if not value: value = None
+        values, index = self.values.setdefault(name, []), self.index.setdefault(name, {})
+        # Le type fait partie de la clé pour ne pas confondre 1, 1.0 et True
+        try: key = (type(value), value); hash(key)
+        except TypeError: key = (type(value), repr(value))
+        if key not in index:
+            index[key] = len(values)
+            values.append(value)
+        return index[key]
+
+    def names(self)->list:
+        """ Permet de retourner la liste des noms d'attributs """
+        return list(self.values.keys())
+
+
+class ColumnarSegmentation:
+    """
+    Représente les segmentations d'un RTSS en colonnes.
+    Les chainages des points de segmentation sont dans un array ordonné. Les éléments de chaque point
+    sont des lignes consécutives (indptr) avec un array par offset et un array d'index par attribut.
+    Les valeurs d'attributs sont dans un AttributeDictionary qui peut être partagé entre les RTSS.
+    """
+    __slots__ = ("chainages", "indptr", "offsets_d", "offsets_f", "interpolate", "codes", "dictionary")
+
+    def __init__(self,
+                 chainages:np.ndarray,
+                 indptr:np.ndarray,
+                 offsets_d:np.ndarray,
+                 offsets_f:np.ndarray,
+                 interpolate:np.ndarray,
+                 codes:dict[str, np.ndarray],
+                 dictionary:AttributeDictionary):
+        """
+        Initialisation d'un objet ColumnarSegmentation
+
+        Args:
+            - chainages (np.ndarray): Array (n) ordonné des chainages des points de segmentation
+            - indptr (np.ndarray): Array (n+1) de la position des éléments de chaque point de segmentation
+            - offsets_d (np.ndarray): Array (m) des offsets de début des éléments
+            - offsets_f (np.ndarray): Array (m) des offsets de fin des éléments
+            - interpolate (np.ndarray): Array (m) booléen de l'interpolation sur le RTSS des éléments
+            - codes (dict): Array (m) des index de valeur de chaque attribut (-1 si l'élément n'a pas l'attribut)
+            - dictionary (AttributeDictionary): Le dictionnaire des valeurs d'attributs
+        """
+        self.chainages = chainages
+        self.indptr = indptr
+        self.offsets_d = offsets_d
+        self.offsets_f = offsets_f
+        self.interpolate = interpolate
+        self.codes = codes
+        self.dictionary = dictionary
+
+    @classmethod
+    def fromRows(cls,
+                 chainages_d,
+                 chainages_f,
+                 attributs:list[dict],
+                 dictionary:AttributeDictionary,
+                 offsets_d=None,
+                 offsets_f=None,
+                 interpolate=None):
+        """
+        Constructeur à partir d'une liste d'éléments (chainage de début, chainage de fin, attributs).
+        Un point de segmentation est créé pour chaque chainage. Les chainages de fin qui ne sont
+        pas le début d'un élément sont des points de segmentation vide (fin d'information).
+
+        Args:
+            - chainages_d (array): Les chainages de début des éléments
+            - chainages_f (array): Les chainages de fin des éléments
+            - attributs (list[dict]): Les attributs de chaque élément
+            - dictionary (AttributeDictionary): Le dictionnaire des valeurs d'attributs
+            - offsets_d (array, optional): Les offsets de début des éléments. Defaults to None (0).
+            - offsets_f (array, optional): Les offsets de fin des éléments. Defaults to None (offset de début).
+            - interpolate (array, optional): L'interpolation sur le RTSS des éléments. Defaults to None (True).
+        """
+        chainages_d = np.asarray(chainages_d, dtype=float)
+        chainages_f = np.asarray(chainages_f, dtype=float)
+        nbr = len(chainages_d)
+        if offsets_d is None: offsets_d = np.zeros(nbr)
+        if offsets_f is None: offsets_f = offsets_d
+        if interpolate is None: interpolate = np.ones(nbr, dtype=bool)
+        # Ordonner les éléments selon leur chainage de début
+        order = np.argsort(chainages_d, kind="stable")
+        chainages = np.unique(np.concatenate((chainages_d, chainages_f)))
+        counts = np.bincount(np.searchsorted(chainages, chainages_d), minlength=len(chainages))
+        codes = {}
+        for row, i in enumerate(order):
+            for name, value in attributs[i].items():
+                if name not in codes: codes[name] = np.full(nbr, -1, dtype=np.int32)
+                codes[name][row] = dictionary.encode(name, value)
+        return cls(
+            chainages=chainages,
+            indptr=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            offsets_d=np.asarray(offsets_d, dtype=float)[order],
+            offsets_f=np.asarray(offsets_f, dtype=float)[order],
+            interpolate=np.asarray(interpolate, dtype=bool)[order],
+            codes=codes,
+            dictionary=dictionary)
+
+    @classmethod
+    def fromLinearReferencing(cls, linear_ref, dictionary:AttributeDictionary):
+        """
+        Constructeur à partir des points de segmentation d'un LinearReferencing.
+
+        Args:
+            - linear_ref (LinearReferencing): Le RTSS segmenté à convertir
+            - dictionary (AttributeDictionary): Le dictionnaire des valeurs d'attributs
+        """
+        chainages, counts, offsets_d, offsets_f, interpolate, attributs = [], [], [], [], [], []
+        for point in linear_ref:
+            chainages.append(float(point.getChainage()))
+            counts.append(len(point.getElements()))
+            for elem in point:
+                offsets_d.append(elem.getOffsetDebut())
+                offsets_f.append(elem.getOffsetFin())
+                interpolate.append(elem.intepolate_on_rtss)
+                attributs.append(elem.getAttributs())
+        codes = {}
+        for row, atts in enumerate(attributs):
+            for name, value in atts.items():
+                if name not in codes: codes[name] = np.full(len(attributs), -1, dtype=np.int32)
+                codes[name][row] = dictionary.encode(name, value)
+        return cls(
+            chainages=np.array(chainages, dtype=float),
+            indptr=np.concatenate(([0], np.cumsum(counts, dtype=np.int64))),
+            offsets_d=np.array(offsets_d, dtype=float),
+            offsets_f=np.array(offsets_f, dtype=float),
+            interpolate=np.array(interpolate, dtype=bool),
+            codes=codes,
+            dictionary=dictionary)
+
+    def __len__(self): return len(self.chainages)
+
+    def __str__(self): return f"ColumnarSegmentation ({len(self.chainages)} segmentations, {len(self.offsets_d)} éléments)"
+
+    def __repr__(self): return self.__str__()
+
+    def createElement(self, row:int)->LineSegmentationElement:
+        """ Permet de créer l'objet LineSegmentationElement d'une ligne """
+        return LineSegmentationElement(
+            offset_d=float(self.offsets_d[row]),
+            offset_f=float(self.offsets_f[row]),
+            intepolate_on_rtss=bool(self.interpolate[row]),
+            **self.getAttributs(row))
+
+    def getAttributs(self, row:int)->dict:
+        """ Permet de retourner le dictionnaire des attributs d'une ligne """
+        return {name: self.dictionary.decode(name, codes[row]) for name, codes in self.codes.items() if codes[row] != -1}
+
+    def getElements(self, index:int)->list[LineSegmentationElement]:
+        """ Permet de créer les éléments du point de segmentation à un index """
+        return [self.createElement(row) for row in range(self.indptr[index], self.indptr[index + 1])]
+
+    def getIntervals(self, start:float, end:float):
+        """
+        Méthode qui permet de retourner les intervalles de segmentation qui chevauchent
+        l'intervalle [start, end). Même logique que LinearReferencing.getIntervals.
+
+        Returns (list[tuple]): Liste de (chainage de début, chainage de fin, index du point de segmentation)
+        """
+        if end < start: start, end = end, start
+        idx_start = max(int(np.searchsorted(self.chainages, start, side="right")) - 1, 0)
+        if end == start: idx_end = idx_start + 1
+        else: idx_end = int(np.searchsorted(self.chainages, end, side="left"))
+        intervals = []
+        for idx in range(idx_start, min(idx_end, len(self.chainages) - 1)):
+            # Ignorer les points de segmentation qui sont une fin
+            if self.isEnd(idx): continue
+            c_d, c_f = float(self.chainages[idx]), float(self.chainages[idx + 1])
+            if c_f <= start and end != start: continue
+            if c_d > start and end == start: continue
+            intervals.append((c_d, c_f, idx))
+        return intervals
+
+    def getSegmentationIndex(self, chainage:float):
+        """
+        Méthode qui permet de retourner l'index du point de segmentation à un chainage.
+        Même logique que LinearReferencing.getSegmentation: le point au chainage exact ou
+        sinon le point précédant s'il n'est pas une fin.
+
+        Returns (int): L'index du point de segmentation ou None
+        """
+        nbr = len(self.chainages)
+        idx = int(np.searchsorted(self.chainages, chainage, side="right")) - 1
+        # Vérifier un point de segmentation au chainage exact. Comme la recherche par clé de
+        # LinearReferencing, un chainage juste avant un point n'est pas sur ce point
+        if idx >= 0 and self.chainages[idx] == chainage: return idx
+        if idx < 0 or idx == nbr - 1: return None
+        if self.isEnd(idx): return None
+        return idx
+
+    def getSegmentationIndexes(self, chainages:np.ndarray)->np.ndarray:
+        """ Version vectorisée de getSegmentationIndex qui retourne -1 au lieu de None (et pour les fins) """
+        return ColumnarSegmentation.searchSegmentationIndexes(self.chainages, self.indptr[1:] == self.indptr[:-1], chainages)
+
+    @staticmethod
+    def searchSegmentationIndexes(breaks:np.ndarray, is_end:np.ndarray, chainages:np.ndarray)->np.ndarray:
+        """
+        Fonction qui permet de trouver en lot l'index du point de segmentation de chaque chainage.
+        Même logique que getSegmentationIndex, sauf qu'un point de fin retourne -1 puisqu'il n'a aucun élément.
+
+        Args:
+            - breaks (np.ndarray): Les chainages triés des points de segmentation
+            - is_end (np.ndarray): Array booléen des points de segmentation qui sont une fin
+            - chainages (np.ndarray): Les chainages à chercher
+
+        Returns (np.ndarray): Les index des points de segmentation ou -1
+        """
+        breaks, chainages = np.asarray(breaks, dtype=float), np.asarray(chainages, dtype=float)
+        nbr = len(breaks)
+        if nbr == 0: return np.full(len(chainages), -1, dtype=np.int64)
+        idx = np.searchsorted(breaks, chainages, side="right") - 1
+        # Égalité exacte comme getSegmentationIndex, un chainage juste avant un point n'est pas sur ce point
+        exact = (idx >= 0) & (breaks[np.maximum(idx, 0)] == chainages)
+        valid = (idx >= 0) & ((idx < nbr - 1) | exact)
+        valid[valid] = ~np.asarray(is_end, dtype=bool)[idx[valid]]
+        return np.where(valid, idx, -1)
+
+    def getValues(self, index:int, name:str)->list:
+        """ Permet de retourner les valeurs uniques d'un attribut au point de segmentation d'un index """
+        codes = self.codes.get(name, None)
+        if codes is None: return []
+        values = [self.dictionary.decode(name, code) for code in set(codes[self.indptr[index]:self.indptr[index + 1]].tolist()) if code != -1]
+        return list(set([value for value in values if value]))
+
+    def getValuesInRange(self, start:float, end:float, name:str)->list:
+        """ Permet de retourner les valeurs uniques d'un attribut qui chevauchent l'intervalle [start, end) """
+        values = []
+        for _, _, idx in self.getIntervals(start, end): values.extend(self.getValues(idx, name))
+        return list(set(values))
+
+    def getWeightedValues(self, start:float, end:float, name:str)->dict:
+        """ Permet de retourner la longueur sur laquelle chaque valeur d'un attribut est présente entre 2 chainages """
+        start, end = sorted([start, end])
+        weighted_values = {}
+        for c_d, c_f, idx in self.getIntervals(start, end):
+            length = min(c_f, end) - max(c_d, start)
+            for value in self.getValues(idx, name):
+                weighted_values[value] = weighted_values.get(value, 0) + length
+        return weighted_values
+
+    def isEmpty(self):
+        """ Permet de vérifier s'il n'y a aucun point de segmentation """
+        return len(self.chainages) == 0
+
+    def isEnd(self, index:int):
+        """ Permet de vérifier si le point de segmentation à un index est une fin (aucun élément) """
+        return self.indptr[index] == self.indptr[index + 1]
+
+    def nbytes(self)->int:
+        """ Permet de retourner la taille en octets des arrays """
+        return sum(arr.nbytes for arr in (self.chainages, self.indptr, self.offsets_d, self.offsets_f, self.interpolate, *self.codes.values()))
+
+    def rows(self):
+        """
+        Générateur des éléments de chaque intervalle de segmentation.
+
+        Returns (iterator): (chainage de début, chainage de fin, offset de début, offset de fin, interpolation, attributs)
+        """
+        for idx in range(len(self.chainages) - 1):
+            for row in range(self.indptr[idx], self.indptr[idx + 1]):
+                yield (float(self.chainages[idx]), float(self.chainages[idx + 1]),
+                       float(self.offsets_d[row]), float(self.offsets_f[row]), bool(self.interpolate[row]), self.getAttributs(row))
+
+    def toLinearReferencing(self, linear_ref):
+        """
+        Permet d'ajouter les points de segmentation dans un LinearReferencing vide.
+
+        Args:
+            - linear_ref (LinearReferencing): Le RTSS segmenté dans lequel ajouter les points de segmentation
+        """
+        # Ajouter les points de segmentation en ordre sans recalculer les offsets
+        keep_offset = linear_ref.keepOffset()
+        linear_ref.setKeepOffset(True)
+        for idx, chainage in enumerate(self.chainages):
+            try: linear_ref.addSegmentation(linear_ref.createSegmentation(float(chainage), self.getElements(idx)))
+            except NameError: pass
+        linear_ref.setKeepOffset(keep_offset)
+        return linear_ref
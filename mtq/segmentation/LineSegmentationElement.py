@@ -6,7 +6,7 @@ import copy
 class LineSegmentationElement:
     """ Représente un Élément linéaire d'une segmentation """
     
-    __slots__ = ("offset_d", "offset_f", "attributs", "intepolate_on_rtss")
+    __slots__ = ("offset_d", "offset_f", "attributs", "intepolate_on_rtss", "shared_attributs")
 
     def __init__(self, offset_d=0, offset_f=None, intepolate_on_rtss=True, **kwargs):
         """
@@ -22,6 +22,8 @@ class LineSegmentationElement:
         self.setOffsetFin(offset_f)
         self.setInterpolation(intepolate_on_rtss)
         self.attributs = {}
+        # Indicateur que le dictionnaire des attributs est partagé avec une copie de l'élément
+        self.shared_attributs = False
         # Set les attributs de l'élément 
         self.setAttributs(kwargs)
         #self.attributs = kwargs
@@ -50,15 +52,30 @@ class LineSegmentationElement:
         for slot in self.__slots__:
             v = getattr(self, slot)
             setattr(new_obj, slot, copy.deepcopy(v, memo))
+        # Le dictionnaire des attributs de la copie n'est pas partagé
+        new_obj.shared_attributs = False
 
         return new_obj
 
+    def copy(self):
+        """
+        Permet de créer une copie de l'élément qui partage le dictionnaire des attributs.
+        Le dictionnaire est copié seulement lorsqu'un attribut est modifié (copie sur écriture).
+        """
+        new_obj = self.__class__.__new__(self.__class__)
+        new_obj.offset_d = self.offset_d
+        new_obj.offset_f = self.offset_f
+        new_obj.intepolate_on_rtss = self.intepolate_on_rtss
+        new_obj.attributs = self.attributs
+        new_obj.shared_attributs = self.shared_attributs = True
+        return new_obj
+
     def getAttribut(self, name):
         """ Permet de retrourner une valeurs d'attribut de l'élément """
         return self.attributs.get(name, None)
     
     def getAttributs(self)->Dict:
-        """ Permet de retrourner le dictionnaire des attributs de l'élément """
+        """ Permet de retrourner le dictionnaire des attributs de l'élément (peut être partagé, ne pas modifier directement) """
         return self.attributs
     
     def getAttributsName(self)->list:
@@ -97,6 +114,8 @@ class LineSegmentationElement:
             - value (any): La valeur de l'attribut
         """
         if not value: value = None
+        # Copier le dictionnaire des attributs avant de le modifier s'il est partagé
+        if self.shared_attributs: self.attributs, self.shared_attributs = dict(self.attributs), False
         self.attributs[name] = value
 
     def setAttributs(self, dict_atts:dict):
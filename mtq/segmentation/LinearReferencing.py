@@ -16,7 +16,8 @@ from .LineSegmentationElement import LineSegmentationElement
 class LinearReferencing(FeatRTSS):
     """ Représente un objet FeatRTSS sur lequel il y a une segmentation linéaire. """
 
-    __slots__ = ("num_rts", "chainage_d", "chainage_f", "attributs", "geom", "segmentation_points", "keep_offset")
+    __slots__ = ("num_rts", "chainage_d", "chainage_f", "attributs", "geom", "segmentation_points",
+                 "sorted_chainages", "sorted_points", "keep_offset")
     
     def __init__(self,
                  num_rtss:Union[RTSS, str], 
@@ -27,6 +28,9 @@ class LinearReferencing(FeatRTSS):
                  **kwarg):
         # Dictionnaire des segmentations sur le RTSS. La clé est la valeur du chainage et la 
         self.segmentation_points:Dict[Chainage, SegmentationPoint] = {}
+        # Listes parallèles des chainages (float) et des points de segmentation, toujours en ordre de chainage
+        self.sorted_chainages:list[float] = []
+        self.sorted_points:list[SegmentationPoint] = []
         FeatRTSS.__init__(self, num_rtss, chainage_f, geometry, **kwarg)
         # Ajouter les segmentations existantes
         self.addSegmentations(list_segmentation_points)
@@ -53,7 +57,7 @@ class LinearReferencing(FeatRTSS):
 
     def __repr__(self): return f"LinearReferencing {self.__str__()}"
     
-    def __iter__ (self): return sorted(list(self.segmentation_points.values()), key=lambda p: p.getChainage()).__iter__()
+    def __iter__ (self): return list(self.sorted_points).__iter__()
 
     def __getitem__(self, index): return self.segmentation_points[Chainage(index)]
 
@@ -120,12 +124,18 @@ class LinearReferencing(FeatRTSS):
             raise NameError(f"Le {segmentation_point.__repr__()} est deja sur le RTSS {self.value(formater=True)}")
         
         # Ajouter la segmentation au RTSS
-        self.segmentation_points[segmentation_point.getChainage()] = segmentation_point
+        chainage = segmentation_point.getChainage()
+        self.segmentation_points[chainage] = segmentation_point
+        # Insérer la segmentation dans les listes ordonnées
+        idx = bisect.bisect_left(self.sorted_chainages, float(chainage))
+        self.sorted_chainages.insert(idx, float(chainage))
+        self.sorted_points.insert(idx, segmentation_point)
         if copy_elements:
             # Définir la segmentation précédant 
             previous_segmentation = self.getPreviousSegmentation(segmentation_point)
             # Copier les éléements de la segmentation précédante
-            if previous_segmentation: segmentation_point.setElements(copy.deepcopy(previous_segmentation.getElements()))
+            # Les copies partagent les attributs jusqu'à leur modification
+            if previous_segmentation: segmentation_point.setElements([elem.copy() for elem in previous_segmentation.getElements()])
         
         self.updateElementsOffsets(segmentation_point, update_current=copy_elements)
     
@@ -340,18 +350,16 @@ class LinearReferencing(FeatRTSS):
         if self.isEmpty(): return None
         # Dernière segmentation la plus proche et sa distance
         last_point, last_dist = None, 100000000
-        # Définir s'il faut parcourir les points de segmentation dans le sense inverse
-        nbr_point = len(self)
-        if nbr_point > 10: reverse = chainage > list(self.__iter__())[int(nbr_point/2)].getChainage()
-        else: reverse = False
-        # Parcourir les points de segmentation
-        for point_segmentation in self.getSegmentations(reverse=reverse):
+        value = float(Chainage(chainage))
+        # Position du premier point de segmentation au chainage ou après
+        idx = bisect.bisect_left(self.sorted_chainages, value)
+        # Seulement les points de segmentation avant et après le chainage peuvent être les plus proches
+        for pos in (idx - 1, idx):
+            if pos < 0 or pos >= len(self.sorted_points): continue
             # Calculer la distance du point avec le chainage chercher
-            dist = abs(point_segmentation.getChainage() - chainage)
-            # Arrêter la boucle quand la distance entre les deux devient plus grande
-            if dist > last_dist: break
-            # Conserver la dernière segmentation la plus proche et sa distance
-            last_point, last_dist = point_segmentation, dist
+            dist = abs(self.sorted_chainages[pos] - value)
+            # Conserver la segmentation la plus proche et sa distance
+            if dist <= last_dist: last_point, last_dist = self.sorted_points[pos], dist
         # Retourner rien si une distance max est défini et le point le plus proche est plus loin que la distance
         if last_dist > dist_max and dist_max != -1: return None
         return last_point
@@ -362,6 +370,41 @@ class LinearReferencing(FeatRTSS):
         if point_seg is None: return []
         return point_seg.getElements()
 
+    def getIntervals(self, chainage_d:Chainage=None, chainage_f:Chainage=None):
+        """
+        Méthode qui permet de retourner les intervalles de segmentation qui chevauchent
+        l'intervalle [chainage_d, chainage_f). Les intervalles sont trouvés par recherche binaire
+        dans la liste ordonnée des chainages, donc en O(log n + k).
+        Si le chainage de fin est égale au chainage de début, l'intervalle qui contient le chainage est retourné.
+
+        Args:
+            chainage_d (Chainage): Le chainage de début. None => le chainage sera celui du RTSS
+            chainage_f (Chainage): Le chainage de fin (non inclus). None => le chainage sera celui du RTSS
+
+        Returns (list[tuple]): Liste de (chainage de début, chainage de fin, SegmentationPoint) en float
+        """
+        start = float(self.chainageDebut() if chainage_d is None else Chainage(chainage_d))
+        end = float(self.chainageFin() if chainage_f is None else Chainage(chainage_f))
+        # Accepter un intervalle dans le sens inverse du chainage
+        if end < start: start, end = end, start
+        # Position du point de segmentation au chainage de début ou avant
+        idx_start = max(bisect.bisect_right(self.sorted_chainages, start) - 1, 0)
+        # Position du premier point de segmentation au chainage de fin ou après
+        if end == start: idx_end = idx_start + 1
+        else: idx_end = bisect.bisect_left(self.sorted_chainages, end)
+        intervals = []
+        # Le dernier point de segmentation ne débute aucun intervalle
+        for idx in range(idx_start, min(idx_end, len(self.sorted_points) - 1)):
+            point = self.sorted_points[idx]
+            # Ignorer les points de segmentation qui sont une fin
+            if point.isEnd(): continue
+            c_d, c_f = self.sorted_chainages[idx], self.sorted_chainages[idx + 1]
+            # Ignorer l'intervalle s'il ne contient pas le chainage de début
+            if c_f <= start and end != start: continue
+            if c_d > start and end == start: continue
+            intervals.append((c_d, c_f, point))
+        return intervals
+
     def getListChainage(self, start=None, end=None):
         """
         Méthode qui permet de retourner une liste de toutes les chainages des segmentations 
@@ -372,14 +415,17 @@ class LinearReferencing(FeatRTSS):
             - end (str/real): Le chainage de fin de la recherche qui n'est pas inclus
         """
         # Retourner la liste de toutes les chainages des segmentations du RTSS si aucun début ou fin n'est défini
-        if start is None and end is None: return sorted(list(self.segmentation_points.keys()))
+        if start is None and end is None: return [point.getChainage() for point in self.sorted_points]
         # Définir le chainage de début comme le début du RTSS s'il n'était pas défini
         if start is None: start, end = self.chainageDebut(), Chainage(end)
         # Définir le chainage de fin comme la fin du RTSS s'il n'était pas défini
         elif end is None: start, end = Chainage(start), self.chainageFin()
         else: start, end = Chainage(start), Chainage(end)
+        # Définir les positions du début et de la fin dans la liste ordonnée
+        idx_start = bisect.bisect_left(self.sorted_chainages, float(start))
+        idx_end = bisect.bisect_left(self.sorted_chainages, float(end))
         # Retourner toutes les chainages entres le début et la fin des chainage
-        return sorted([chainage for chainage in self.segmentation_points.keys() if chainage >= start and chainage < end])
+        return [point.getChainage() for point in self.sorted_points[idx_start:idx_end]]
     
     def getNextSegmentation(self, segmentation_point:SegmentationPoint, check_end=False):
         """
@@ -391,14 +437,12 @@ class LinearReferencing(FeatRTSS):
         """ 
         # Retourner le point de segmentation si il n'a aucun éléments (il est un fin)
         if segmentation_point.isEmpty() and check_end: return segmentation_point
-        # Définir la liste des chainages
-        list_chainages = self.getListChainage()
         # Définir la position du chainage suivant sur la liste des chainages
-        pos = list_chainages.index(segmentation_point.getChainage()) + 1
+        pos = self.indexSegmentation(segmentation_point) + 1
         # Retourner None si la segmentation est la dernier de la liste
-        if pos == len(list_chainages): return segmentation_point
+        if pos == len(self.sorted_points): return segmentation_point
         # Retrouner la segmentation suivant
-        return self.segmentation_points.get(list_chainages[pos], segmentation_point)
+        return self.sorted_points[pos]
         
     def getNextChainage(self, segmentation_point:SegmentationPoint, check_end=False):
         """
@@ -421,14 +465,12 @@ class LinearReferencing(FeatRTSS):
             - segmentation_point(SegmentationPoint): La segmentation à analyser
             - check_end (bool): Considérer les points de segmentation vide
         """ 
-        # Définir la liste des chainages
-        list_chainages = self.getListChainage()
         # Définir la position du chainage précédant sur la liste des chainages
-        pos = list_chainages.index(segmentation_point.getChainage()) - 1
+        pos = self.indexSegmentation(segmentation_point) - 1
         # Retourner None si la segmentation est la dernier de la liste
         if pos == -1: return segmentation_point
         # Définir la segmentation précédant
-        previous_segmentation = self.segmentation_points.get(list_chainages[pos], segmentation_point)
+        previous_segmentation = self.sorted_points[pos]
         # Retourner le point de segmentation en entré si le précédant n'a pas d'éléments
         if previous_segmentation.isEmpty() and check_end: return segmentation_point
         # Sinon retourner le point de segmentation précédant
@@ -459,14 +501,12 @@ class LinearReferencing(FeatRTSS):
         if chainage in self.segmentation_points: segmentation_point = self[chainage]
         # Retourner le point de segmentation d'un element
         else:
-            # Définir la listes des chainages sur le RTSS
-            chainages = self.getListChainage()
             # Trouver l'index du point de segmentation au chainage avant ou égale 
-            index = bisect.bisect_right(chainages, chainage)
+            index = bisect.bisect_right(self.sorted_chainages, float(chainage))
             # Vérifier si l'index est valide
-            if index <= 0 or index == len(chainages): return None
+            if index <= 0 or index == len(self.sorted_chainages): return None
             # Retourner le point de segmentation à l'index
-            segmentation_point = self[chainages[index - 1]]
+            segmentation_point = self.sorted_points[index - 1]
             # Retourner None si le point de segmentation avant est une fin
             if segmentation_point.isEmpty(): return None
         
@@ -477,20 +517,19 @@ class LinearReferencing(FeatRTSS):
         # Liste completes des points de segmentation si aucun chainage n'est spécifié
         if chainage_d is None and chainage_f is None: list_points = list(self.__iter__())
         else:
-            # Liste des points de segmentation à retourner 
-            list_points = []
+            if chainage_d is None: chainage_d = self.chainageDebut()
+            if chainage_f is None: chainage_f = self.chainageFin()
             # Aller chercher un point de segmentation au chainage de début
             first_pt = self.getSegmentation(chainage_d)
-            # Vérifier si on point de segmentation à été trouvé
-            if not first_pt is None: 
-                # Ajouter le point de segmentation s'il n'est pas une fin
-                if not first_pt.isEnd(): list_points.append(first_pt)
-            # Parcourir les chainages des points de segmentation présent entre les 2 chainage
-            for chainage in self.getListChainage(start=chainage_d, end=chainage_f):
-                # Aller chercher un point de segmentation au chainage
-                pt = self.getSegmentation(chainage)
-                # Ajouter le point de segmentation s'il n'est pas une fin et qu'il n'est pas déjà dans la liste
-                if pt not in list_points and not pt.isEnd(): list_points.append(pt)
+            # Position du premier point de segmentation à considérer
+            if first_pt is None: idx_start = bisect.bisect_left(self.sorted_chainages, float(Chainage(chainage_d)))
+            else: idx_start = self.indexSegmentation(first_pt)
+            # Position du premier point de segmentation au chainage de fin ou après (non inclus)
+            idx_end = bisect.bisect_left(self.sorted_chainages, float(Chainage(chainage_f)))
+            # Le point de segmentation au chainage de début est toujours inclus
+            if first_pt is not None: idx_end = max(idx_end, idx_start + 1)
+            # Conserver les points de segmentation qui ne sont pas une fin
+            list_points = [pt for pt in self.sorted_points[idx_start:idx_end] if not pt.isEnd()]
         
         # Inverser la ligne si indiqué en paramêtre
         if reverse: list_points.reverse()
@@ -517,9 +556,10 @@ class LinearReferencing(FeatRTSS):
             elem_attribut_name (str): Le nom de l'attribut
             chainage_f (Chainage): Spécifier un chainage de fin
         """
+        # Utiliser l'index des intervalles lorsqu'un chainage de fin est spécifié
+        if chainage_f is not None: return self.getValuesInRange(chainage, chainage_f, elem_attribut_name)
         # Définir le point de segmentation
-        if chainage_f is None: points = [self.getSegmentation(chainage)]
-        else: points = self.getSegmentations(chainage_d=chainage, chainage_f=chainage_f)
+        points = [self.getSegmentation(chainage)]
         
         values = []
         # Étendre la liste des valeurs avec les valeurs des éléments du point de segmentation
@@ -528,6 +568,42 @@ class LinearReferencing(FeatRTSS):
         # Retourner la valeur de l'élément
         return list(set(values))
 
+    def getValuesInRange(self, chainage_d:Chainage, chainage_f:Chainage, elem_attribut_name:str):
+        """
+        Méthode qui perment de retourner les valeurs uniques d'un attibut des éléments
+        qui chevauchent l'intervalle [chainage_d, chainage_f).
+
+        Args:
+            chainage_d (Chainage): Le chainage de début
+            chainage_f (Chainage): Le chainage de fin (non inclus)
+            elem_attribut_name (str): Le nom de l'attribut
+        """
+        values = []
+        for _, _, point in self.getIntervals(chainage_d, chainage_f):
+            values.extend(point.getValues(elem_attribut_name))
+        return list(set(values))
+
+    def getWeightedValues(self, chainage_d:Chainage, chainage_f:Chainage, elem_attribut_name:str)->dict:
+        """
+        Méthode qui perment de retourner les valeurs d'un attibut des éléments entre 2 chainages
+        avec la longueur (en chainage) sur laquelle chaque valeur est présente.
+
+        Args:
+            chainage_d (Chainage): Le chainage de début
+            chainage_f (Chainage): Le chainage de fin (non inclus)
+            elem_attribut_name (str): Le nom de l'attribut
+
+        Returns (dict): Dictionnaire de la longueur pour chaque valeur
+        """
+        start, end = sorted([float(Chainage(chainage_d)), float(Chainage(chainage_f))])
+        weighted_values = {}
+        for c_d, c_f, point in self.getIntervals(start, end):
+            # Longueur de l'intervalle contenue entre les 2 chainages
+            length = min(c_f, end) - max(c_d, start)
+            for value in point.getValues(elem_attribut_name):
+                weighted_values[value] = weighted_values.get(value, 0) + length
+        return weighted_values
+
     def getUniqueValue(self, chainage:Chainage, elem_attribut_name:str):
         """
         Méthode qui perment de retourner la valeur d'un attibut unique de l'élément
@@ -550,6 +626,24 @@ class LinearReferencing(FeatRTSS):
         """ Méthode qui permet de verifier si une segmentation à une segmentation précédant sur le RTSS """
         return segmentation_point != self.getPreviousSegmentation(segmentation_point, check_end=check_end)
     
+    def indexSegmentation(self, segmentation_point:SegmentationPoint)->int:
+        """
+        Méthode qui permet de retourner la position d'un point de segmentation dans la liste
+        ordonnée des points de segmentation du RTSS. Une erreur ValueError est levée si
+        le chainage du point n'est pas une segmentation du RTSS.
+
+        Args:
+            - segmentation_point(SegmentationPoint/Chainage): La segmentation ou le chainage à trouver
+        """
+        if isinstance(segmentation_point, SegmentationPoint): chainage = segmentation_point.getChainage()
+        else: chainage = Chainage(segmentation_point)
+        # Recherche binaire du chainage dans la liste ordonnée
+        idx = bisect.bisect_left(self.sorted_chainages, float(chainage))
+        if idx < len(self.sorted_chainages) and chainage == self.sorted_chainages[idx]: return idx
+        # Tolérer une différence d'arrondi avec le chainage précédant
+        if idx > 0 and chainage == self.sorted_chainages[idx - 1]: return idx - 1
+        raise ValueError(f"Le chainage ({chainage}) n'est pas une segmentation du RTSS {self.value(formater=True)}")
+
     def isEmpty(self):
         """ Méthode qui permet de vérifier si la segmentation du RTSS est vide """
         return self.segmentation_points == {}
@@ -666,7 +760,12 @@ class LinearReferencing(FeatRTSS):
             not self.hasNextSegmentation(segmentation_point, check_end=False)): return False
         
         previous_segmentation = self.getPreviousSegmentation(segmentation_point, check_end=True)
-        self.segmentation_points.pop(segmentation_point.getChainage(), False)
+        # Retirer la segmentation du dictionnaire et des listes ordonnées
+        if segmentation_point.getChainage() in self.segmentation_points:
+            idx = self.indexSegmentation(segmentation_point)
+            del self.sorted_chainages[idx]
+            del self.sorted_points[idx]
+            self.segmentation_points.pop(segmentation_point.getChainage())
         
         # Update offsets
         if previous_segmentation and not self.keepOffset():
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
+import os
 import copy
+import json
+import time
 from typing import Union, Dict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 from PyQt5.QtCore import QVariant
 
 # Importer les objects du module core de QGIS 
 from qgis.core import (QgsCoordinateReferenceSystem, QgsSpatialIndex, QgsFeatureIterator, QgsGeometry,
-                       QgsVectorLayer, QgsFeatureRequest, QgsField, QgsVectorLayerUtils, QgsFeature)
+                       QgsVectorLayer, QgsFeatureRequest, QgsField, QgsVectorLayerUtils, QgsFeature,
+                       QgsFields, QgsFeatureSink, QgsVectorFileWriter, QgsWkbTypes, QgsProject, QgsRectangle)
 
 from ..geomapping.Chainage import Chainage
 from ..geomapping.RTSS import RTSS
@@ -14,8 +20,19 @@ from ..geomapping.Geocodage import Geocodage
 from ..geomapping.PointRTSS import PointRTSS
 from ..geomapping.LineRTSS import LineRTSS
 
+from ..functions.geometryArrays import polylineToArrays, polylineToArray, cumulativeLength, interpolatePointsOnLine
+from ..functions.nearestLines import linesToSegments, segmentsTree, nearestLines
+from ..functions.overlayIntervals import overlayIntervals
+from ..functions.npzArchive import NPZ_ERRORS, encodeJsonValue, decodeJsonValue, saveNpz
+
 from .LineSegmentationElement import LineSegmentationElement
 from .LinearReferencing import LinearReferencing
+from .ColumnarSegmentation import ColumnarSegmentation, AttributeDictionary
+
+# Nom des colonnes numériques d'un réseau exporté en colonnes
+COLUMNS_RESEAU = ("rtss", "chainage_d", "chainage_f", "offset_d", "offset_f", "interpolate")
+# Nombre de copies de RTSS en colonnes conservées pour les lectures (voir getLinearReference)
+VIEWS_CACHE_SIZE = 256
 
 from ..param import (DEFAULT_NOM_COUCHE_RTSS, DEFAULT_NOM_CHAMP_RTSS,
                      DEFAULT_NOM_CHAMP_DEBUT_CHAINAGE, DEFAULT_NOM_CHAMP_FIN_CHAINAGE)
@@ -46,6 +63,9 @@ class ReseauSegmenter(Geocodage):
         self.dict_ids = geocode.dict_ids
         self.dict_rtss = geocode.dict_rtss
         self.spatial_index = geocode.spatial_index
+        self.segments_index = geocode.segments_index
+        # Dictionnaire des valeurs d'attributs partagé par les RTSS en colonnes
+        self.dictionary = AttributeDictionary()
 
         # Définir le réseau de segmentation
         if reseau is None: self.setReseau({})
@@ -104,6 +124,22 @@ class ReseauSegmenter(Geocodage):
             field_chainage_f)
         return reseau
 
+    @classmethod
+    def fromEvents(cls, geocode:Geocodage, tables:list[dict], workers=None, columnar=False):
+        """
+        Constructeur qui permet de créer l'objet ReseauSegmenter avec toute les RTSS
+        d'un module de geocodage et ensuite de superposer des tables d'événements linéaires.
+
+        Args:
+            - geocode (geocodage): L'objet geocodage sur lequel baser le réseau
+            - tables (list[dict]): Les tables d'événements (voir addFromEvents)
+            - workers: Le nombre de threads à utiliser. Defaults to None (nombre de processeurs).
+            - columnar: Conserver les segmentations en colonnes (voir compact). Defaults to False.
+        """
+        reseau = cls(geocode)
+        reseau.addFromEvents(tables, workers=workers, columnar=columnar)
+        return reseau
+
     @classmethod
     def fromInterpolation(
         cls, 
@@ -112,7 +148,11 @@ class ReseauSegmenter(Geocodage):
         field_value=[],
         fields_route=[],
         step=10, 
-        max_dist=20):
+        max_dist=20,
+        workers=None,
+        columnar=False,
+        feedback=None,
+        stats:dict=None):
         """
         Constructeur qui permet de créer l'objet ReseauSegmenter avec toute les RTSS.
         d'un module de geocodage et ensuite d'ajouter des éléments au réseau à partir d'une couche.
@@ -128,22 +168,92 @@ class ReseauSegmenter(Geocodage):
             - fields_route: Une liste de nom de champ dont le 5 première lettre sont le numéro de route à filtrer
             - step: La distance entre chaque point utilisé pour l'interpolation
             - max_dist: La distance maximal pour qu'un objet soit considéré sur la route 
+            - workers: Le nombre de threads à utiliser. Defaults to None (nombre de processeurs).
+            - columnar: Conserver les segmentations en colonnes (voir compact). Defaults to False.
+            - feedback: Objet avec les méthodes setProgress et isCanceled (ex: QgsTask, QgsFeedback). Defaults to None.
+            - stats (dict): Dictionnaire rempli avec les statistiques de l'interpolation. Defaults to None.
+        """
+        reseau = cls(geocode)
+        reseau.addFromInterpolation(
+            layer, field_value, fields_route, step, max_dist, workers=workers, columnar=columnar, feedback=feedback, stats=stats)
+        return reseau
+
+    @classmethod
+    def load(cls, geocode:Geocodage, file_path:str, cache_key:dict=None, columnar=False):
+        """
+        Constructeur qui permet de recharger un réseau enregistré avec la méthode save.
+
+        Args:
+            - geocode (geocodage): L'objet geocodage sur lequel baser le réseau
+            - file_path (str): Le chemin du fichier .npz
+            - cache_key (dict, optional): La clé attendue (voir createCacheKey). Le réseau n'est pas
+            rechargé si la clé du fichier est différente ou si une couche de la clé n'a pas de date de modification.
+            - columnar (bool, optional): Conserver les segmentations en colonnes (voir compact). Defaults to False.
+
+        Returns (ReseauSegmenter): Le réseau rechargé ou None si le fichier n'est pas valide
         """
+        if not os.path.isfile(file_path): return None
+        # Une source sans date de modification ne peut pas être validée
+        if cache_key is not None and None in (cache_key.get("stamp"), cache_key.get("rtss_stamp", 0)): return None
+        try:
+            with np.load(file_path) as data:
+                header = json.loads(str(data["header"]), object_hook=decodeJsonValue)
+                # Vérifier que le fichier correspond à la clé
+                if cache_key is not None and header["cache_key"] != json.loads(
+                    json.dumps(cache_key, default=encodeJsonValue), object_hook=decodeJsonValue): return None
+                columns = {name: data[name] for name in COLUMNS_RESEAU}
+                columns["attributs"] = header["attributs"]
+                columns["codes"] = {name: data[f"codes_{i}"] for i, name in enumerate(header["attributs"])}
+                columns["values"] = dict(zip(header["attributs"], header["values"]))
+        except NPZ_ERRORS: return None
         reseau = cls(geocode)
-        reseau.addFromInterpolation(layer, field_value, fields_route, step, max_dist)
+        reseau.addFromColumns(columns, columnar=columnar)
         return reseau
 
+    @staticmethod
+    def createCacheKey(layer:QgsVectorLayer, layer_rtss:QgsVectorLayer=None, **kwargs)->dict:
+        """
+        Permet de créer la clé d'un réseau enregistré à partir de la couche utilisée pour le générer.
+        La clé contient la source de la couche, sa date de modification (None si la source n'est pas un fichier)
+        et les paramètres utilisés pour générer le réseau.
+
+        Args:
+            - layer (QgsVectorLayer): La couche utilisée pour générer le réseau
+            - layer_rtss (QgsVectorLayer, optional): La couche des RTSS du géocodage. Sa source et sa date
+            de modification sont ajoutées à la clé puisque les chainages du réseau en dépendent. Defaults to None.
+            - kwargs: Les paramètres utilisés pour générer le réseau (ex: intervalle_interpolation=20)
+        """
+        def sourceStamp(source_layer):
+            source = source_layer.source()
+            path = source.split("|")[0]
+            return source, os.path.getmtime(path) if os.path.isfile(path) else None
+        source, stamp = sourceStamp(layer)
+        cache_key = {"source": source, "stamp": stamp}
+        if layer_rtss is not None: cache_key["rtss_source"], cache_key["rtss_stamp"] = sourceStamp(layer_rtss)
+        return {**cache_key, **kwargs}
+
+    @staticmethod
+    def readCacheKey(file_path:str)->dict:
+        """ Permet de retourner la clé d'un réseau enregistré ou None si le fichier n'est pas valide """
+        try:
+            with np.load(file_path) as data: return json.loads(str(data["header"]), object_hook=decodeJsonValue)["cache_key"]
+        except NPZ_ERRORS: return None
+
     def __str__(self): return f"ReseauSegmenter ({len(self.reseau)} RTSS)"
 
     def __repr__ (self): return f"ReseauSegmenter ({len(self.reseau)} RTSS)"
 
     def __getitem__(self, key): 
-        try: return self.reseau[RTSS(key)]
-        except: raise KeyError(f"Le RTSS ({key}) n'est pas dans le module de geocodage")
+        try: linear_ref = self.getLinearReference(key)
+        except KeyError: linear_ref = None
+        if linear_ref is None: raise KeyError(f"Le RTSS ({key}) n'est pas dans le module de geocodage")
+        return linear_ref
 
     def __len__(self): return len(self.reseau)
 
-    def __iter__ (self): return self.reseau.values().__iter__()
+    def __iter__ (self):
+        # Les RTSS en colonnes sont parcourus par des copies sans modifier les colonnes
+        return (self.getLinearReference(rtss) for rtss in list(self.reseau))
 
     def __contains__(self, key): return RTSS(key) in self.reseau
 
@@ -172,13 +282,119 @@ class ReseauSegmenter(Geocodage):
             chainage_f (Chainage): Chainage de fin de l'élément
             copy_elements (bool, optional): Conserver les éléments de la segmentation intersectée
         """
-        # Aller chercher le RTSS segmenter 
-        segment_rtss = self.get(rtss)
+        # Aller chercher le RTSS segmenter (les RTSS en colonnes sont recréés pour être modifiés)
+        segment_rtss = self.expandColumns(rtss)
         # Vérifier que le RTSS est bien dans le réseau
         if segment_rtss is None: return None
         # Ajouter l'élément au réseau
         segment_rtss.addElement(element, chainage_d, chainage_f, copy_elements=copy_elements)
 
+    def addFromColumns(self, columns:dict, columnar=False):
+        """
+        Permet d'ajouter des éléments à partir d'un réseau exporté en colonnes (voir toColumns).
+        Les lignes doivent être regroupées par RTSS et en ordre de chainage.
+
+        Args:
+            columns (dict): Les colonnes du réseau
+            columnar (bool, optional): Conserver les segmentations en colonnes (voir compact). Defaults to False.
+        """
+        rtss_arr = np.asarray(columns["rtss"])
+        if len(rtss_arr) == 0: return None
+        names, codes, values = columns["attributs"], columns["codes"], columns["values"]
+        # Limites des groupes de lignes de chaque RTSS
+        bounds = np.flatnonzero(rtss_arr[1:] != rtss_arr[:-1]) + 1
+        for start, end in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(rtss_arr)]))):
+            linear_ref = self.expandColumns(str(rtss_arr[start]))
+            if linear_ref is None: continue
+            atts = [{name: values[name][codes[name][i]] for name in names if codes[name][i] != -1} for i in range(start, end)]
+            # Le RTSS a déjà des segmentations, les éléments sont donc ajoutés un à la fois
+            if not linear_ref.isEmpty():
+                for i, atts_elem in zip(range(start, end), atts):
+                    elem = LineSegmentationElement(
+                        offset_d=float(columns["offset_d"][i]),
+                        offset_f=float(columns["offset_f"][i]),
+                        intepolate_on_rtss=bool(columns["interpolate"][i]),
+                        **atts_elem)
+                    linear_ref.addElement(elem, float(columns["chainage_d"][i]), float(columns["chainage_f"][i]))
+                continue
+            columnar_seg = ColumnarSegmentation.fromRows(
+                chainages_d=columns["chainage_d"][start:end],
+                chainages_f=columns["chainage_f"][start:end],
+                attributs=atts,
+                dictionary=self.dictionary,
+                offsets_d=columns["offset_d"][start:end],
+                offsets_f=columns["offset_f"][start:end],
+                interpolate=columns["interpolate"][start:end])
+            if columnar: self.columns[linear_ref.getRTSS()] = columnar_seg
+            else: columnar_seg.toLinearReferencing(linear_ref)
+
+    def addFromEvents(self, tables:list[dict], workers=None, columnar=False):
+        """
+        Permet de superposer plusieurs tables d'événements linéaires dans le réseau en une seule passe.
+        Chaque table est un dictionnaire de colonnes (listes ou arrays de même longueur) avec les clés
+        "rtss", "chainage_d" et "chainage_f". Les autres colonnes sont les attributs des événements.
+
+        Les événements de chaque RTSS sont superposés par balayage (voir overlayIntervals): chaque
+        intervalle de segmentation contient un élément pour chaque événement qui le couvre, comme des
+        appels successifs à addFromFields. Les RTSS sont traités en parallèle dans un pool de threads.
+
+        Args:
+            - tables (list[dict]): Les tables d'événements
+            - workers: Le nombre de threads à utiliser. Defaults to None (nombre de processeurs).
+            - columnar: Conserver les segmentations des RTSS vides en colonnes (voir compact). Defaults to False.
+        """
+        list_rtss, list_d, list_f, list_atts = [], [], [], []
+        for table in tables:
+            names = [name for name in table if name not in ("rtss", "chainage_d", "chainage_f")]
+            nbr = len(table["rtss"])
+            list_rtss.append(np.asarray(table["rtss"]).astype(str))
+            list_d.append(np.asarray(table["chainage_d"], dtype=float))
+            list_f.append(np.asarray(table["chainage_f"], dtype=float))
+            # Attributs de chaque événement en valeurs Python
+            if names == []: list_atts.extend({} for _ in range(nbr))
+            else: list_atts.extend(
+                {name: value.item() if isinstance(value, np.generic) else value for name, value in zip(names, values)}
+                for values in zip(*[table[name] for name in names]))
+        if list_rtss == []: return None
+        rtss_arr, chainages_d, chainages_f = np.concatenate(list_rtss), np.concatenate(list_d), np.concatenate(list_f)
+        # Les événements sans attributs ne sont pas ajoutés, comme la méthode addValues
+        has_atts = np.array([atts != {} for atts in list_atts], dtype=bool)
+
+        # Regrouper les événements par RTSS
+        uniques, inverse = np.unique(rtss_arr, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(uniques) + 1))
+        jobs = []
+        for i, value in enumerate(uniques):
+            linear_ref = self.reseau.get(RTSS(value), None)
+            if linear_ref is None: continue
+            idx = order[bounds[i]:bounds[i + 1]]
+            idx = idx[has_atts[idx]]
+            if len(idx) == 0: continue
+            # Limiter les chainages des événements au RTSS
+            start, end = float(linear_ref.chainageDebut()), float(linear_ref.chainageFin())
+            jobs.append((linear_ref, idx, np.clip(chainages_d[idx], start, end), np.clip(chainages_f[idx], start, end)))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda job: overlayIntervals(job[2], job[3]), jobs)
+            # Ajouter les segmentations dans le réseau (pas thread-safe, donc dans le thread principal)
+            for (linear_ref, idx, _, _), (breaks, rows_interval, rows_event) in zip(jobs, results):
+                if len(rows_event) == 0: continue
+                columnar_seg = ColumnarSegmentation.fromRows(
+                    chainages_d=breaks[rows_interval],
+                    chainages_f=breaks[rows_interval + 1],
+                    attributs=[list_atts[i] for i in idx[rows_event]],
+                    dictionary=self.dictionary)
+                rtss = linear_ref.getRTSS()
+                # Les RTSS vides reçoivent directement les segmentations
+                if linear_ref.isEmpty() and rtss not in self.columns:
+                    if columnar: self.columns[rtss] = columnar_seg
+                    else: columnar_seg.toLinearReferencing(linear_ref)
+                    continue
+                # Sinon combiner avec les segmentations existantes
+                l_ref = LinearReferencing(rtss, linear_ref.chainageFin(), linear_ref.geometry())
+                self.expandColumns(rtss).merge(columnar_seg.toLinearReferencing(l_ref))
+
     def addFromFields(self,
             feature_iter:QgsFeatureIterator,
             fields_value,
@@ -199,7 +415,7 @@ class ReseauSegmenter(Geocodage):
         # Parourir toutes les entitées de la couche
         for feat in feature_iter:
             # Definir l'objet LinearReferencing
-            rtss_seg = self.get(feat[field_rtss])
+            rtss_seg = self.expandColumns(feat[field_rtss])
             # Vérifier si l'objet LinearReferencing est valide
             if rtss_seg is None: continue
             # Ajouter l'id du projet au module de référence linéraire du RTSS
@@ -215,88 +431,198 @@ class ReseauSegmenter(Geocodage):
         field_value=[],
         fields_route=[],
         step=10, 
-        max_dist=20):
+        max_dist=20,
+        workers=None,
+        columnar=False,
+        feedback=None,
+        stats:dict=None):
         """
         Permet d'ajouter des éléments au réseau à partir d'une couche.
         L'interpolation est fait en fonction du plus proche voisin. Une distance max peux être spécifier pour 
         limiter l'interpolation. De plus, le paramètre step permet de définir le pas de chainage pour calculer le voisin
         le plus proche.
 
+        Les points de chaque RTSS sont générés en array et associés en lot à la ligne la plus proche.
+        Les RTSS sont traités en parallèle dans un pool de threads.
+
+        Args:
+            - layer: Le QgsVectorLayer de la couche à interpoler
+            - field_value: La liste des noms des champs de valeur de la couche
+            - fields_route: Une liste de nom de champ dont le 5 première lettre sont le numéro de route à filtrer
+            - step: La distance entre chaque point utilisé pour l'interpolation
+            - max_dist: La distance maximal pour qu'un objet soit considéré sur la route 
+            - workers: Le nombre de threads à utiliser. Defaults to None (nombre de processeurs).
+            - columnar: Conserver les segmentations des RTSS vides en colonnes (voir compact). Defaults to False.
+            - feedback: Objet avec les méthodes setProgress et isCanceled (ex: QgsTask, QgsFeedback).
+            Rien n'est ajouté au réseau si l'interpolation est annulée. Defaults to None.
+            - stats (dict): Dictionnaire rempli avec les statistiques de l'interpolation (voir interpolateSegmentations). Defaults to None.
+        """
+        segmentations = self.interpolateSegmentations(
+            layer, field_value, fields_route, step, max_dist,
+            workers=workers, columnar=columnar, feedback=feedback, stats=stats)
+        for rtss, segmentation in segmentations.items():
+            # Les RTSS vides reçoivent directement les segmentations en colonnes
+            if isinstance(segmentation, ColumnarSegmentation):
+                if self.reseau[rtss].isEmpty() and rtss not in self.columns:
+                    self.columns[rtss] = segmentation
+                    continue
+                segmentation = segmentation.toLinearReferencing(self.createLinearReference(rtss))
+            # Sinon combiner avec les segmentations existantes
+            self.expandColumns(rtss).merge(segmentation)
+
+    def interpolateSegmentations(
+        self,
+        layer:QgsVectorLayer,
+        field_value=[],
+        fields_route=[],
+        step=10, 
+        max_dist=20,
+        list_rtss:list=None,
+        workers=None,
+        columnar=False,
+        filter_request:QgsFeatureRequest=None,
+        feedback=None,
+        stats:dict=None,
+        batch_size=200)->Dict[RTSS, Union[LinearReferencing, ColumnarSegmentation]]:
+        """
+        Permet de calculer les segmentations interpolées à partir d'une couche sans modifier le réseau.
+        Voir addFromInterpolation pour la méthode d'interpolation.
+
         Args:
             - layer: Le QgsVectorLayer de la couche à interpoler
             - field_value: La liste des noms des champs de valeur de la couche
             - fields_route: Une liste de nom de champ dont le 5 première lettre sont le numéro de route à filtrer
             - step: La distance entre chaque point utilisé pour l'interpolation
             - max_dist: La distance maximal pour qu'un objet soit considéré sur la route 
+            - list_rtss: Les RTSS à interpoler. Defaults to None (tous les RTSS).
+            - workers: Le nombre de threads à utiliser. Defaults to None (nombre de processeurs).
+            - columnar: Retourner les segmentations en colonnes. Defaults to False.
+            - filter_request (QgsFeatureRequest): Requête pour filtrer la couche en entrée. Defaults to None.
+            - feedback: Objet avec les méthodes setProgress et isCanceled (ex: QgsTask, QgsFeedback).
+            La progression est mise à jour après chaque lot de RTSS et l'annulation, vérifiée pour chaque entité lue et chaque RTSS,
+            retourne un dictionnaire vide. Defaults to None.
+            - stats (dict): Dictionnaire rempli avec le nombre de RTSS (rtss), le nombre de points interpolés (samples),
+            la durée en secondes (duration) et les débits (rtss_per_sec, samples_per_sec). Defaults to None.
+            - batch_size: Le nombre de RTSS par lot. Defaults to 200.
+
+        Returns (dict): Les nouvelles segmentations (LinearReferencing ou ColumnarSegmentation) des RTSS avec des éléments
         """
-        # Localisation des vitesses
-        spatial_index = QgsSpatialIndex()
         # Créer l'index des champs de valeur dans la couche
         field_value = [field_value] if not isinstance(field_value, list) and field_value is not None else field_value
         # Check if a route filter is neaded
         has_route_filter = len(fields_route) > 0
-        # Index des QgsGeometry
-        geom_index:dict[int, QgsGeometry] = {}
         # Index des attributs à ajouter
         feats_att:dict[int, dict] = {}
-        # Index de valeurs de route à considérer
-        route_lookup:dict[int, list] = {}
-        route_possible = []
+        # Index des géometries de la couche en arrays
+        lines:dict[int, list[np.ndarray]] = {}
+        # Index des identifiants d'entité pour chaque numéro de route
+        route_lookup:dict[str, list] = {}
         # Parcourir les features de la couche
-        for feat in layer.getFeatures():
+        for feat in layer.getFeatures(QgsFeatureRequest() if filter_request is None else filter_request):
+            if feedback is not None and feedback.isCanceled(): return {}
             # Définir le ID pour la clé
             id = feat.id()
-            # Remplir l'index des QgsGeometry
-            geom_index[id] = feat.geometry()
+            # Remplir l'index des géometries
+            lines[id] = polylineToArrays(feat.geometry())
             # Remplir l'index des attributs
             feats_att[id] = {field: feat[field] for field in field_value}
             # Remplir l'index des routes
-            if has_route_filter:  
-                routes = [feat[f][:5] for f in fields_route]
-                route_lookup[id] = routes
-                route_possible.extend(routes)
-            # Ajouter le features
-            spatial_index.addFeature(feat)
-
-        # Pourcourir toutes les modules de référence linéraire des RTSS
-        for rtss_seg in self:
-            l_ref = LinearReferencing(rtss_seg.getRTSS(), rtss_seg.chainageFin(), rtss_seg.geometry())
+            if has_route_filter:
+                for route in set([feat[f][:5] for f in fields_route if feat[f]]):
+                    route_lookup.setdefault(route, []).append(id)
+
+        # Segments de la couche avec une longueur maximale pour limiter le rayon de recherche
+        max_length = max(2 * max_dist, step, 1)
+        segments, segments_ids = linesToSegments(lines, max_length=max_length)
+        if len(segments) == 0: return {}
+        tree = segmentsTree(segments)
+        # Masques des segments par numéro de route
+        route_masks = {route: np.isin(segments_ids, ids) for route, ids in route_lookup.items()}
+
+        def interpolateRTSS(vertices:np.ndarray, chainage_f:float, mask:np.ndarray):
+            """ Retourne les chainages où l'entité la plus proche change et l'identifiant de l'entité """
+            chainages = np.arange(0, int(chainage_f), step)
+            if len(chainages) == 0 or len(vertices) < 2: return []
+            cumul = cumulativeLength(vertices)
+            # Points le long du RTSS (même correction chainage -> longueur que getLongFromChainage)
+            points = interpolatePointsOnLine(vertices, chainages * cumul[-1] / chainage_f, cumul=cumul)
+            nearest, _ = nearestLines(points, segments, max_dist, tree=tree, max_length=max_length, mask=mask)
+            feat_ids = np.where(nearest == -1, -1, segments_ids[nearest])
+            # Encodage par plage: conserver seulement les points où l'entité change
+            changes = np.flatnonzero(feat_ids != np.concatenate(([-1], feat_ids[:-1])))
+            return [(int(chainages[i]), int(feat_ids[i])) for i in changes]
+
+        # Définir les RTSS à interpoler et leurs données en arrays
+        if list_rtss is None: list_rtss = list(self.reseau.keys())
+        jobs = []
+        for rtss in list_rtss:
+            rtss_seg = self.reseau.get(RTSS(rtss), None)
+            if rtss_seg is None: continue
             # Définir le numéro de la route 
             num_route = rtss_seg.getRoute()
-            if has_route_filter:
-                # Vérifier si la route est dans la couche
-                if not num_route in route_possible: continue
+            # Vérifier si la route est dans la couche
+            if has_route_filter and not num_route in route_masks: continue
+            mask = route_masks[num_route] if has_route_filter else None
+            jobs.append((rtss_seg, polylineToArray(rtss_seg.geometry()), float(rtss_seg.chainageFin()), mask))
+
+        def createSegmentation(rtss_seg:LinearReferencing, breaks:list):
+            """ Retourne la segmentation d'un RTSS à partir des chainages où l'entité la plus proche change """
+            if columnar:
+                chainages_d, list_atts, last_atts = [], [], {}
+                for chainage, feat_id in breaks:
+                    atts = feats_att[feat_id] if feat_id != -1 else {}
+                    if last_atts == atts: continue
+                    last_atts = atts
+                    # Une plage sans entité conserve la valeur précédante
+                    if atts == {}: continue
+                    chainages_d.append(chainage)
+                    list_atts.append(atts)
+                if chainages_d == []: return None
+                return ColumnarSegmentation.fromRows(
+                    chainages_d=chainages_d,
+                    chainages_f=chainages_d[1:] + [float(rtss_seg.chainageFin())],
+                    attributs=list_atts,
+                    dictionary=self.dictionary)
+            l_ref = self.createLinearReference(rtss_seg.getRTSS())
             last_atts = {}
-            last_feat_id = None
-            # Parcourir les chainages des RTSS
-            for c in range(0, int(rtss_seg.chainageFin()), step):
-                # Géometrie du point le long du RTSS
-                point_geom = rtss_seg.geocoderPointFromChainage(c)
-                # Valeurs d'ID et de distance par défault
-                feat_id, min_dist = None, max_dist+1
-                # Parcourir les ID des entitées à proximité
-                for id in spatial_index.nearestNeighbor(point_geom.asPoint(), 5, maxDistance=max_dist):
-                    # Check route numbers using cached lookup
-                    if has_route_filter:
-                        # Vérifier si le feature est pour la bonne route
-                        if not num_route in route_lookup[id]: continue
-                    # Calculer la vrai distances entre les deux geometry
-                    distance = geom_index[id].distance(point_geom)
-                    # Conserver la distances la plus petite 
-                    if distance < min_dist: feat_id, min_dist = id, distance
-                    # Arrêter la recherche si la distance est minimal 
-                    if distance == 0: break
-                # Arrêter si le features est le même que le précédant
-                if last_feat_id == feat_id: continue
-                last_feat_id = feat_id
+            for chainage, feat_id in breaks:
                 # Définir la valeur d'attribut
-                atts = feats_att[feat_id] if feat_id else {}
+                atts = feats_att[feat_id] if feat_id != -1 else {}
                 # Vérifier si la valeur de la segmentation au chainage courant est la même que la valeur la plus proche
                 if last_atts == atts: continue
                 # Sinon ajouter les valeurs 
-                l_ref.addValues(chainage_debut=c, copy_elements=False, **atts)
+                l_ref.addValues(chainage_debut=chainage, copy_elements=False, **atts)
                 last_atts = atts 
-            rtss_seg.merge(l_ref)
+            if l_ref.isEmpty(): return None
+            return l_ref
+
+        segmentations = {}
+        start_time, nbr_samples = time.perf_counter(), 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Traiter les RTSS par lot pour suivre la progression et permettre l'annulation
+            for idx_batch in range(0, len(jobs), batch_size):
+                if feedback is not None and feedback.isCanceled(): return {}
+                batch = jobs[idx_batch:idx_batch + batch_size]
+                results = executor.map(lambda job: interpolateRTSS(*job[1:]), batch)
+                # Créer les segmentations (pas thread-safe, donc dans le thread principal)
+                for (rtss_seg, _, chainage_f, _), breaks in zip(batch, results):
+                    # Vérifier l'annulation après chaque RTSS du lot
+                    if feedback is not None and feedback.isCanceled(): return {}
+                    nbr_samples += int(np.ceil(int(chainage_f) / step))
+                    segmentation = createSegmentation(rtss_seg, breaks)
+                    if segmentation is not None: segmentations[rtss_seg.getRTSS()] = segmentation
+                if feedback is not None: feedback.setProgress(100 * (idx_batch + len(batch)) / len(jobs))
+        if feedback is not None and feedback.isCanceled(): return {}
+        # Statistiques de l'interpolation
+        if stats is not None:
+            duration = time.perf_counter() - start_time
+            stats.update({
+                "rtss": len(jobs),
+                "samples": nbr_samples,
+                "duration": duration,
+                "rtss_per_sec": len(jobs) / duration if duration > 0 else 0,
+                "samples_per_sec": nbr_samples / duration if duration > 0 else 0})
+        return segmentations
 
     def addValues(self, rtss:RTSS, chainage_debut:Chainage=None, chainage_fin:Chainage=None, copy_elements=True, **kwargs):
         """
@@ -316,8 +642,8 @@ class ReseauSegmenter(Geocodage):
 
         Returns (bool): True: L'élément avec les valeurs est ajouter False: L'élément n'a pas pu être ajouter
         """
-        # Aller chercher le RTSS segmenter 
-        segment_rtss = self.get(rtss)
+        # Aller chercher le RTSS segmenter (les RTSS en colonnes sont recréés pour être modifiés)
+        segment_rtss = self.expandColumns(rtss)
         # Vérifier que le RTSS est bien dans le réseau
         if segment_rtss is None: return False
 
@@ -326,6 +652,48 @@ class ReseauSegmenter(Geocodage):
     def clear(self):
         """ Permet de supprimer l'index du réseau """
         self.reseau = {}
+        self.columns = {}
+        self.views = {}
+        self.dictionary = AttributeDictionary()
+
+    def compact(self):
+        """
+        Méthode qui permet de convertir les segmentations de tous les RTSS en colonnes (voir ColumnarSegmentation).
+        Les objets SegmentationPoint et LineSegmentationElement sont remplacés par des arrays et les valeurs
+        d'attributs sont encodées par dictionnaire. Les lectures se font sur des copies conservées pour
+        les RTSS récemment lus (voir getLinearReference) et un RTSS n'est recréé dans le réseau que
+        lorsqu'il est modifié (voir expandColumns).
+        """
+        self.views = {}
+        for rtss, linear_ref in self.reseau.items():
+            if linear_ref.isEmpty(): continue
+            self.columns[rtss] = ColumnarSegmentation.fromLinearReferencing(linear_ref, self.dictionary)
+            self.reseau[rtss] = LinearReferencing(linear_ref.getRTSS(), linear_ref.chainageFin(), linear_ref.geometry())
+
+    def createLinearReference(self, rtss:RTSS)->LinearReferencing:
+        """ Permet de créer un LinearReferencing vide pour un RTSS du réseau """
+        linear_ref = self.reseau[RTSS(rtss)]
+        return LinearReferencing(linear_ref.getRTSS(), linear_ref.chainageFin(), linear_ref.geometry())
+
+    def expandColumns(self, rtss:RTSS):
+        """
+        Méthode qui permet de recréer les objets de segmentation d'un RTSS en colonnes.
+        Le RTSS n'est plus en colonnes par la suite et peut être modifié.
+
+        Args:
+            - rtss (RTSS): Le numéro du RTSS
+
+        Returns (LinearReferencing): Le RTSS segmenté du réseau ou None si le RTSS n'est pas dans le réseau
+        """
+        if self.columns == {}: return self.reseau.get(RTSS(rtss), None)
+        rtss = RTSS(rtss)
+        columnar_seg = self.columns.pop(rtss, None)
+        if columnar_seg is not None:
+            # Réutiliser la copie déjà recréée pour les lectures
+            columnar_view, linear_ref = self.views.pop(rtss, (None, None))
+            if columnar_view is columnar_seg: self.reseau[rtss] = linear_ref
+            else: columnar_seg.toLinearReferencing(self.reseau[rtss])
+        return self.reseau.get(rtss, None)
 
     def get(self, rtss:RTSS)->LinearReferencing: 
         """ Permet de retourner le LinearReferencing pour un RTSS donnée """
@@ -333,6 +701,19 @@ class ReseauSegmenter(Geocodage):
 
     def getReseau(self): return self.reseau
 
+    def getRTSSInRectangle(self, rectangle:QgsRectangle, dist_max=0)->list[RTSS]:
+        """
+        Méthode qui permet de retourner les RTSS du réseau dont l'étendue est à moins d'une distance d'un rectangle.
+
+        Args:
+            rectangle (QgsRectangle): Le rectangle à vérifier
+            dist_max (float, optional): La distance autour du rectangle. Defaults to 0.
+        """
+        if rectangle is None or rectangle.isNull(): return []
+        rectangle = QgsRectangle(rectangle)
+        rectangle.grow(dist_max)
+        return list(set([self.dict_ids[id] for id in self.spatial_index.intersects(rectangle) if id in self.dict_ids]))
+
     def getValues(self, rtss:RTSS, chainage:Chainage, elem_attribut_name:str, chainage_f:Chainage=None):
         """
         Méthode qui perment de retourner la valeur d'un attibut des l'éléments
@@ -346,6 +727,13 @@ class ReseauSegmenter(Geocodage):
             elem_attribut_name (str): Le nom de l'attribut
             chainage_f (Chainage): Spécifier un chainage de fin
         """
+        # Utiliser directement les colonnes si le RTSS est en colonnes
+        columnar_seg = self.getColumnarSegmentation(rtss)
+        if columnar_seg is not None:
+            if chainage_f is not None: return columnar_seg.getValuesInRange(float(Chainage(chainage)), float(Chainage(chainage_f)), elem_attribut_name)
+            index = columnar_seg.getSegmentationIndex(float(self.reseau[RTSS(rtss)].getChainageOnRTSS(chainage)))
+            if index is None: return []
+            return columnar_seg.getValues(index, elem_attribut_name)
         # Aller chercher le RTSS segmenter 
         segment_rtss = self.get(rtss)
         # Vérifier que le RTSS est bien dans le réseau
@@ -353,6 +741,141 @@ class ReseauSegmenter(Geocodage):
 
         return segment_rtss.getValues(chainage=chainage, elem_attribut_name=elem_attribut_name, chainage_f=chainage_f)
 
+    def getValuesFromRanges(self, list_rtss:list, chainages_d:list, chainages_f:list, elem_attribut_name:str, weighted=False):
+        """
+        Méthode qui perment de retourner les valeurs d'un attibut des éléments pour une liste
+        d'intervalles (rtss, chainage de début, chainage de fin). Les listes peuvent aussi être des array.
+
+        Args:
+            list_rtss (list): Les RTSS des intervalles
+            chainages_d (list): Les chainages de début des intervalles
+            chainages_f (list): Les chainages de fin des intervalles (non inclus)
+            elem_attribut_name (str): Le nom de l'attribut
+            weighted (bool, optional): Retourner un dictionnaire des longueurs par valeur. Defaults to False.
+
+        Returns (list): La liste des valeurs de chaque intervalle (None si le RTSS n'est pas dans le réseau)
+        """
+        # Cache des LinearReferencing par RTSS pour ne pas reformater le RTSS à chaque intervalle
+        cache_ref:dict[str, LinearReferencing] = {}
+        results = []
+        for rtss, chainage_d, chainage_f in zip(list_rtss, chainages_d, chainages_f):
+            if rtss not in cache_ref: cache_ref[rtss] = self.getColumnarSegmentation(rtss) or self.getLinearReference(rtss)
+            segment_rtss = cache_ref[rtss]
+            # Vérifier que le RTSS est bien dans le réseau
+            if segment_rtss is None: results.append(None)
+            # Les RTSS en colonnes prennent des chainages en float
+            elif isinstance(segment_rtss, ColumnarSegmentation):
+                start, end = float(Chainage(chainage_d)), float(Chainage(chainage_f))
+                if weighted: results.append(segment_rtss.getWeightedValues(start, end, elem_attribut_name))
+                else: results.append(segment_rtss.getValuesInRange(start, end, elem_attribut_name))
+            elif weighted: results.append(segment_rtss.getWeightedValues(chainage_d, chainage_f, elem_attribut_name))
+            else: results.append(segment_rtss.getValuesInRange(chainage_d, chainage_f, elem_attribut_name))
+        return results
+
+    def getSegmentationIndexes(self, list_rtss:list, chainages:list)->list:
+        """
+        Méthode qui permet de trouver en lot le point de segmentation de chaque localisation (rtss, chainage).
+        Les localisations sont regroupées par RTSS et cherchées avec un seul searchsorted sur les
+        chainages des points de segmentation de chaque RTSS.
+
+        Args:
+            list_rtss (list): Les RTSS des localisations (None est ignoré)
+            chainages (list): Les chainages des localisations
+
+        Returns (list): Liste de tuples (RTSS, array des positions des localisations, array des index ou -1)
+            pour chaque RTSS présent dans le réseau
+        """
+        try: chainages = np.asarray(chainages, dtype=float)
+        except (TypeError, ValueError): chainages = np.array([float(Chainage(chainage)) for chainage in chainages], dtype=float)
+        # Positions des localisations par RTSS
+        groups:dict[str, list] = {}
+        for i, rtss in enumerate(list_rtss):
+            if rtss is not None: groups.setdefault(rtss, []).append(i)
+        results = []
+        for rtss, rows in groups.items():
+            rtss = RTSS(rtss)
+            linear_ref = self.reseau.get(rtss, None)
+            if linear_ref is None: continue
+            rows = np.array(rows, dtype=np.int64)
+            # Même correction que getChainageOnRTSS
+            values = np.clip(chainages[rows], float(linear_ref.chainageDebut()), float(linear_ref.chainageFin()))
+            columnar_seg = self.getColumnarSegmentation(rtss)
+            if columnar_seg is not None: indexes = columnar_seg.getSegmentationIndexes(values)
+            else: indexes = ColumnarSegmentation.searchSegmentationIndexes(
+                np.array([float(chainage) for chainage in linear_ref.sorted_chainages], dtype=float),
+                np.array([point.isEnd() for point in linear_ref.sorted_points], dtype=bool),
+                values)
+            results.append((rtss, rows, indexes))
+        return results
+
+    def getValuesFromChainages(self, list_rtss:list, chainages:list, elem_attribut_name:str, first=False)->np.ndarray:
+        """
+        Méthode qui perment de retourner en lot la valeur d'un attibut des éléments pour
+        des localisations (rtss, chainage). Les listes peuvent aussi être des array.
+
+        Args:
+            list_rtss (list): Les RTSS des localisations
+            chainages (list): Les chainages des localisations
+            elem_attribut_name (str): Le nom de l'attribut
+            first (bool, optional): Retourner seulement la première valeur (ou None). Defaults to False.
+
+        Returns (np.ndarray): Array d'objets des listes de valeurs de chaque localisation
+            (None si le RTSS n'est pas dans le réseau)
+        """
+        results = np.full(len(list_rtss), None, dtype=object)
+        for rtss, rows, indexes in self.getSegmentationIndexes(list_rtss, chainages):
+            columnar_seg = self.getColumnarSegmentation(rtss)
+            linear_ref = self.reseau[rtss]
+            # Les valeurs de chaque point de segmentation sont calculées une seule fois
+            unique_indexes, inverse = np.unique(indexes, return_inverse=True)
+            values = []
+            for idx in unique_indexes.tolist():
+                if idx == -1: point_values = []
+                elif columnar_seg is not None: point_values = columnar_seg.getValues(idx, elem_attribut_name)
+                else: point_values = linear_ref.sorted_points[idx].getValues(elem_attribut_name)
+                values.append(point_values)
+            for row, pos in zip(rows.tolist(), inverse.ravel().tolist()):
+                if first: results[row] = values[pos][0] if values[pos] else None
+                else: results[row] = list(values[pos])
+        return results
+
+    def getValuesFromPoints(self, points, elem_attribut_name:str, dist_max=None, first=False, workers=1)->np.ndarray:
+        """
+        Méthode qui perment de retourner en lot la valeur d'un attibut des éléments pour
+        des coordonnées. Les points sont géocodés de façon vectorisée (voir geocoderInversePoints).
+
+        Args:
+            points (array): Array (n, 2) des coordonnées des points
+            elem_attribut_name (str): Le nom de l'attribut
+            dist_max (float, optional): La distance maximale du RTSS. Defaults to None (aucune limite).
+            first (bool, optional): Retourner seulement la première valeur (ou None). Defaults to False.
+            workers (int, optional): Nombre de threads pour la recherche de l'index (-1 = tous les processeurs). Defaults to 1.
+
+        Returns (np.ndarray): Array d'objets des listes de valeurs de chaque point (None si aucun RTSS)
+        """
+        list_rtss, chainages, _ = self.geocoderInversePoints(points, dist_max=dist_max, workers=workers)
+        return self.getValuesFromChainages(list_rtss, chainages, elem_attribut_name, first=first)
+
+    def getWeightedValues(self, rtss:RTSS, chainage_d:Chainage, chainage_f:Chainage, elem_attribut_name:str):
+        """
+        Méthode qui perment de retourner les valeurs d'un attibut des éléments entre 2 chainages
+        avec la longueur sur laquelle chaque valeur est présente.
+
+        Args:
+            rtss (RTSS): Le RTSS pour lequel retourner les valeurs
+            chainage_d (Chainage): Le chainage de début
+            chainage_f (Chainage): Le chainage de fin
+            elem_attribut_name (str): Le nom de l'attribut
+        """
+        columnar_seg = self.getColumnarSegmentation(rtss)
+        if columnar_seg is not None:
+            return columnar_seg.getWeightedValues(float(Chainage(chainage_d)), float(Chainage(chainage_f)), elem_attribut_name)
+        # Aller chercher le RTSS segmenter 
+        segment_rtss = self.get(rtss)
+        # Vérifier que le RTSS est bien dans le réseau
+        if segment_rtss is None: return None
+        return segment_rtss.getWeightedValues(chainage_d, chainage_f, elem_attribut_name)
+
     def getValuesFromPointRTSS(self, point_rtss:PointRTSS, elem_attribut_name:str):
         """
         Méthode qui perment de retourner la valeur d'un attibut des l'éléments
@@ -399,14 +922,32 @@ class ReseauSegmenter(Geocodage):
         line_rtss = self.geocoderLine(line)
         return self.getValuesFromLineRTSS(line_rtss, elem_attribut_name)
 
+    def getColumnarSegmentation(self, rtss:RTSS)->ColumnarSegmentation:
+        """ Permet de retourner les segmentations en colonnes d'un RTSS ou None si le RTSS n'est pas en colonnes """
+        if self.columns == {}: return None
+        return self.columns.get(RTSS(rtss), None)
+
     def getLinearReference(self, rtss:RTSS)->LinearReferencing:
         """
-        Méthode qui permet de retourner le RTSS segmenter
+        Méthode qui permet de retourner le RTSS segmenter.
+        Pour un RTSS en colonnes, une copie est retournée et les colonnes sont conservées. La copie des
+        derniers RTSS lus est conservée jusqu'à ce que leurs colonnes soient remplacées ou modifiées,
+        elle ne doit donc pas être modifiée. Utiliser expandColumns pour modifier les segmentations du RTSS.
 
         Args:
             - rtss (RTSS): Le numéro du RTSS 
         """
-        return self.reseau.get(RTSS(rtss), None)
+        columnar_seg = self.getColumnarSegmentation(rtss)
+        if columnar_seg is None: return self.reseau.get(RTSS(rtss), None)
+        rtss = RTSS(rtss)
+        # La copie est valide tant que les colonnes du RTSS sont les mêmes
+        view = self.views.pop(rtss, None)
+        if view is None or view[0] is not columnar_seg:
+            view = (columnar_seg, columnar_seg.toLinearReferencing(self.createLinearReference(rtss)))
+        self.views[rtss] = view
+        # Retirer la copie lue il y a le plus longtemps
+        if len(self.views) > VIEWS_CACHE_SIZE: self.views.pop(next(iter(self.views)), None)
+        return view[1]
     
     def getElements(self, rtss:RTSS, chainage:Chainage)->list[LineSegmentationElement]:
         """
@@ -422,6 +963,27 @@ class ReseauSegmenter(Geocodage):
         if point_segmentation is None: return []
         else: return point_segmentation.getElements()
 
+    def getElementsFromChainages(self, list_rtss:list, chainages:list)->list[list[LineSegmentationElement]]:
+        """
+        Méthode qui permet de retourner en lot les éléments des points de segmentation
+        de localisations (rtss, chainage). Voir getSegmentationIndexes.
+
+        Args:
+            - list_rtss (list): Les RTSS des localisations
+            - chainages (list): Les chainages des localisations
+
+        Returns (list): La liste des éléments de chaque localisation
+        """
+        results = [[] for _ in range(len(list_rtss))]
+        for rtss, rows, indexes in self.getSegmentationIndexes(list_rtss, chainages):
+            columnar_seg = self.getColumnarSegmentation(rtss)
+            linear_ref = self.reseau[rtss]
+            for row, idx in zip(rows.tolist(), indexes.tolist()):
+                if idx == -1: continue
+                if columnar_seg is not None: results[row] = columnar_seg.getElements(idx)
+                else: results[row] = linear_ref.sorted_points[idx].getElements()
+        return results
+
     def getElementsFromPointRTSS(self, point_rtss:PointRTSS)->list[LineSegmentationElement]:
         """
         Méthode qui permet de retourner la valeur des éléments d'un PointSegmentation a un
@@ -445,6 +1007,13 @@ class ReseauSegmenter(Geocodage):
         return self.getElementsFromPointRTSS(point_rtss)
 
     def getSegmentation(self, rtss:RTSS, chainage:Chainage):
+        # Créer le point de segmentation à partir des colonnes si le RTSS est en colonnes
+        columnar_seg = self.getColumnarSegmentation(rtss)
+        if columnar_seg is not None:
+            linear_ref = self.reseau[RTSS(rtss)]
+            index = columnar_seg.getSegmentationIndex(float(linear_ref.getChainageOnRTSS(chainage)))
+            if index is None: return None
+            return linear_ref.createSegmentation(float(columnar_seg.chainages[index]), columnar_seg.getElements(index))
         # Aller chercher le RTSS segmenter 
         segment_rtss = self.getLinearReference(rtss)
         # Vérifier que le RTSS est bien dans le réseau
@@ -469,6 +1038,8 @@ class ReseauSegmenter(Geocodage):
 
     def isRTSSEmpty(self, rtss:RTSS):
         """ Permet de vérifier si le réseau est vide pour le RTSS """
+        columnar_seg = self.getColumnarSegmentation(rtss)
+        if columnar_seg is not None: return columnar_seg.isEmpty()
         # Aller chercher le RTSS segmenter 
         segment_rtss = self.getLinearReference(rtss)
         # Vérifier que le RTSS est bien dans le réseau
@@ -484,6 +1055,9 @@ class ReseauSegmenter(Geocodage):
         """
         # Définir le réseau par défault
         self.reseau = reseau
+        self.columns:Dict[RTSS, ColumnarSegmentation] = {}
+        # Copies des RTSS en colonnes récemment lus (voir getLinearReference)
+        self.views:Dict[RTSS, tuple] = {}
         # Parcourir tout les RTSS du module de géocodage
         for feat_rtss in self.getListFeatRTSS():
             # Skip les FeatRTSS déjà dans le réseau
@@ -491,6 +1065,99 @@ class ReseauSegmenter(Geocodage):
             # Ajouter le FeatRTSS au réseau si il n'était pas présent
             self.reseau[feat_rtss.getRTSS()] = LinearReferencing.fromFeatRTSS(feat_rtss)
         
+    def save(self, file_path:str, cache_key:dict=None):
+        """
+        Méthode qui permet d'enregistrer le réseau dans un fichier .npz compressé de colonnes
+        (rtss, chainage_d, chainage_f, offsets, attributs). Le réseau peut être rechargé avec
+        le constructeur load. Les valeurs de dates (QDate, QDateTime, ...) sont conservées avec leur type
+        et une valeur d'un autre type non supporté par JSON lève une TypeError.
+
+        Args:
+            file_path (str): Le chemin du fichier .npz
+            cache_key (dict, optional): La clé du réseau (voir createCacheKey). Defaults to None.
+        """
+        columns = self.toColumns()
+        arrays = {name: columns[name] for name in COLUMNS_RESEAU}
+        for i, name in enumerate(columns["attributs"]): arrays[f"codes_{i}"] = columns["codes"][name]
+        header = {
+            "cache_key": cache_key,
+            "attributs": columns["attributs"],
+            "values": [columns["values"][name] for name in columns["attributs"]]}
+        arrays["header"] = np.array(json.dumps(header, default=encodeJsonValue))
+        # Écrire dans un fichier temporaire pour ne jamais laisser un fichier tronqué
+        saveNpz(file_path, **arrays)
+
+    def swapSegmentations(self, segmentations:Dict[RTSS, Union[LinearReferencing, ColumnarSegmentation]], list_rtss:list):
+        """
+        Méthode qui permet de remplacer les segmentations de plusieurs RTSS d'un seul coup.
+        Le nouveau réseau est construit à part et remplace l'ancien en une seule assignation, les requêtes
+        en cours continuent donc d'utiliser l'ancien réseau.
+
+        Args:
+            segmentations (dict): Les nouvelles segmentations par RTSS (voir interpolateSegmentations)
+            list_rtss (list): Les RTSS à remplacer. Les RTSS sans nouvelle segmentation deviennent vides.
+        """
+        reseau, columns = dict(self.reseau), dict(self.columns)
+        for rtss in list_rtss:
+            rtss = RTSS(rtss)
+            if rtss not in reseau: continue
+            columns.pop(rtss, None)
+            segmentation = segmentations.get(rtss, None)
+            if isinstance(segmentation, LinearReferencing): reseau[rtss] = segmentation
+            else:
+                reseau[rtss] = self.createLinearReference(rtss)
+                if segmentation is not None: columns[rtss] = segmentation
+        self.reseau, self.columns = reseau, columns
+        for rtss in list_rtss: self.views.pop(RTSS(rtss), None)
+
+    def toColumns(self)->dict:
+        """
+        Méthode qui permet d'exporter le réseau en colonnes. Chaque ligne est un élément d'un intervalle
+        de segmentation. Les valeurs d'attributs sont encodées par dictionnaire: un array d'index par attribut
+        (-1 si l'élément n'a pas l'attribut) et la liste des valeurs uniques de l'attribut.
+
+        Returns (dict): rtss, chainage_d, chainage_f, offset_d, offset_f, interpolate (arrays),
+        attributs (liste des noms), codes (dict d'arrays) et values (dict de listes)
+        """
+        rows = {name: [] for name in COLUMNS_RESEAU}
+        rows_atts = []
+        for rtss_key, linear_ref in self.reseau.items():
+            rtss = linear_ref.value()
+            # Les RTSS en colonnes sont exportés sans recréer les objets
+            if rtss_key in self.columns:
+                for c_d, c_f, offset_d, offset_f, interpolate, atts in self.columns[rtss_key].rows():
+                    for name, value in zip(COLUMNS_RESEAU, (rtss, c_d, c_f, offset_d, offset_f, interpolate)): rows[name].append(value)
+                    rows_atts.append(atts)
+                continue
+            for c_d, c_f, point in linear_ref.getIntervals():
+                for elem in point:
+                    rows["rtss"].append(rtss)
+                    rows["chainage_d"].append(c_d)
+                    rows["chainage_f"].append(c_f)
+                    rows["offset_d"].append(elem.getOffsetDebut())
+                    rows["offset_f"].append(elem.getOffsetFin())
+                    rows["interpolate"].append(elem.intepolate_on_rtss)
+                    rows_atts.append(elem.getAttributs())
+        columns = {
+            "rtss": np.array(rows["rtss"], dtype=str),
+            "chainage_d": np.array(rows["chainage_d"], dtype=float),
+            "chainage_f": np.array(rows["chainage_f"], dtype=float),
+            "offset_d": np.array(rows["offset_d"], dtype=float),
+            "offset_f": np.array(rows["offset_f"], dtype=float),
+            "interpolate": np.array(rows["interpolate"], dtype=bool)}
+        # Encoder les valeurs de chaque attribut par dictionnaire
+        columns["attributs"] = list(dict.fromkeys(name for atts in rows_atts for name in atts))
+        columns["codes"], columns["values"] = {}, {}
+        for name in columns["attributs"]:
+            index_values = {}
+            codes = np.full(len(rows_atts), -1, dtype=np.int32)
+            for i, atts in enumerate(rows_atts):
+                if name not in atts: continue
+                codes[i] = index_values.setdefault((type(atts[name]), atts[name]), len(index_values))
+            columns["codes"][name] = codes
+            columns["values"][name] = [value for _, value in index_values]
+        return columns
+
     def updateSegmentation(self, rtss_seg:LinearReferencing):
         """
         Méthode qui permet de modifier la segmentation d'un RTSS du réseau.
@@ -498,7 +1165,10 @@ class ReseauSegmenter(Geocodage):
         Args:
             - rtss_seg (LineairReferencing): L'objet qui contient les segmentations sur le RTSS
         """
-        if rtss_seg.getRTSS() in self.reseau: self.reseau[rtss_seg.getRTSS()] = rtss_seg
+        if rtss_seg.getRTSS() in self.reseau:
+            self.reseau[rtss_seg.getRTSS()] = rtss_seg
+            self.columns.pop(rtss_seg.getRTSS(), None)
+            self.views.pop(rtss_seg.getRTSS(), None)
         
     def createLayer(self, layer_name:str, attributs:dict[str:QVariant]={}):
         """
@@ -512,43 +1182,159 @@ class ReseauSegmenter(Geocodage):
         """
         # Create memory layer
         layer = QgsVectorLayer(f"LineString?crs={self.getCrs().authid()}", layer_name, "memory")
-        
-        # Identifier tous les attributs utilisés si aucun attribut n'est spécifié
-        if attributs == {}:
-            # Parcourir toutes les LinearReferencing du réseau
-            for linear_ref in self:
-                # Parcourir toutes les SegmentationPoint du LinearReferencing
-                for seg_point in linear_ref:
-                    # Parcourir toutes les LineSegmentationElement du SegmentationPoint
-                    for elem in seg_point:
-                        # Parcourir toutes les attributs du LineSegmentationElement
-                        for key, val in elem.getAttributs().items():
-                            if key not in attributs:
-                                if isinstance(val, float): type_field = QVariant.Double
-                                elif isinstance(val, int): type_field = QVariant.Int
-                                else: type_field = QVariant.String
-                                attributs[key] = type_field
-        
-        # Définir les champs par défault de la couche
-        fields = [
-            QgsField("RTSS", QVariant.String),
-            QgsField("Chainage_d", QVariant.Int),
-            QgsField("Chainage_f", QVariant.Int)]
-        # Ajouter les champs des attributs 
-        for name, type_ in attributs.items(): fields.append(QgsField(name, type_))
         # Ajouter les champs dans la couche 
-        layer.dataProvider().addAttributes(fields)
+        layer.dataProvider().addAttributes(self.createFields(attributs).toList())
         # Actualiser la couche avec les champs ajoutés
         layer.updateFields()
-
-        # Définir la liste des features à ajouter dans la couche
-        feats = []
-        # Créer et ajouter toutes les features de chaque LinearReferencing
-        for linear_ref in self: feats.extend(linear_ref.createFeatures(layer))
-        
-        # Ajouter les features dans la couche
-        layer.dataProvider().addFeatures(feats)
+        # Ajouter les features dans la couche par lot
+        self.writeToSink(layer.dataProvider(), layer.fields())
         # Retourner la couche
         return layer
-                
-        
\ No newline at end of file
+
+    def createFields(self, attributs:dict[str:QVariant]={})->QgsFields:
+        """
+        Méthode qui permet de créer les champs (RTSS, Chainage_d, Chainage_f et attributs) d'une couche du réseau segmenté.
+
+        Args:
+            attributs (dict[str:QVariant]): Un dictionnaire des attributs à ajouter. Defaults to {} (toute les attributs).
+
+        Returns (QgsFields): Les champs de la couche
+        """
+        # Identifier tous les attributs utilisés si aucun attribut n'est spécifié
+        if attributs == {}: attributs = self.getAttributsTypes()
+        fields = QgsFields()
+        # Définir les champs par défault de la couche
+        fields.append(QgsField("RTSS", QVariant.String))
+        fields.append(QgsField("Chainage_d", QVariant.Int))
+        fields.append(QgsField("Chainage_f", QVariant.Int))
+        # Ajouter les champs des attributs 
+        for name, type_ in attributs.items(): fields.append(QgsField(name, type_))
+        return fields
+
+    def getAttributsTypes(self)->dict[str:QVariant]:
+        """
+        Méthode qui permet d'identifier le type de tous les attributs des éléments du réseau.
+        Les valeurs des RTSS en colonnes sont lues dans le dictionnaire des valeurs.
+
+        Returns (dict[str:QVariant]): Le type de chaque attribut
+        """
+        attributs = {}
+        def addType(key, val):
+            # Le type d'un attribut toujours vide sera un texte
+            if val is None: return attributs.setdefault(key, None)
+            if isinstance(val, float): type_field = QVariant.Double
+            elif isinstance(val, int): type_field = QVariant.Int
+            else: type_field = QVariant.String
+            # Un champ entier devient réel s'il contient aussi des valeurs réelles
+            current = attributs.get(key, None)
+            if current is None or (current == QVariant.Int and type_field == QVariant.Double): attributs[key] = type_field
+        # Parcourir les valeurs des RTSS en colonnes
+        if self.columns != {}:
+            for name in self.dictionary.names():
+                for value in self.dictionary.values[name]: addType(name, value)
+        # Parcourir toutes les LinearReferencing en objets du réseau
+        for rtss, linear_ref in self.reseau.items():
+            if rtss in self.columns: continue
+            for seg_point in linear_ref:
+                for elem in seg_point:
+                    for key, val in elem.getAttributs().items(): addType(key, val)
+        return {key: QVariant.String if type_ is None else type_ for key, type_ in attributs.items()}
+
+    def iterFeatures(self, fields:QgsFields, list_rtss:list=None):
+        """
+        Générateur des entités linéaires de chaque élément du réseau segmenté, un RTSS à la fois.
+        Les RTSS en colonnes ne sont pas convertis en objets et la géométrie d'un intervalle
+        est géocodée une seule fois pour les éléments avec les mêmes offsets.
+
+        Args:
+            fields (QgsFields): Les champs des entités (voir createFields)
+            list_rtss (list, optional): Les RTSS à parcourir. Defaults to None (tous les RTSS).
+
+        Returns (iterator): Les QgsFeature de chaque élément
+        """
+        names = fields.names()[3:]
+        if list_rtss is None: list_rtss = list(self.reseau.keys())
+        for rtss in list_rtss:
+            linear_ref = self.reseau.get(RTSS(rtss), None)
+            if linear_ref is None: continue
+            columnar_seg = self.getColumnarSegmentation(rtss)
+            if columnar_seg is not None: rows = columnar_seg.rows()
+            else:
+                rows = ((c_d, c_f, elem.getOffsetDebut(), elem.getOffsetFin(), elem.intepolate_on_rtss, elem.getAttributs())
+                        for c_d, c_f, point in linear_ref.getIntervals() for elem in point)
+            rtss_value = linear_ref.getRTSS().valueFormater()
+            # Géométries de l'intervalle courant selon les offsets
+            geoms, last_chainages = {}, None
+            for c_d, c_f, offset_d, offset_f, _, atts in rows:
+                if (c_d, c_f) != last_chainages: geoms, last_chainages = {}, (c_d, c_f)
+                if (offset_d, offset_f) not in geoms:
+                    geoms[(offset_d, offset_f)] = linear_ref.geocoderLineFromChainage(
+                        chainages=[Chainage(c_d), Chainage(c_f)],
+                        offsets=[offset_d, offset_f],
+                        interpolate_on_rtss=True)
+                feat = QgsFeature(fields)
+                feat.setGeometry(geoms[(offset_d, offset_f)])
+                feat.setAttributes(
+                    [rtss_value, Chainage(c_d).value(precision=0), Chainage(c_f).value(precision=0)] +
+                    [atts.get(name, None) for name in names])
+                yield feat
+
+    def writeToSink(self, sink:QgsFeatureSink, fields:QgsFields, list_rtss:list=None, batch_size=5000, feedback=None):
+        """
+        Méthode qui permet d'écrire les entités du réseau segmenté dans un QgsFeatureSink par lot.
+        Seulement un lot d'entités est en mémoire à la fois.
+
+        Args:
+            sink (QgsFeatureSink): La destination des entités (ex: dataProvider, QgsVectorFileWriter, sink d'un algorithme)
+            fields (QgsFields): Les champs des entités (voir createFields)
+            list_rtss (list, optional): Les RTSS à écrire. Defaults to None (tous les RTSS).
+            batch_size (int, optional): Le nombre d'entités par lot. Defaults to 5000.
+            feedback (QgsFeedback, optional): Permet d'annuler l'écriture. Defaults to None.
+
+        Returns (int): Le nombre d'entités écrites
+        """
+        count, batch = 0, []
+        for feat in self.iterFeatures(fields, list_rtss=list_rtss):
+            batch.append(feat)
+            if len(batch) < batch_size: continue
+            if feedback is not None and feedback.isCanceled(): return count
+            sink.addFeatures(batch, QgsFeatureSink.FastInsert)
+            count += len(batch)
+            batch = []
+        if batch:
+            sink.addFeatures(batch, QgsFeatureSink.FastInsert)
+            count += len(batch)
+        return count
+
+    def writeToFile(self, file_path:str, layer_name:str, attributs:dict[str:QVariant]={}, driver_name="GPKG", batch_size=5000, feedback=None):
+        """
+        Méthode qui permet d'écrire le réseau segmenté dans un fichier (GeoPackage par défault) sans créer de couche mémoire.
+        La couche est remplacée si elle existe déjà dans le fichier.
+
+        Args:
+            file_path (str): Le chemin du fichier
+            layer_name (str): Le nom de la couche dans le fichier
+            attributs (dict[str:QVariant]): Un dictionnaire des attributs à ajouter. Defaults to {} (toute les attributs).
+            driver_name (str, optional): Le format du fichier. Defaults to "GPKG".
+            batch_size (int, optional): Le nombre d'entités par lot. Defaults to 5000.
+            feedback (QgsFeedback, optional): Permet d'annuler l'écriture. Defaults to None.
+
+        Returns (int): Le nombre d'entités écrites
+        """
+        fields = self.createFields(attributs)
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = driver_name
+        options.layerName = layer_name
+        if os.path.isfile(file_path): options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+        writer = QgsVectorFileWriter.create(
+            file_path,
+            fields,
+            QgsWkbTypes.LineString,
+            self.getCrs(),
+            QgsProject.instance().transformContext(),
+            options)
+        if writer.hasError() != QgsVectorFileWriter.NoError:
+            raise Exception(f"Le fichier {file_path} n'a pas pu être créé: {writer.errorMessage()}")
+        try: return self.writeToSink(writer, fields, batch_size=batch_size, feedback=feedback)
+        # Fermer le fichier
+        finally: del writer
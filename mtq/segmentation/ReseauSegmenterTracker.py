@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+from qgis.core import QgsVectorLayer, QgsFeatureRequest, QgsRectangle, QgsGeometry
+
+from ..geomapping.RTSS import RTSS
+from .ReseauSegmenter import ReseauSegmenter
+
+class ReseauSegmenterTracker:
+    """
+    Permet de suivre les modifications d'une couche utilisée pour interpoler un ReseauSegmenter.
+    Les RTSS à moins de la distance d'interpolation des entités modifiées sont marqués à recalculer
+    et seulement ces RTSS sont interpolés de nouveau.
+    """
+
+    def __init__(self,
+                 reseau:ReseauSegmenter,
+                 layer:QgsVectorLayer,
+                 field_value=[],
+                 fields_route=[],
+                 step=10,
+                 max_dist=20,
+                 columnar=False):
+        """
+        Initialisation d'un objet ReseauSegmenterTracker.
+
+        Args:
+            - reseau (ReseauSegmenter): Le réseau à mettre à jour
+            - layer (QgsVectorLayer): La couche utilisée pour interpoler le réseau
+            - field_value: La liste des noms des champs de valeur de la couche
+            - fields_route: Une liste de nom de champ dont le 5 première lettre sont le numéro de route à filtrer
+            - step: La distance entre chaque point utilisé pour l'interpolation
+            - max_dist: La distance maximal pour qu'un objet soit considéré sur la route
+            - columnar: Conserver les nouvelles segmentations en colonnes. Defaults to False.
+        """
+        self.reseau = reseau
+        self.layer = layer
+        self.field_value = [field_value] if not isinstance(field_value, list) and field_value is not None else field_value
+        self.fields_route = fields_route
+        self.step = step
+        self.max_dist = max_dist
+        self.columnar = columnar
+        self.is_connected = False
+        # Les RTSS à interpoler de nouveau
+        self.dirty_rtss:set[RTSS] = set()
+        # L'étendue connue de chaque entité de la couche
+        self.bboxes:dict[int, QgsRectangle] = {}
+        self.updateBoundingBoxes()
+
+    def __str__(self): return f"ReseauSegmenterTracker ({len(self.dirty_rtss)} RTSS à recalculer)"
+
+    def __repr__(self): return self.__str__()
+
+    def applyUpdate(self, segmentations:dict, list_rtss:list):
+        """ Permet de remplacer les segmentations des RTSS recalculés dans le réseau (voir computeUpdate) """
+        self.reseau.swapSegmentations(segmentations, list_rtss)
+
+    def computeUpdate(self, list_rtss:list, workers=None, feedback=None)->dict:
+        """
+        Permet d'interpoler de nouveau les segmentations de RTSS sans modifier le réseau.
+        Seulement les entités à proximité des RTSS sont lues dans la couche.
+
+        Args:
+            - list_rtss (list): Les RTSS à interpoler
+            - workers: Le nombre de threads à utiliser. Defaults to None (nombre de processeurs).
+            - feedback: Objet avec les méthodes setProgress et isCanceled (ex: QgsTask). Defaults to None.
+
+        Returns (dict): Les nouvelles segmentations par RTSS ou un dictionnaire vide si l'interpolation est annulée
+        """
+        if list_rtss == []: return {}
+        # Étendue des RTSS à interpoler
+        extent = QgsRectangle()
+        for rtss in list_rtss:
+            linear_ref = self.reseau.getReseau().get(RTSS(rtss), None)
+            if linear_ref is not None: extent.combineExtentWith(linear_ref.geometry().boundingBox())
+        extent.grow(self.max_dist)
+        return self.reseau.interpolateSegmentations(
+            self.layer,
+            field_value=self.field_value,
+            fields_route=self.fields_route,
+            step=self.step,
+            max_dist=self.max_dist,
+            list_rtss=list_rtss,
+            workers=workers,
+            columnar=self.columnar,
+            filter_request=QgsFeatureRequest().setFilterRect(extent),
+            feedback=feedback)
+
+    def connect(self):
+        """ Permet de connecter les signaux de modification de la couche """
+        if self.is_connected: return None
+        self.layer.featureAdded.connect(self.onFeatureAdded)
+        self.layer.featureDeleted.connect(self.onFeatureDeleted)
+        self.layer.geometryChanged.connect(self.onGeometryChanged)
+        self.layer.attributeValueChanged.connect(self.onAttributeValueChanged)
+        self.layer.committedFeaturesAdded.connect(self.onCommittedFeaturesAdded)
+        self.layer.afterCommitChanges.connect(self.onAfterCommitChanges)
+        self.layer.afterRollBack.connect(self.updateBoundingBoxes)
+        self.is_connected = True
+
+    def disconnect(self):
+        """ Permet de déconnecter les signaux de modification de la couche """
+        if not self.is_connected: return None
+        for signal, slot in (
+            (self.layer.featureAdded, self.onFeatureAdded),
+            (self.layer.featureDeleted, self.onFeatureDeleted),
+            (self.layer.geometryChanged, self.onGeometryChanged),
+            (self.layer.attributeValueChanged, self.onAttributeValueChanged),
+            (self.layer.committedFeaturesAdded, self.onCommittedFeaturesAdded),
+            (self.layer.afterCommitChanges, self.onAfterCommitChanges),
+            (self.layer.afterRollBack, self.updateBoundingBoxes)):
+            # La couche peut déjà avoir été supprimée
+            try: signal.disconnect(slot)
+            except (TypeError, RuntimeError): pass
+        self.is_connected = False
+
+    def getDirtyRTSS(self)->list[RTSS]:
+        """ Permet de retourner la liste des RTSS à interpoler de nouveau """
+        return list(self.dirty_rtss)
+
+    def isDirty(self):
+        """ Permet de vérifier si des RTSS doivent être interpolés de nouveau """
+        return len(self.dirty_rtss) > 0
+
+    def markRectangle(self, rectangle:QgsRectangle):
+        """ Permet de marquer les RTSS à moins de la distance d'interpolation d'un rectangle """
+        self.dirty_rtss.update(self.reseau.getRTSSInRectangle(rectangle, self.max_dist))
+
+    def markRTSS(self, list_rtss:list):
+        """ Permet de marquer des RTSS à interpoler de nouveau """
+        self.dirty_rtss.update([RTSS(rtss) for rtss in list_rtss])
+
+    def onAfterCommitChanges(self):
+        # Les identifiants temporaires des entités ajoutées ne sont plus valides
+        for fid in [fid for fid in self.bboxes if fid < 0]: del self.bboxes[fid]
+
+    def onAttributeValueChanged(self, fid:int, idx:int, value):
+        # Seulement les champs utilisés par l'interpolation modifient le réseau
+        if self.layer.fields().at(idx).name() in self.field_value + self.fields_route:
+            self.markRectangle(self.bboxes.get(fid, None))
+
+    def onCommittedFeaturesAdded(self, layer_id:str, features:list):
+        for feat in features: self.bboxes[feat.id()] = feat.geometry().boundingBox()
+
+    def onFeatureAdded(self, fid:int):
+        feat = self.layer.getFeature(fid)
+        self.bboxes[fid] = feat.geometry().boundingBox()
+        self.markRectangle(self.bboxes[fid])
+
+    def onFeatureDeleted(self, fid:int):
+        self.markRectangle(self.bboxes.pop(fid, None))
+
+    def onGeometryChanged(self, fid:int, geometry:QgsGeometry):
+        # L'ancienne et la nouvelle position de l'entité modifient le réseau
+        self.markRectangle(self.bboxes.get(fid, None))
+        self.bboxes[fid] = geometry.boundingBox()
+        self.markRectangle(self.bboxes[fid])
+
+    def takeDirtyRTSS(self)->list[RTSS]:
+        """ Permet de retourner la liste des RTSS à interpoler de nouveau et de la vider """
+        list_rtss, self.dirty_rtss = list(self.dirty_rtss), set()
+        return list_rtss
+
+    def update(self, workers=None):
+        """
+        Permet d'interpoler de nouveau les RTSS marqués et de les remplacer dans le réseau.
+
+        Returns (list): Les RTSS mis à jour
+        """
+        list_rtss = self.takeDirtyRTSS()
+        self.applyUpdate(self.computeUpdate(list_rtss, workers=workers), list_rtss)
+        return list_rtss
+
+    def updateBoundingBoxes(self):
+        """ Permet de définir l'étendue connue de chaque entité de la couche """
+        request = QgsFeatureRequest().setNoAttributes()
+        self.bboxes = {feat.id(): feat.geometry().boundingBox() for feat in self.layer.getFeatures(request)}
@@ -1 +1 @@
-__all__ = ["LineSegmentationElement", "SegmentationPoint", "LinearReferencing", "ReseauSegmenter"]
\ No newline at end of file
+__all__ = ["LineSegmentationElement", "SegmentationPoint", "LinearReferencing", "ColumnarSegmentation", "ReseauSegmenter", "ReseauSegmenterTracker"]
\ No newline at end of file
@@ -60,8 +60,9 @@ from .modules.CompleterRTSS import CompleterRTSS
 from .modules.PluginTemporaryLayer import PluginTemporaryLayer
 
 from .tasks.TaskGenerateReseauSegementation import TaskGenerateReseauSegementation
+from .tasks.TaskUpdateReseauSegementation import TaskUpdateReseauSegementation
 
-from .mtq.core import Geocodage, Chainage, PointRTSS, ReseauSegmenter, SIGO, PlaniActif
+from .mtq.core import Geocodage, Chainage, PointRTSS, ReseauSegmenter, ReseauSegmenterTracker, SIGO, PlaniActif
 from .mtq.fnt import validateLayer
 from .mtq.utils import Utilitaire as Utils
 
@@ -125,6 +126,10 @@ class MtqPluginChainage:
             precision=self.params.getValue("precision_chainage"))
         # Réseau segmenter 
         self.reseau_context = ReseauSegmenter(self.geocode)
+        # Suivi des modifications de la couche de context
+        self.tracker_context = None
+        # Tâche de mise à jour du réseau segmenté en cours
+        self.task_update_reseau = None
         
         # Reférence à la carte
         self.canvas = self.iface.mapCanvas()
@@ -464,6 +469,7 @@ class MtqPluginChainage:
         # remove the toolbar
         del self.toolbar_chaine
         # Éffacer la couche de contexte
+        self.stopContextLayerTracking()
         del self.reseau_context
         del self.geocode
     
@@ -503,6 +509,8 @@ class MtqPluginChainage:
 
         # Définir le module de Géocodage
         if not self.updateGeocode(): return None
+        # Recharger le réseau segmenté enregistré s'il est toujours valide
+        if self.reseau_context.isEmpty(): self.loadContextLayerIndex()
         # Vérifier que l'action de suivre le chainage est dans la barre d'outil
         if not self.setRaccourciChainage(): return None
         # Vérifier que l'action de placer des écussons est dans la barre d'outil
@@ -684,23 +692,79 @@ class MtqPluginChainage:
     def setReseauSegementation(self):
         """ Permet de définir le module du réseau segmenté à partir de la tache terminer """
         self.reseau_context = self.task_generate_reseau.getReseau()
+        self.startContextLayerTracking(
+            self.task_generate_reseau.layer_context,
+            self.task_generate_reseau.field_value,
+            self.task_generate_reseau.field_rtss)
+        # Enregistrer le réseau pour le recharger au prochain démarrage
+        try: self.reseau_context.save(self.getContextLayerCachePath(), cache_key=self.task_generate_reseau.cache_key)
+        except: Utils.warningMessage(self.iface, "Le réseau n'a pas pu être enregistré", subject="Réseau segmentation linéaire: ")
         del self.task_generate_reseau
         Utils.succesMessage(self.iface, "Le réseau a été généré avec succès!", subject="Réseau segmentation linéaire: ")
 
+    def getContextLayerCachePath(self):
+        """ Retourne le chemin du fichier du réseau segmenté enregistré """
+        return os.path.join(QgsApplication.qgisSettingsDirPath(), "PluginChainageMTQ", "reseau_context.npz")
+
+    def getContextLayer(self):
+        """
+        Permet de retourner la couche de context et ses champs selon les paramètres du plugin.
+
+        Returns (tuple): (couche de context, champ de valeur, liste du champ des routes) ou None si la couche n'est pas valide
+        """
+        field_value = self.params.getValue("field_context_value")
+        field_rtss = self.params.getValue("field_context_route")
+        layer_name = self.params.getValue("context_layer")
+        # Valider si la couche de context est valide
+        layer_context = validateLayer(layer_name, fields_name=[field_value], geom_type=1)
+        # Retourner None si la couche de context n'est pas valide
+        if layer_context is None: return None
+        # Définir le champs des numéros de routes
+        if not validateLayer(layer_name, fields_name=[field_value, field_rtss], geom_type=1) is None:
+            field_rtss = [field_rtss]
+        else: field_rtss = []
+        return layer_context, field_value, field_rtss
+
+    def getContextLayerCacheKey(self, layer_context, field_value, field_rtss):
+        """ Retourne la clé du réseau segmenté selon la couche de context, la couche des RTSS et les paramètres d'interpolation """
+        return ReseauSegmenter.createCacheKey(
+            layer_context,
+            layer_rtss=self.layer_rtss,
+            field_value=field_value,
+            field_rtss=field_rtss,
+            intervalle_interpolation=self.params.getValue("intervalle_interpolation"),
+            dist_interpolation=self.params.getValue("dist_interpolation"))
+
+    def loadContextLayerIndex(self):
+        """
+        Permet de recharger le réseau segmenté enregistré s'il correspond toujours à la couche de context.
+
+        Returns (bool): True si le réseau a été rechargé
+        """
+        try:
+            context = self.getContextLayer()
+            if context is None: return False
+            reseau = ReseauSegmenter.load(
+                self.geocode,
+                self.getContextLayerCachePath(),
+                cache_key=self.getContextLayerCacheKey(*context),
+                columnar=True)
+            if reseau is None: return False
+            self.reseau_context = reseau
+            self.startContextLayerTracking(*context)
+            return True
+        except: return False
+
     def generateContextLayerIndex(self):
         """ Permet de créer et exécuter la tache de génération du réseau segmenté """
         try:
-            field_value = self.params.getValue("field_context_value")
-            field_rtss = self.params.getValue("field_context_route")
-            layer_name = self.params.getValue("context_layer")
-            # Valider si la couche de context est valide
-            layer_context = validateLayer(layer_name, fields_name=[field_value], geom_type=1)
+            context = self.getContextLayer()
             # Retourner False si la couche de context n'est pas valide
-            if layer_context is None: return False
-            # Définir le champs des numéros de routes
-            if not validateLayer(layer_name, fields_name=[field_value, field_rtss], geom_type=1) is None:
-                field_rtss = [field_rtss]
-            else: field_rtss = []
+            if context is None: return False
+            layer_context, field_value, field_rtss = context
+            # Recharger le réseau enregistré s'il est toujours valide
+            if self.loadContextLayerIndex():
+                return Utils.succesMessage(self.iface, "Le réseau enregistré a été rechargé!", subject="Réseau segmentation linéaire: ")
             # Créer la tâche
             self.task_generate_reseau = TaskGenerateReseauSegementation(
                 geocode=self.geocode,
@@ -709,6 +773,7 @@ class MtqPluginChainage:
                 field_rtss=field_rtss,
                 interval=self.params.getValue("intervalle_interpolation"),
                 dist_max=self.params.getValue("dist_interpolation"))
+            self.task_generate_reseau.cache_key = self.getContextLayerCacheKey(layer_context, field_value, field_rtss)
             self.task_generate_reseau.taskCompleted.connect(self.setReseauSegementation)
             QgsApplication.taskManager().addTask(self.task_generate_reseau)
             Utils.InfoMessage(self.iface, "Débuter la tâche de génération du réseau...", subject="Réseau segmentation linéaire: ")
@@ -719,7 +784,59 @@ class MtqPluginChainage:
                 subject="Réseau segmentation linéaire: ")
             return False
 
+    def startContextLayerTracking(self, layer_context, field_value, field_rtss):
+        """ Permet de suivre les modifications de la couche de context pour mettre à jour le réseau segmenté """
+        self.stopContextLayerTracking()
+        self.tracker_context = ReseauSegmenterTracker(
+            self.reseau_context,
+            layer_context,
+            field_value=field_value,
+            fields_route=field_rtss,
+            step=self.params.getValue("intervalle_interpolation"),
+            max_dist=self.params.getValue("dist_interpolation"),
+            columnar=True)
+        self.tracker_context.connect()
+        # Mettre à jour le réseau lorsque les modifications sont enregistrées
+        layer_context.afterCommitChanges.connect(self.updateContextLayerIndex)
+
+    def stopContextLayerTracking(self):
+        """ Permet d'arrêter le suivi des modifications de la couche de context """
+        if self.tracker_context is None: return None
+        self.tracker_context.disconnect()
+        try: self.tracker_context.layer.afterCommitChanges.disconnect(self.updateContextLayerIndex)
+        except (TypeError, RuntimeError): pass
+        self.tracker_context = None
+
+    def updateContextLayerIndex(self):
+        """ Permet de créer et exécuter la tache de mise à jour des RTSS modifiés du réseau segmenté """
+        if self.tracker_context is None or not self.tracker_context.isDirty(): return None
+        # Une seule mise à jour à la fois, les RTSS modifiés pendant la tâche en cours restent marqués
+        # et sont mis à jour lorsqu'elle est terminée (voir endContextLayerIndexUpdate)
+        if self.task_update_reseau is not None: return None
+        self.task_update_reseau = TaskUpdateReseauSegementation(self.tracker_context)
+        self.task_update_reseau.taskCompleted.connect(self.saveContextLayerIndex)
+        self.task_update_reseau.taskCompleted.connect(lambda: self.endContextLayerIndexUpdate(True))
+        # Une tâche annulée ou en erreur n'est pas relancée, ses RTSS seront mis à jour au prochain enregistrement
+        self.task_update_reseau.taskTerminated.connect(lambda: self.endContextLayerIndexUpdate(False))
+        QgsApplication.taskManager().addTask(self.task_update_reseau)
+
+    def endContextLayerIndexUpdate(self, restart:bool):
+        """ Permet de libérer la tâche de mise à jour terminée et de mettre à jour les RTSS modifiés pendant celle-ci """
+        self.task_update_reseau = None
+        if restart: self.updateContextLayerIndex()
+
+    def saveContextLayerIndex(self):
+        """ Permet d'enregistrer le réseau segmenté avec la clé de la couche de context """
+        try:
+            context = self.getContextLayer()
+            if context is None: return None
+            self.reseau_context.save(self.getContextLayerCachePath(), cache_key=self.getContextLayerCacheKey(*context))
+        except: Utils.warningMessage(self.iface, "Le réseau n'a pas pu être enregistré", subject="Réseau segmentation linéaire: ")
+
     def deleteContextLayerIndex(self):
+        self.stopContextLayerTracking()
+        # Supprimer le réseau enregistré
+        if os.path.isfile(self.getContextLayerCachePath()): os.remove(self.getContextLayerCachePath())
         if self.reseau_context.isEmpty(): return None
         self.reseau_context.clear()
         Utils.succesMessage(self.iface, "Le réseau à été supprimer", subject="Réseau segmentation linéaire: ")
@@ -6,13 +6,17 @@ MESSAGE_CATEGORY = 'Index reseau segementé'
 
 class TaskGenerateReseauSegementation(QgsTask):
 
-    def __init__(self, geocode, layer_context, field_value, field_rtss, interval, dist_max):
+    def __init__(self, geocode, layer_context, field_value, field_rtss, interval, dist_max, workers=None):
         self.geocode = geocode
         self.layer_context = layer_context
         self.field_value = field_value
         self.field_rtss = field_rtss
         self.interval = interval
         self.dist_max = dist_max
+        # Nombre de threads pour l'interpolation (None = nombre de processeurs)
+        self.workers = workers
+        # Statistiques de l'interpolation
+        self.stats = {}
         # Suivi des erreurs
         self.exception = None
         self.reseau_context = None
@@ -38,10 +42,20 @@ class TaskGenerateReseauSegementation(QgsTask):
                 field_value=self.field_value,
                 fields_route=self.field_rtss,
                 step=self.interval,
-                max_dist=self.dist_max)
+                max_dist=self.dist_max,
+                workers=self.workers,
+                columnar=True,
+                feedback=self,
+                stats=self.stats)
         except Exception as error:
             self.exception = error
             return False
+        if self.isCanceled(): return False
+        # Afficher le débit de l'interpolation
+        if self.stats: QgsMessageLog.logMessage(
+            f"   - {self.stats['rtss']} RTSS et {self.stats['samples']} points interpolés en {self.stats['duration']:.1f}s "
+            f"({self.stats['rtss_per_sec']:.0f} RTSS/s, {self.stats['samples_per_sec']:.0f} points/s)",
+            MESSAGE_CATEGORY, Qgis.Info)
         return True
 
     def finished(self, result):
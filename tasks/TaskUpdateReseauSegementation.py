@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from qgis.core import QgsTask, QgsMessageLog, Qgis
+from ..mtq.core import ReseauSegmenterTracker
+
+MESSAGE_CATEGORY = 'Index reseau segementé'
+
+class TaskUpdateReseauSegementation(QgsTask):
+    """
+    Tâche qui interpole de nouveau les RTSS modifiés d'un réseau segmenté.
+    Le réseau actuel reste utilisé pendant le calcul et les nouvelles segmentations
+    sont remplacées à la fin de la tâche.
+    """
+
+    def __init__(self, tracker:ReseauSegmenterTracker):
+        self.tracker = tracker
+        self.list_rtss = tracker.takeDirtyRTSS()
+        self.segmentations = {}
+        # Suivi des erreurs
+        self.exception = None
+        super().__init__(MESSAGE_CATEGORY, QgsTask.CanCancel)
+
+    def run(self):
+        QgsMessageLog.logMessage(f"Mise à jour de {len(self.list_rtss)} RTSS du réseau...", MESSAGE_CATEGORY, Qgis.Info)
+        try: self.segmentations = self.tracker.computeUpdate(self.list_rtss, feedback=self)
+        except Exception as error:
+            self.exception = error
+            return False
+        return not self.isCanceled()
+
+    def finished(self, result):
+        # Remplacer les segmentations dans le thread principal
+        if result:
+            self.tracker.applyUpdate(self.segmentations, self.list_rtss)
+            QgsMessageLog.logMessage('"{name}" completed\n'.format(name=self.description()), MESSAGE_CATEGORY, Qgis.Success)
+            return None
+        # Les RTSS seront recalculés à la prochaine mise à jour
+        self.tracker.markRTSS(self.list_rtss)
+        if self.exception is None:
+            QgsMessageLog.logMessage('"{name}" not successful but without exception (probably the task was manually canceled by the user)'.format(name=self.description()),
+                MESSAGE_CATEGORY, Qgis.Warning)
+        else:
+            QgsMessageLog.logMessage('"{name}" Exception: {exception}'.format(name=self.description(), exception=self.exception), MESSAGE_CATEGORY, Qgis.Critical)
+
+    def cancel(self):
+        QgsMessageLog.logMessage('"{name}" was canceled'.format(name=self.description()), MESSAGE_CATEGORY, Qgis.Info)
+        super().cancel()